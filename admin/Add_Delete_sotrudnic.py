@@ -3,7 +3,9 @@ from PyQt6.QtWidgets import QMessageBox, QDialog, QInputDialog
 from PyQt6.QtCore import QDate
 import sqlite3
 import hashlib
-from utils import get_resource_path, get_database_path
+from utils import get_resource_path
+from db_pool import get_connection
+from change_bus import publish, STAFF
 
 
 class EmptyFieldError(Exception):
@@ -40,8 +42,7 @@ class EmployeeManagementDialog(QDialog):
             self.current_date_label.setText(QDate.currentDate().toString("dd.MM.yyyy"))
 
             # Инициализация БД
-            db_path = get_database_path()
-            self.conn = sqlite3.connect(db_path)
+            self.conn = get_connection()
             self.cursor = self.conn.cursor()
 
             # Подключаем кнопки
@@ -336,12 +337,12 @@ class EmployeeManagementDialog(QDialog):
             password_hash = hashlib.sha256(password.encode()).hexdigest()
 
             # Добавляем в БД
-            self.cursor.execute('''
-                INSERT INTO staff (first_name, last_name, patronymic, login, password_hash, position)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (first_name.strip(), last_name.strip(), patronymic.strip(), login.strip(), password_hash, position))
-
-            self.conn.commit()
+            with self.conn:
+                self.cursor.execute('''
+                    INSERT INTO staff (first_name, last_name, patronymic, login, password_hash, position)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (first_name.strip(), last_name.strip(), patronymic.strip(), login.strip(), password_hash, position))
+                publish(self.conn, STAFF)
 
             QMessageBox.information(self, "Успех", "Сотрудник успешно добавлен!")
             self.load_employees()
@@ -378,13 +379,13 @@ class EmployeeManagementDialog(QDialog):
                                          QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
 
             if reply == QMessageBox.StandardButton.Yes:
-                self.cursor.execute("DELETE FROM staff WHERE last_name = ? AND first_name = ?",
-                                    (last_name, first_name))
-
-                if self.cursor.rowcount == 0:
-                    raise EmployeeNotFoundError(f"Сотрудник {self.selected_employee} не найден в базе данных")
+                with self.conn:
+                    self.cursor.execute("DELETE FROM staff WHERE last_name = ? AND first_name = ?",
+                                        (last_name, first_name))
 
-                self.conn.commit()
+                    if self.cursor.rowcount == 0:
+                        raise EmployeeNotFoundError(f"Сотрудник {self.selected_employee} не найден в базе данных")
+                    publish(self.conn, STAFF)
 
                 QMessageBox.information(self, "Успех", f"Сотрудник {self.selected_employee} уволен!")
                 self.selected_employee = None
@@ -402,8 +403,4 @@ class EmployeeManagementDialog(QDialog):
             QMessageBox.critical(self, "Ошибка", f"Ошибка увольнения сотрудника: {str(e)}")
 
     def closeEvent(self, event):
-        try:
-            self.conn.close()
-        except:
-            pass
         event.accept()
\ No newline at end of file
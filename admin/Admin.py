@@ -5,7 +5,8 @@ from PyQt6.QtGui import QPalette, QColor
 import sqlite3
 import sys
 
-from utils import get_resource_path, get_database_path
+from utils import get_resource_path
+from db_pool import get_connection
 
 # Импортируем модули для каждого функционала
 from admin.Add_Delete_sotrudnic import EmployeeManagementDialog
@@ -36,12 +37,13 @@ class OpenMassageWindowError(Exception):
 class AdminWindow(QMainWindow):
     closed = pyqtSignal()
 
-    def __init__(self, full_name, username):
+    def __init__(self, session):
         super().__init__()
         uic.loadUi(get_resource_path('UI/Admin/Админ переделанный.ui'), self)
-        self.user_id = self.get_user_id(username)
-        self.full_name = full_name
-        self.username = username
+        self.session = session
+        self.user_id = session.user_id
+        self.full_name = session.full_name
+        self.username = session.login
         # Инициализируем менеджер уведомлений
         self.notifications_manager = SimpleNotificationsManager(
             self.user_id,
@@ -64,25 +66,11 @@ class AdminWindow(QMainWindow):
 
     def open_massage(self):
         try:
-            self.massage_window = MassageWindow(full_name=self.full_name)
+            self.massage_window = MassageWindow(self.session)
             self.massage_window.show()
         except Exception as e:
             self.show_error_message(f"Ошибка открытия окна сообщений: {str(e)}")
 
-    def get_user_id(self, username):
-        #Получение ID по логину
-        try:
-            db_path = get_database_path()
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            cursor.execute('SELECT id FROM staff WHERE login = ?', (username,))
-            result = cursor.fetchone()
-            conn.close()
-            return result[0] if result else 1
-        except Exception as e:
-            print(f"Ошибка получения ID пользователя: {e}")
-            return 1
-
     def closeEvent(self, event):
         #Останавливаем обновления уведомлений при закрытии
         if hasattr(self, 'notifications_manager'):
@@ -92,8 +80,7 @@ class AdminWindow(QMainWindow):
     def init_database(self):
         #Baza dannih
         try:
-            db_path = get_database_path()
-            self.conn = sqlite3.connect(db_path)
+            self.conn = get_connection()
             self.cursor = self.conn.cursor()
         except sqlite3.Error as e:
             QMessageBox.critical(self, "Ошибка БД", f"Не удалось подключиться к базе данных: {str(e)}")
@@ -250,10 +237,4 @@ class AdminWindow(QMainWindow):
             self.close()
 
     def closeEvent(self, event):
-        #Закрытие соединения с БД при закрытии приложения
-        try:
-            if hasattr(self, 'conn'):
-                self.conn.close()
-        except:
-            pass
         event.accept()
\ No newline at end of file
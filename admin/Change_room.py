@@ -3,7 +3,10 @@ from PyQt6.QtWidgets import QMessageBox, QDialog, QInputDialog
 from PyQt6.QtCore import QDate
 import sqlite3
 from datetime import datetime
-from utils import get_resource_path, get_database_path
+from utils import get_resource_path
+from db_pool import get_connection
+from change_bus import publish, BOOKINGS
+from admin.room_inventory import get_room_inventory
 
 
 class EmptyFieldError(Exception):
@@ -40,9 +43,9 @@ class RoomManagementDialog(QDialog):
             self.current_date_label.setText(QDate.currentDate().toString("dd.MM.yyyy"))
 
             # Инициализация БД
-            db_path = get_database_path()
-            self.conn = sqlite3.connect(db_path)
+            self.conn = get_connection()
             self.cursor = self.conn.cursor()
+            self.inventory = get_room_inventory()
 
             # Подключаем кнопки и элементы
             self.lineEdit.textChanged.connect(self.search_rooms)
@@ -112,34 +115,10 @@ class RoomManagementDialog(QDialog):
     def load_rooms(self):
         """Загрузка номеров из БД"""
         try:
-            # Сначала получим все комнаты с ценой
-            self.cursor.execute("SELECT id, room_number, room_type, price_per_night FROM rooms ORDER BY room_number")
-            all_rooms_data = self.cursor.fetchall()
-
-            # Теперь для каждой комнаты проверим занятость
-            self.all_rooms = []
-            current_date = datetime.now().strftime('%Y-%m-%d')
-
-            for room_id, room_number, room_type, price in all_rooms_data:
-                # Проверяем есть ли активное бронирование на сегодня
-                self.cursor.execute("""
-                    SELECT COUNT(*) FROM bookings 
-                    WHERE room_id = ? 
-                    AND ? BETWEEN check_in_date AND check_out_date
-                """, (room_id, current_date))
-
-                is_occupied = self.cursor.fetchone()[0] > 0
-                status = '+' if is_occupied else '-'
-
-                self.all_rooms.append((room_id, room_number, status, room_type, price))
-
-            self.filtered_rooms = self.all_rooms.copy()
-
-            # Настраиваем прокрутку
-            self.setup_scrollbar()
-
-            # Отображаем комнаты
-            self.display_rooms()
+            # Номера с занятостью на сегодня - одним запросом; если брони и номера
+            # не менялись, список берется из памяти
+            self.all_rooms = self.inventory.refresh(self.conn)
+            self.apply_filter()
 
             # Сбрасываем выбранный номер
             self.selected_room_number = None
@@ -148,6 +127,19 @@ class RoomManagementDialog(QDialog):
         except sqlite3.Error as e:
             raise DatabaseConnectionError(f"Ошибка загрузки номеров: {str(e)}")
 
+    def apply_filter(self):
+        """Поиск и сортировка по загруженному списку, без запросов к БД"""
+        rooms = self.inventory.search_rooms(self.lineEdit.text())
+        self.filtered_rooms = self.inventory.sort_rooms(rooms, self.comboBox.currentText())
+
+        # Сбрасываем прокрутку
+        self.current_start_index = 0
+        self.verticalScrollBar.setValue(0)
+
+        # Настраиваем прокрутку заново
+        self.setup_scrollbar()
+        self.display_rooms()
+
     def setup_scrollbar(self):
         """Настройка прокрутки"""
         try:
@@ -231,55 +223,15 @@ class RoomManagementDialog(QDialog):
     def search_rooms(self):
         """Поиск номеров"""
         try:
-            search_text = self.lineEdit.text().strip()
-
-            if not search_text:
-                self.filtered_rooms = self.all_rooms.copy()
-            else:
-                self.filtered_rooms = []
-                for room_id, room_number, status, room_type, price in self.all_rooms:
-                    if (search_text.lower() in room_number.lower() or
-                            search_text.lower() in room_type.lower() or
-                            search_text in str(price)):
-                        self.filtered_rooms.append((room_id, room_number, status, room_type, price))
-
-            # Сбрасываем прокрутку
-            self.current_start_index = 0
-            self.verticalScrollBar.setValue(0)
-
-            # Настраиваем прокрутку заново
-            self.setup_scrollbar()
-            self.display_rooms()
+            # Сортировка сохраняется: фильтр применяется к списку вместе с ней
+            self.apply_filter()
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Ошибка поиска: {str(e)}")
 
     def sort_rooms(self):
         """Сортировка номеров"""
         try:
-            sort_option = self.comboBox.currentText()
-
-            if not self.filtered_rooms:
-                return
-
-            # Используем текущий отфильтрованный список для сортировки
-            rooms_to_sort = self.filtered_rooms.copy()
-
-            if sort_option == "Сортировать по \"+\"":
-                sorted_rooms = sorted(rooms_to_sort, key=lambda x: (x[2] != '+', x[1]))
-            elif sort_option == "Сортировать по \"-\"":
-                sorted_rooms = sorted(rooms_to_sort, key=lambda x: (x[2] != '-', x[1]))
-            else:
-                sorted_rooms = sorted(rooms_to_sort, key=lambda x: x[1])
-
-            self.filtered_rooms = sorted_rooms
-
-            # Сбрасываем прокрутку
-            self.current_start_index = 0
-            self.verticalScrollBar.setValue(0)
-
-            # Настраиваем прокрутку заново
-            self.setup_scrollbar()
-            self.display_rooms()
+            self.apply_filter()
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Ошибка сортировки: {str(e)}")
 
@@ -366,12 +318,12 @@ class RoomManagementDialog(QDialog):
                 return
 
             # Добавляем номер в БД
-            self.cursor.execute(
-                "INSERT INTO rooms (room_number, room_type, price_per_night) VALUES (?, ?, ?)",
-                (room_number.strip(), room_type, price_validated)
-            )
-
-            self.conn.commit()
+            with self.conn:
+                self.cursor.execute(
+                    "INSERT INTO rooms (room_number, room_type, price_per_night) VALUES (?, ?, ?)",
+                    (room_number.strip(), room_type, price_validated)
+                )
+                publish(self.conn, BOOKINGS)
 
             QMessageBox.information(self, "Успех",
                                     f"Номер {room_number.strip()} ({room_type}) успешно добавлен!\n"
@@ -434,13 +386,13 @@ class RoomManagementDialog(QDialog):
             )
 
             if reply == QMessageBox.StandardButton.Yes:
-                # Удаляем все связанные бронирования
-                self.cursor.execute("DELETE FROM bookings WHERE room_id = ?", (room_id,))
+                with self.conn:
+                    # Удаляем все связанные бронирования
+                    self.cursor.execute("DELETE FROM bookings WHERE room_id = ?", (room_id,))
 
-                # Удаляем комнату
-                self.cursor.execute("DELETE FROM rooms WHERE id = ?", (room_id,))
-
-                self.conn.commit()
+                    # Удаляем комнату
+                    self.cursor.execute("DELETE FROM rooms WHERE id = ?", (room_id,))
+                    publish(self.conn, BOOKINGS)
 
                 QMessageBox.information(self, "Успех", f"Номер {self.selected_room_number} успешно удален!")
 
@@ -453,7 +405,6 @@ class RoomManagementDialog(QDialog):
 
         except sqlite3.Error as e:
             QMessageBox.critical(self, "Ошибка БД", f"Ошибка базы данных: {str(e)}")
-            self.conn.rollback()
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Ошибка удаления номера: {str(e)}")
 
@@ -560,14 +511,14 @@ class RoomManagementDialog(QDialog):
                     return
 
                 # Обновляем номер в БД
-                self.cursor.execute(
-                    """UPDATE rooms 
-                       SET room_number = ?, room_type = ?, price_per_night = ?
-                       WHERE room_number = ?""",
-                    (new_room, new_type, price_validated, current_room)
-                )
-
-                self.conn.commit()
+                with self.conn:
+                    self.cursor.execute(
+                        """UPDATE rooms 
+                           SET room_number = ?, room_type = ?, price_per_night = ?
+                           WHERE room_number = ?""",
+                        (new_room, new_type, price_validated, current_room)
+                    )
+                    publish(self.conn, BOOKINGS)
 
                 changes = []
                 if room_changed:
@@ -602,8 +553,4 @@ class RoomManagementDialog(QDialog):
 
     def closeEvent(self, event):
         """Обработчик закрытия окна"""
-        try:
-            self.conn.close()
-        except:
-            pass
         event.accept()
\ No newline at end of file
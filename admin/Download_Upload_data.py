@@ -1,10 +1,13 @@
 from PyQt6 import QtWidgets, uic
-from PyQt6.QtWidgets import QMessageBox, QDialog, QFileDialog
-from PyQt6.QtCore import QDate
+from PyQt6.QtWidgets import QMessageBox, QDialog, QFileDialog, QLabel, QProgressBar
+from PyQt6.QtCore import QDate, QThreadPool
 import sqlite3
-import csv
+import os
 from datetime import datetime
-from utils import get_resource_path, get_database_path
+from utils import get_resource_path
+from db_pool import get_connection
+from daily_stats import period_stats
+from admin.export_engine import DATASETS, DATASETS_BY_TITLE, EXPORT_WORKERS, ExportJob, available_formats
 
 
 class ExportDataError(Exception):
@@ -25,8 +28,7 @@ class DataExportDialog(QDialog):
         self.current_date_label.setText(QDate.currentDate().toString("dd.MM.yyyy"))
 
         # Инициализация БД
-        db_path = get_database_path()
-        self.conn = sqlite3.connect(db_path)
+        self.conn = get_connection()
         self.cursor = self.conn.cursor()
 
         # Устанавливаем даты по умолчанию
@@ -34,6 +36,28 @@ class DataExportDialog(QDialog):
         self.start_date_edit.setDate(today.addDays(-30))  # Последние 30 дней
         self.end_date_edit.setDate(today)
 
+        # Выгрузки идут в пуле потоков, несколько наборов данных одновременно
+        self.export_pool = QThreadPool(self)
+        self.export_pool.setMaxThreadCount(EXPORT_WORKERS)
+        self.export_jobs = {}
+        self.last_job_id = 0
+        # Выгрузки, запущенные одной командой: итог показывается один раз,
+        # когда закончится последняя из них
+        self.export_groups = {}
+        self.job_groups = {}
+
+        # Ход выгрузки - под кнопкой: строка состояния из .ui в диалоге не размещается
+        self.export_status_label = QLabel()
+        self.export_status_label.setWordWrap(True)
+        self.export_progress = QProgressBar()
+        # Число строк заранее неизвестно - полоса показывает только, что работа идет
+        self.export_progress.setRange(0, 0)
+        self.export_layout.insertWidget(self.export_layout.indexOf(self.export_data_btn) + 1,
+                                        self.export_status_label)
+        self.export_layout.insertWidget(self.export_layout.indexOf(self.export_status_label) + 1,
+                                        self.export_progress)
+        self.show_export_status()
+
         # Подключаем кнопки
         self.export_data_btn.clicked.connect(self.export_data)
         self.start_date_edit.dateChanged.connect(self.update_stats)
@@ -70,20 +94,11 @@ class DataExportDialog(QDialog):
                 self.profit_value.setText("0 ₽")
                 return
 
-            # Статистика по бронированиям
-            self.cursor.execute("""
-                SELECT COUNT(*) as booking_count,
-                       COUNT(*) * 2500 as estimated_profit
-                FROM bookings 
-                WHERE check_in_date BETWEEN ? AND ?
-            """, (start_date, end_date))
-
-            stats = self.cursor.fetchone()
-            booking_count = stats[0] if stats else 0
-            estimated_profit = stats[1] if stats else 0
+            # Статистика по дням ведется триггерами - суммируем несколько сотен строк
+            stats = period_stats(start_date, end_date, self.conn)
 
-            self.attendance_value.setText(str(booking_count))
-            self.profit_value.setText(f"{estimated_profit:,} ₽".replace(",", " "))
+            self.attendance_value.setText(str(stats.check_ins))
+            self.profit_value.setText(f"{stats.revenue:,.0f} ₽".replace(",", " "))
 
         except sqlite3.Error as e:
             raise DatabaseConnectionError(f"Ошибка загрузки статистики")
@@ -104,144 +119,112 @@ class DataExportDialog(QDialog):
             # Выбор типа данных
             data_choice, ok = QtWidgets.QInputDialog.getItem(
                 self, "Экспорт данных", "Выберите данные для экспорта:",
-                ["Статистика отеля", "Бронирования", "Сотрудники", "Номера", "Все данные"], 0, False
+                list(DATASETS_BY_TITLE) + ["Все данные"], 0, False
             )
 
             if not ok:
                 return
 
-            file_path, _ = QFileDialog.getSaveFileName(
+            # Формат файла выбирается фильтром диалога; доступны только форматы,
+            # для которых установлены пакеты
+            formats = available_formats()
+            file_path, selected_filter = QFileDialog.getSaveFileName(
                 self, "Экспорт данных",
                 f"hotel_statistics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                "CSV Files (*.csv)"
+                ";;".join(f"{export_format.title} (*{export_format.extension})" for export_format in formats)
             )
 
-            if file_path:
-                self.export_to_csv(file_path, data_choice, start_date, end_date)
-                QMessageBox.information(self, "Успех", f"Данные экспортированы в {file_path}")
+            if not file_path:
+                return
+
+            export_format = next((export_format for export_format in formats
+                                  if selected_filter.startswith(export_format.title)), formats[0])
+            file_path = os.path.splitext(file_path)[0] + export_format.extension
+
+            if data_choice == "Все данные":
+                # Каждый набор - в свой файл рядом с выбранным, выгрузки идут параллельно
+                base_path = os.path.splitext(file_path)[0]
+                exports = [(dataset, f"{base_path}_{dataset.key}{export_format.extension}")
+                           for dataset in DATASETS]
+            else:
+                exports = [(DATASETS_BY_TITLE[data_choice], file_path)]
+
+            self.start_exports(exports, start_date, end_date)
 
         except ExportDataError as e:
             QMessageBox.critical(self, "Ошибка экспорта", str(e))
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Ошибка экспорта данных")
 
-    def export_to_csv(self, file_path, data_type, start_date, end_date):
-        #Экспорт в CSV с правильной кодировкой UTF-8
-        try:
-            with open(file_path, 'w', newline='', encoding='utf-8-sig') as file:  # Используем utf-8-sig для Excel
-                writer = csv.writer(file, delimiter=';')  # Используем точку с запятой как разделитель
-
-                if data_type == "Статистика отеля":
-                    # Получаем статистику за период
-                    self.cursor.execute("""
-                        SELECT COUNT(*) as booking_count,
-                               COUNT(*) * 2500 as total_profit
-                        FROM bookings 
-                        WHERE check_in_date BETWEEN ? AND ?
-                    """, (start_date, end_date))
-
-                    stats = self.cursor.fetchone()
-                    booking_count = stats[0] if stats else 0
-                    total_profit = stats[1] if stats else 0
-
-                    # Записываем только статистику
-                    writer.writerow(['Показатель', 'Значение'])
-                    writer.writerow(['Период', f'{start_date} - {end_date}'])
-                    writer.writerow(['Дата экспорта', datetime.now().strftime('%d.%m.%Y %H:%M:%S')])
-                    writer.writerow(['Посещаемость (бронирования)', booking_count])
-                    writer.writerow(['Общая прибыль', f'{total_profit} ₽'])
-                    writer.writerow(['Средняя стоимость номера', '2500 ₽'])
-
-                elif data_type == "Бронирования":
-                    writer.writerow(['ID', 'Гость', 'Номер', 'Заезд', 'Выезд', 'Статус', 'Стоимость'])
-                    self.cursor.execute("""
-                        SELECT b.id, g.first_name || ' ' || g.last_name as guest_name,
-                               r.room_number, b.check_in_date, b.check_out_date,
-                               CASE WHEN date('now') BETWEEN b.check_in_date AND b.check_out_date 
-                                    THEN 'Активно' ELSE 'Завершено' END as status,
-                               2500 as price
-                        FROM bookings b
-                        JOIN guests g ON b.guest_id = g.id
-                        JOIN rooms r ON b.room_id = r.id
-                        WHERE b.check_in_date BETWEEN ? AND ?
-                        ORDER BY b.check_in_date
-                    """, (start_date, end_date))
-                    data = self.cursor.fetchall()
-                    for row in data:
-                        writer.writerow(row)
-
-                elif data_type == "Сотрудники":
-                    writer.writerow(['Фамилия', 'Имя', 'Отчество', 'Должность', 'Логин'])
-                    self.cursor.execute("SELECT last_name, first_name, patronymic, position, login FROM staff")
-                    data = self.cursor.fetchall()
-                    for row in data:
-                        writer.writerow(row)
-
-                elif data_type == "Номера":
-                    writer.writerow(['Номер', 'Статус', 'Гость', 'Период проживания', 'Стоимость за ночь'])
-                    self.cursor.execute("""
-                        SELECT r.room_number,
-                               CASE WHEN EXISTS (
-                                   SELECT 1 FROM bookings b 
-                                   WHERE b.room_id = r.id 
-                                   AND date('now') BETWEEN b.check_in_date AND b.check_out_date
-                               ) THEN 'Занят' ELSE 'Свободен' END as status,
-                               COALESCE(g.first_name || ' ' || g.last_name, 'Нет') as guest_name,
-                               CASE WHEN b.check_in_date IS NOT NULL 
-                                    THEN b.check_in_date || ' - ' || b.check_out_date 
-                                    ELSE 'Нет' END as period,
-                               2500 as price
-                        FROM rooms r
-                        LEFT JOIN bookings b ON r.id = b.room_id AND date('now') BETWEEN b.check_in_date AND b.check_out_date
-                        LEFT JOIN guests g ON b.guest_id = g.id
-                        ORDER BY r.room_number
-                    """)
-                    data = self.cursor.fetchall()
-                    for row in data:
-                        writer.writerow(row)
-
-                else:  # Все данные
-                    # Статистика
-                    self.cursor.execute("""
-                        SELECT COUNT(*) as booking_count,
-                               COUNT(*) * 2500 as total_profit
-                        FROM bookings 
-                        WHERE check_in_date BETWEEN ? AND ?
-                    """, (start_date, end_date))
-                    stats = self.cursor.fetchone()
-
-                    writer.writerow(['СТАТИСТИКА ОТЕЛЯ'])
-                    writer.writerow(['Период', f'{start_date} - {end_date}'])
-                    writer.writerow(['Дата экспорта', datetime.now().strftime('%d.%m.%Y %H:%M:%S')])
-                    writer.writerow(['Посещаемость', stats[0] if stats else 0])
-                    writer.writerow(['Прибыль', f'{stats[1] if stats else 0} ₽'])
-                    writer.writerow([])
-
-                    # Бронирования
-                    writer.writerow(['БРОНИРОВАНИЯ'])
-                    writer.writerow(['Гость', 'Номер', 'Заезд', 'Выезд', 'Стоимость'])
-                    self.cursor.execute("""
-                        SELECT g.first_name || ' ' || g.last_name, r.room_number, 
-                               b.check_in_date, b.check_out_date, 2500
-                        FROM bookings b
-                        JOIN guests g ON b.guest_id = g.id
-                        JOIN rooms r ON b.room_id = r.id
-                        WHERE b.check_in_date BETWEEN ? AND ?
-                        ORDER BY b.check_in_date
-                    """, (start_date, end_date))
-                    data = self.cursor.fetchall()
-                    for row in data:
-                        writer.writerow(row)
-
-        except IOError as e:
-            raise ExportDataError(f"Ошибка записи файла: {str(e)}")
-        except Exception as e:
-            raise ExportDataError(f"Ошибка при экспорте в CSV")
+    def start_exports(self, exports, start_date, end_date):
+        """Ставит выгрузки (набор данных, путь) в пул потоков; окно остается доступным, пока файлы пишутся"""
+        group = {'pending': len(exports), 'done': [], 'failed': []}
+        for dataset, file_path in exports:
+            self.last_job_id += 1
+            job = ExportJob(self.last_job_id, dataset, file_path, start_date, end_date)
+            job.signals.progress.connect(self.on_export_progress)
+            job.signals.finished.connect(self.on_export_finished)
+            job.signals.failed.connect(self.on_export_failed)
+
+            self.export_jobs[job.job_id] = job
+            self.job_groups[job.job_id] = group
+            self.export_pool.start(job)
+        self.show_export_status()
+
+    def show_export_status(self, text=None):
+        if text is None:
+            text = f"Выгрузок в работе: {len(self.export_jobs)}" if self.export_jobs else ""
+        self.export_status_label.setText(text)
+        self.export_status_label.setVisible(bool(text))
+        self.export_progress.setVisible(bool(self.export_jobs))
+
+    def on_export_progress(self, job_id, rows):
+        job = self.export_jobs.get(job_id)
+        if job:
+            self.show_export_status(f"{job.dataset.title}: выгружено строк {rows} "
+                                    f"(выгрузок в работе: {len(self.export_jobs)})")
+
+    def on_export_finished(self, job_id, file_path, rows):
+        job = self.export_jobs.pop(job_id, None)
+        group = self.job_groups.pop(job_id, None)
+        self.show_export_status()
+        if group is not None:
+            group['done'].append((job.dataset.title, file_path, rows))
+            self.finish_export_job(group)
+
+    def on_export_failed(self, job_id, error):
+        job = self.export_jobs.pop(job_id, None)
+        group = self.job_groups.pop(job_id, None)
+        self.show_export_status()
+        if group is not None:
+            group['failed'].append((job.dataset.title, error))
+            self.finish_export_job(group)
+
+    def finish_export_job(self, group):
+        """Итог по группе выгрузок - одним сообщением, когда закончилась последняя"""
+        group['pending'] -= 1
+        if group['pending']:
+            return
+
+        done = [f"{title}: {file_path} (строк: {rows})" for title, file_path, rows in group['done']]
+        failed = [f"{title}: {error}" for title, error in group['failed']]
+
+        if not failed:
+            if len(done) == 1:
+                QMessageBox.information(self, "Успех", f"Данные экспортированы в {group['done'][0][1]}")
+            else:
+                QMessageBox.information(self, "Успех", "Данные экспортированы:\n" + "\n".join(done))
+        elif not done:
+            QMessageBox.critical(self, "Ошибка экспорта", "\n".join(failed))
+        else:
+            QMessageBox.warning(self, "Экспорт завершен с ошибками",
+                                "Экспортированы:\n" + "\n".join(done) + "\n\nОшибки:\n" + "\n".join(failed))
 
     def closeEvent(self, event):
-        #Закрытие соединения с БД
-        try:
-            self.conn.close()
-        except:
-            pass
+        # Незаконченные выгрузки отменяются, их временные файлы удаляются
+        for job in list(self.export_jobs.values()):
+            job.cancel()
+        self.export_pool.waitForDone()
+        # Сигналы отмененных выгрузок придут уже после закрытия - итог по ним не нужен
+        self.job_groups.clear()
         event.accept()
\ No newline at end of file
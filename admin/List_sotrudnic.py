@@ -6,7 +6,8 @@ from PyQt6.QtGui import QColor
 import sqlite3
 import csv
 import os
-from utils import get_resource_path, get_database_path
+from utils import get_resource_path
+from db_pool import get_connection
 
 
 class ImportPreviewDialog(QDialog):
@@ -117,8 +118,7 @@ class EmployeeListDialog(QDialog):
         self.current_date_label.setText(QDate.currentDate().toString("dd.MM.yyyy"))
 
         # Инициализация БД
-        db_path = get_database_path()
-        self.conn = sqlite3.connect(db_path)
+        self.conn = get_connection()
         self.cursor = self.conn.cursor()
 
         # Настройка таблицы
@@ -348,8 +348,4 @@ class EmployeeListDialog(QDialog):
         self.statusbar.showMessage(message, 3000)  # Показываем сообщение 3 секунды
 
     def closeEvent(self, event):
-        try:
-            self.conn.close()
-        except:
-            pass
         event.accept()
\ No newline at end of file
@@ -0,0 +1,332 @@
+import csv
+import importlib.util
+import os
+from collections import namedtuple
+
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
+
+from db_pool import get_connection, close_connection
+
+# Строк, читаемых из курсора за раз
+EXPORT_BATCH = 5000
+# Сколько выгрузок может идти одновременно
+EXPORT_WORKERS = 3
+
+# Колонка выгрузки: заголовок и тип (int, float, str) - нужен для колоночных форматов
+Column = namedtuple('Column', ['title', 'kind'])
+
+
+class ExportFormatError(Exception):
+    pass
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+class Dataset:
+    """Набор данных для выгрузки: колонки и запрос.
+
+    В запросе можно использовать :start и :end - границы выбранного периода.
+    """
+
+    def __init__(self, key, title, columns, query):
+        self.key = key
+        self.title = title
+        self.columns = columns
+        self.query = query
+
+    @property
+    def headers(self):
+        return [column.title for column in self.columns]
+
+    def batches(self, conn, start_date, end_date, batch_size=EXPORT_BATCH):
+        cursor = conn.execute(self.query, {'start': start_date, 'end': end_date})
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield rows
+
+
+DATASETS = [
+    Dataset('summary', "Статистика отеля", [
+        Column('Начало периода', 'str'),
+        Column('Конец периода', 'str'),
+        Column('Посещаемость (бронирования)', 'int'),
+        Column('Продано ночей', 'int'),
+        Column('Общая прибыль', 'float'),
+        Column('Средняя стоимость номера', 'float'),
+        Column('Заданий на уборку создано', 'int'),
+        Column('Заданий на уборку выполнено', 'int'),
+        Column('Среднее время уборки, мин', 'float'),
+    ], '''
+        SELECT :start, :end,
+               COALESCE(SUM(check_ins), 0),
+               COALESCE(SUM(occupied_rooms), 0),
+               COALESCE(SUM(revenue), 0),
+               COALESCE(SUM(revenue) / NULLIF(SUM(occupied_rooms), 0), 0),
+               COALESCE(SUM(tasks_created), 0),
+               COALESCE(SUM(tasks_completed), 0),
+               COALESCE(SUM(cleaning_seconds) / NULLIF(SUM(tasks_completed), 0) / 60, 0)
+        FROM daily_stats
+        WHERE day BETWEEN :start AND :end
+    '''),
+    Dataset('daily', "Статистика по дням", [
+        Column('Дата', 'str'),
+        Column('Занято номеров', 'int'),
+        Column('Заезды', 'int'),
+        Column('Выручка', 'float'),
+        Column('Заданий создано', 'int'),
+        Column('Заданий выполнено', 'int'),
+        Column('Среднее время уборки, мин', 'float'),
+    ], '''
+        SELECT day, occupied_rooms, check_ins, revenue, tasks_created, tasks_completed,
+               COALESCE(cleaning_seconds / NULLIF(tasks_completed, 0) / 60, 0)
+        FROM daily_stats
+        WHERE day BETWEEN :start AND :end
+        AND (occupied_rooms OR check_ins OR tasks_created OR tasks_completed)
+        ORDER BY day
+    '''),
+    Dataset('bookings', "Бронирования", [
+        Column('ID', 'int'),
+        Column('Гость', 'str'),
+        Column('Номер', 'str'),
+        Column('Заезд', 'str'),
+        Column('Выезд', 'str'),
+        Column('Статус', 'str'),
+        Column('Стоимость', 'float'),
+    ], '''
+        SELECT b.id, g.first_name || ' ' || g.last_name as guest_name,
+               r.room_number, b.check_in_date, b.check_out_date,
+               CASE WHEN date('now') BETWEEN b.check_in_date AND b.check_out_date
+                    THEN 'Активно' ELSE 'Завершено' END as status,
+               CAST(JULIANDAY(b.check_out_date) - JULIANDAY(b.check_in_date) AS INTEGER) * r.price_per_night
+        FROM bookings b
+        JOIN guests g ON b.guest_id = g.id
+        JOIN rooms r ON b.room_id = r.id
+        WHERE b.check_in_date BETWEEN :start AND :end
+        ORDER BY b.check_in_date
+    '''),
+    Dataset('staff', "Сотрудники", [
+        Column('Фамилия', 'str'),
+        Column('Имя', 'str'),
+        Column('Отчество', 'str'),
+        Column('Должность', 'str'),
+        Column('Логин', 'str'),
+    ], 'SELECT last_name, first_name, patronymic, position, login FROM staff ORDER BY last_name, first_name'),
+    Dataset('rooms', "Номера", [
+        Column('Номер', 'str'),
+        Column('Статус', 'str'),
+        Column('Гость', 'str'),
+        Column('Период проживания', 'str'),
+        Column('Стоимость за ночь', 'float'),
+    ], '''
+        SELECT r.room_number,
+               CASE WHEN b.id IS NOT NULL THEN 'Занят' ELSE 'Свободен' END as status,
+               COALESCE(g.first_name || ' ' || g.last_name, 'Нет') as guest_name,
+               CASE WHEN b.check_in_date IS NOT NULL
+                    THEN b.check_in_date || ' - ' || b.check_out_date
+                    ELSE 'Нет' END as period,
+               r.price_per_night
+        FROM rooms r
+        LEFT JOIN bookings b ON r.id = b.room_id AND date('now') BETWEEN b.check_in_date AND b.check_out_date
+        LEFT JOIN guests g ON b.guest_id = g.id
+        ORDER BY r.room_number
+    '''),
+]
+
+DATASETS_BY_TITLE = {dataset.title: dataset for dataset in DATASETS}
+
+
+class CsvWriter:
+    """CSV с разделителем ';' и BOM - открывается в Excel без настройки кодировки"""
+
+    def __init__(self, file_path, dataset):
+        self.file = open(file_path, 'w', newline='', encoding='utf-8-sig')
+        self.writer = csv.writer(self.file, delimiter=';')
+        self.writer.writerow(dataset.headers)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ArrowBatches:
+    """Общая часть колоночных форматов: порции строк в record batch pyarrow"""
+
+    # SQLite не следит за типами колонок: номер комнаты может прийти числом,
+    # а сумма - дробным числом, поэтому значения приводятся к типу колонки
+    CONVERTERS = {'int': int, 'float': float, 'str': str}
+
+    def __init__(self, dataset):
+        import pyarrow
+
+        self.pa = pyarrow
+        types = {'int': pyarrow.int64(), 'float': pyarrow.float64(), 'str': pyarrow.string()}
+        self.kinds = [column.kind for column in dataset.columns]
+        self.schema = pyarrow.schema([(column.title, types[column.kind]) for column in dataset.columns])
+
+    def record_batch(self, rows):
+        arrays = []
+        for values, kind, field in zip(zip(*rows), self.kinds, self.schema):
+            convert = self.CONVERTERS[kind]
+            arrays.append(self.pa.array([None if value is None else convert(value) for value in values],
+                                        type=field.type))
+        return self.pa.record_batch(arrays, schema=self.schema)
+
+
+class ParquetWriter(ArrowBatches):
+    """Parquet со сжатием zstd: каждая порция - отдельная группа строк"""
+
+    def __init__(self, file_path, dataset):
+        super().__init__(dataset)
+        import pyarrow.parquet
+
+        self.writer = pyarrow.parquet.ParquetWriter(file_path, self.schema, compression='zstd')
+
+    def write(self, rows):
+        self.writer.write_batch(self.record_batch(rows))
+
+    def close(self):
+        self.writer.close()
+
+
+class ArrowWriter(ArrowBatches):
+    """Файл Arrow IPC (Feather v2) со сжатием zstd"""
+
+    def __init__(self, file_path, dataset):
+        super().__init__(dataset)
+        import pyarrow.ipc
+
+        self.sink = self.pa.OSFile(file_path, 'wb')
+        options = pyarrow.ipc.IpcWriteOptions(compression='zstd')
+        self.writer = pyarrow.ipc.new_file(self.sink, self.schema, options=options)
+
+    def write(self, rows):
+        self.writer.write_batch(self.record_batch(rows))
+
+    def close(self):
+        self.writer.close()
+        self.sink.close()
+
+
+class XlsxWriter:
+    """Книга Excel в потоковом режиме openpyxl: строки сразу уходят в файл"""
+
+    def __init__(self, file_path, dataset):
+        from openpyxl import Workbook
+
+        self.file_path = file_path
+        self.workbook = Workbook(write_only=True)
+        # Имя листа в Excel - не длиннее 31 символа
+        self.sheet = self.workbook.create_sheet(dataset.title[:31])
+        self.sheet.append(dataset.headers)
+
+    def write(self, rows):
+        for row in rows:
+            self.sheet.append(row)
+
+    def close(self):
+        self.workbook.save(self.file_path)
+
+
+ExportFormat = namedtuple('ExportFormat', ['title', 'extension', 'writer', 'module'])
+
+# Parquet, Arrow и Excel - необязательные зависимости: формат доступен,
+# только если установлен нужный пакет
+FORMATS = [
+    ExportFormat("CSV", '.csv', CsvWriter, None),
+    ExportFormat("Excel", '.xlsx', XlsxWriter, 'openpyxl'),
+    ExportFormat("Parquet", '.parquet', ParquetWriter, 'pyarrow'),
+    ExportFormat("Arrow", '.arrow', ArrowWriter, 'pyarrow'),
+]
+
+
+def available_formats():
+    return [export_format for export_format in FORMATS
+            if export_format.module is None or importlib.util.find_spec(export_format.module)]
+
+
+def format_for_path(file_path):
+    extension = os.path.splitext(file_path)[1].lower()
+    for export_format in available_formats():
+        if export_format.extension == extension:
+            return export_format
+    raise ExportFormatError(f"Формат {extension or 'без расширения'} не поддерживается")
+
+
+def export_dataset(dataset, file_path, start_date, end_date, conn=None,
+                   progress=None, cancelled=None, batch_size=EXPORT_BATCH):
+    """Выгружает набор данных в файл, формат - по расширению имени.
+
+    Строки идут из курсора в файл порциями; после каждой вызывается
+    progress(строк записано). Если cancelled() вернул True, выгрузка
+    прерывается, а недописанный файл удаляется. Возвращает число строк.
+    """
+    conn = conn or get_connection()
+    export_format = format_for_path(file_path)
+
+    part_path = file_path + '.part'
+    writer = export_format.writer(part_path, dataset)
+
+    written = 0
+    try:
+        try:
+            for rows in dataset.batches(conn, start_date, end_date, batch_size):
+                if cancelled and cancelled():
+                    raise ExportCancelled("Выгрузка отменена")
+                writer.write(rows)
+                written += len(rows)
+                if progress:
+                    progress(written)
+        finally:
+            writer.close()
+        os.replace(part_path, file_path)
+    except Exception:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+
+    return written
+
+
+class ExportJobSignals(QObject):
+    # id выгрузки, строк записано
+    progress = pyqtSignal(int, int)
+    # id выгрузки, путь к файлу, всего строк
+    finished = pyqtSignal(int, str, int)
+    # id выгрузки, текст ошибки
+    failed = pyqtSignal(int, str)
+
+
+class ExportJob(QRunnable):
+    """Одна выгрузка для пула потоков; у каждого потока свое соединение с базой"""
+
+    def __init__(self, job_id, dataset, file_path, start_date, end_date):
+        super().__init__()
+        self.job_id = job_id
+        self.dataset = dataset
+        self.file_path = file_path
+        self.start_date = start_date
+        self.end_date = end_date
+        self.cancelled = False
+        self.signals = ExportJobSignals()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        try:
+            written = export_dataset(
+                self.dataset, self.file_path, self.start_date, self.end_date,
+                progress=lambda rows: self.signals.progress.emit(self.job_id, rows),
+                cancelled=lambda: self.cancelled,
+            )
+            self.signals.finished.emit(self.job_id, self.file_path, written)
+        except Exception as e:
+            self.signals.failed.emit(self.job_id, str(e))
+        finally:
+            close_connection()
@@ -0,0 +1,90 @@
+from collections import namedtuple
+from datetime import date
+
+from change_bus import BOOKINGS, register_cache
+from db_pool import get_connection
+
+# Варианты сортировки из списка в окне управления номерами
+SORT_OCCUPIED_FIRST = "Сортировать по \"+\""
+SORT_FREE_FIRST = "Сортировать по \"-\""
+
+_room_inventory = None
+
+# status: '+' - номер сегодня занят, '-' - свободен
+RoomInfo = namedtuple('RoomInfo', ['id', 'room_number', 'status', 'room_type', 'price'])
+
+
+class RoomInventory:
+    """Номера с занятостью на сегодня для окна управления номерами.
+
+    Список загружается одним запросом и перечитывается, только когда растет
+    ревизия темы BOOKINGS (ее увеличивает любая запись броней и номеров)
+    или наступил новый день. Поиск и сортировка идут по списку в памяти.
+    """
+
+    def __init__(self):
+        self.revision = None
+        self.day = None
+        self.rooms = []
+        self.search_keys = []
+
+    def invalidate(self):
+        """Перечитать данные при следующем обращении, даже если ревизия та же"""
+        self.revision = None
+
+    def current_revision(self, conn):
+        row = conn.execute('SELECT revision FROM data_revisions WHERE topic = ?', (BOOKINGS,)).fetchone()
+        return row[0] if row else 0
+
+    def refresh(self, conn=None):
+        """Перечитывает номера, если брони или номера изменились; возвращает список номеров"""
+        conn = conn or get_connection()
+        revision = self.current_revision(conn)
+        day = date.today().isoformat()
+        if revision == self.revision and day == self.day:
+            return self.rooms
+
+        # Занятость - подзапросом по индексу idx_bookings_room_dates, без запроса на каждый номер
+        cursor = conn.execute('''
+            SELECT r.id, r.room_number,
+                   CASE WHEN EXISTS (
+                       SELECT 1 FROM bookings b
+                       WHERE b.room_id = r.id
+                       AND b.check_out_date >= :day AND b.check_in_date <= :day
+                   ) THEN '+' ELSE '-' END,
+                   r.room_type, r.price_per_night
+            FROM rooms r
+            ORDER BY r.room_number
+        ''', {'day': day})
+        self.rooms = [RoomInfo(*row) for row in cursor]
+        # Строка поиска на номер готовится один раз: номер, тип и цена через разделитель
+        self.search_keys = [f"{room.room_number}".lower() + '\0' + f"{room.room_type}".lower() + '\0' + str(room.price)
+                            for room in self.rooms]
+
+        self.revision = revision
+        self.day = day
+        return self.rooms
+
+    def search_rooms(self, text):
+        """Номера, у которых номер, тип или цена содержат текст (без учета регистра)"""
+        text = text.strip().lower()
+        if not text:
+            return list(self.rooms)
+        return [room for room, key in zip(self.rooms, self.search_keys) if text in key]
+
+    def sort_rooms(self, rooms, sort_option):
+        """Сортирует уже найденные номера; порядок по умолчанию - по номеру комнаты"""
+        if sort_option == SORT_OCCUPIED_FIRST:
+            return sorted(rooms, key=lambda room: (room.status != '+', room.room_number))
+        if sort_option == SORT_FREE_FIRST:
+            return sorted(rooms, key=lambda room: (room.status != '-', room.room_number))
+        return sorted(rooms, key=lambda room: room.room_number)
+
+
+def get_room_inventory():
+    """Общий список номеров процесса (для окон в потоке интерфейса)"""
+    global _room_inventory
+    if _room_inventory is None:
+        _room_inventory = RoomInventory()
+        register_cache(_room_inventory)
+    return _room_inventory
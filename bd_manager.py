@@ -1,14 +1,23 @@
 # yandex_uploader.py
 import yadisk
 import os
-from datetime import datetime
+import sqlite3
+import tempfile
+
+from db_pool import get_connection
+from delta_sync import take_snapshot, restore_snapshot, DeltaSyncError
+from file_transfer import StreamTransfer, TransferError
+from sync_storage import YandexDiskStorage, StorageError
 
 
 class YandexDiskUploader:
-    def __init__(self, token):
+    def __init__(self, token, storage=None):
         self.y = yadisk.YaDisk(token=token)
-        self.remote_path = "/HotelApp/Hotel_bd.db"
+        self.remote_name = "Hotel_bd.db"
         self.local_file = "Hotel_bd.db"
+        # Вместо Яндекс Диска можно передать LocalStorage - например, для проверки без сети
+        self.storage = storage or YandexDiskStorage(token, root="/HotelApp")
+        self.transfer = StreamTransfer(self.storage)
 
     def check_connection(self):
 
@@ -23,66 +32,76 @@ class YandexDiskUploader:
             print(f"Ошибка подключения: {e}")
             return False
 
-    def upload_db(self):
-
+    def upload_db(self, progress=None):
+        """Отправка базы частями со сжатием; progress(отправлено_байт, всего_байт)"""
         try:
 
             if not os.path.exists(self.local_file):
                 print(f"Файл {self.local_file} не найден")
                 return False
 
-
-            if not self.y.exists("/HotelApp"):
-                self.y.mkdir("/HotelApp")
-                print("Создана папка /HotelApp на Яндекс Диске")
-
-
             print("Загрузка файла на Яндекс Диск...")
-            self.y.upload(self.local_file, self.remote_path, overwrite=True)
+            # Отправляется согласованная копия, а не файл, в который сейчас идет запись
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                snapshot_path = os.path.join(tmp_dir, self.remote_name)
+                take_snapshot(get_connection(), snapshot_path)
+                sent = self.transfer.upload(snapshot_path, self.remote_name, progress)
 
             print("Файл успешно загружен на Яндекс Диск!")
-            print(f"Путь: {self.remote_path}")
+            print(f"Путь: {self.storage.full_path(self.remote_name)}, отправлено частей: {sent}")
             return True
 
-        except Exception as e:
+        except (TransferError, StorageError, sqlite3.Error, OSError) as e:
             print(f"Ошибка загрузки: {e}")
             return False
 
-    def download_db(self):
-        try:
+    def download_db(self, progress=None):
+        """Скачивание базы; прерванное скачивание продолжается с последней полученной части.
 
-            if not self.y.exists(self.remote_path):
-                print("Файл не найден на Яндекс Диске")
-                return False
+        Скачанный файл не подменяет рабочую базу, а переносится в нее через
+        backup API - соединения окон и планировщика при этом остаются открытыми.
+        """
+        # Постоянное имя, а не временная папка: иначе докачка после обрыва невозможна
+        download_path = self.local_file + '.remote'
+        try:
 
-            # Скачиваем файл (работает в любом случае)
-            print("Скачивание файла с Яндекс Диска...")
-            self.y.download(self.remote_path, self.local_file, overwrite=True)
+            if self.transfer.remote_manifest(self.remote_name) is not None:
+                print("Скачивание файла с Яндекс Диска...")
+                file_size = self.transfer.download(self.remote_name, download_path, progress)
 
+            elif self.storage.exists(self.remote_name):
+                # База, загруженная прежней версией программы целиком, без частей
+                print("Скачивание файла с Яндекс Диска (без частей)...")
+                data = self.storage.read_bytes(self.remote_name)
+                with open(download_path, 'wb') as file:
+                    file.write(data)
+                file_size = len(data)
+                if progress:
+                    progress(file_size, file_size)
 
-            if os.path.exists(self.local_file):
-                file_size = os.path.getsize(self.local_file)
-                print("Файл успешно скачан с Яндекс Диска!")
-                print(f"Размер: {file_size} байт")
-                return True
             else:
-                print("Файл не скачался")
+                print("Файл не найден на Яндекс Диске")
                 return False
 
+            restore_snapshot(download_path, get_connection())
+            os.remove(download_path)
 
-        except Exception as e:
+            print("Файл успешно скачан с Яндекс Диска!")
+            print(f"Размер: {file_size} байт")
+            return True
+
+        except (TransferError, StorageError, DeltaSyncError, sqlite3.Error, OSError) as e:
             print(f"Ошибка скачивания: {e}")
             return False
 
     def check_remote_file(self):
 
         try:
-            if self.y.exists(self.remote_path):
-                file_info = self.y.get_meta(self.remote_path)
+            manifest = self.transfer.remote_manifest(self.remote_name)
+            if manifest is not None:
                 print("Файл найден на Яндекс Диске:")
-                print(f"Путь: {self.remote_path}")
-                print(f"Размер: {file_info.size} байт")
-                print(f"Изменен: {file_info.modified}")
+                print(f"Путь: {self.storage.full_path(self.remote_name)}")
+                print(f"Размер: {manifest['size']} байт, частей: {manifest['parts']}")
                 return True
             else:
                 print("Файл не найден на Яндекс Диске")
@@ -127,8 +146,7 @@ class YandexDiskUploader:
 # class SimpleAutoSync:
 #     def __init__(self, token):
 #         self.y = yadisk.YaDisk(token=token)
-#         self.remote_path = "/HotelApp/Hotel_bd.db"
-#         self.local_file = "Hotel_bd.db"
+# #         self.local_file = "Hotel_bd.db"
 #         self.is_running = False
 #
 #     def get_file_hash(self, filepath):
@@ -0,0 +1,193 @@
+# bench_indexes.py
+"""Замер времени горячих запросов до и после миграции индексов.
+
+Запуск из корня проекта:
+    python benchmarks/bench_indexes.py --bookings 1000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import MIGRATIONS, run_migrations
+
+
+SCHEMA = [
+    '''CREATE TABLE staff (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            first_name VARCHAR(20) NOT NULL,
+            last_name VARCHAR(20) NOT NULL,
+            patronymic VARCHAR(20),
+            login VARCHAR(20) UNIQUE NOT NULL,
+            password_hash VARCHAR(64) NOT NULL,
+            position TEXT NOT NULL
+        )''',
+    '''CREATE TABLE rooms (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            room_number VARCHAR(10) UNIQUE NOT NULL,
+            room_type VARCHAR(50) NOT NULL,
+            price_per_night DECIMAL(10,2) NOT NULL
+        )''',
+    '''CREATE TABLE guests (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            first_name VARCHAR(50) NOT NULL,
+            last_name VARCHAR(50) NOT NULL,
+            patronymic VARCHAR(50),
+            passport_number VARCHAR(20) NOT NULL,
+            phone_number VARCHAR(20) NOT NULL
+        )''',
+    '''CREATE TABLE bookings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guest_id INTEGER NOT NULL,
+            room_id INTEGER NOT NULL,
+            check_in_date DATE NOT NULL,
+            check_out_date DATE NOT NULL
+        )''',
+    '''CREATE TABLE messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            from_user INTEGER NOT NULL,
+            to_user INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            is_read BOOLEAN DEFAULT FALSE
+        )''',
+]
+
+TODAY = date.today()
+
+
+def fill_database(conn, bookings, rooms, staff, messages, tasks):
+    rnd = random.Random(42)
+    for statement in SCHEMA:
+        conn.execute(statement)
+    # maintenance_tasks создается первой миграцией
+    for step in MIGRATIONS[0][2]:
+        conn.execute(step)
+
+    conn.executemany('INSERT INTO staff (first_name, last_name, login, password_hash, position) VALUES (?, ?, ?, ?, ?)',
+                     ((f'Имя{i}', f'Фамилия{i}', f'user{i}', '-', 'обслуживающий персонал') for i in range(staff)))
+    conn.executemany('INSERT INTO rooms (room_number, room_type, price_per_night) VALUES (?, ?, ?)',
+                     ((str(100 + i), 'Стандарт', 3500) for i in range(rooms)))
+    conn.executemany('INSERT INTO guests (first_name, last_name, patronymic, passport_number, phone_number) '
+                     'VALUES (?, ?, ?, ?, ?)',
+                     ((f'Имя{i}', f'Фамилия{i}', 'Отчество', str(4510000000 + i), '+7(900)000-00-00')
+                      for i in range(bookings // 4 or 1)))
+
+    # Бронирования равномерно распределены по ~10 годам истории
+    start = TODAY - timedelta(days=3650)
+
+    def booking_rows():
+        for i in range(bookings):
+            check_in = start + timedelta(days=rnd.randrange(3700))
+            check_out = check_in + timedelta(days=rnd.randint(1, 14))
+            yield (rnd.randrange(1, bookings // 4 + 1), rnd.randrange(1, rooms + 1),
+                   check_in.isoformat(), check_out.isoformat())
+
+    conn.executemany('INSERT INTO bookings (guest_id, room_id, check_in_date, check_out_date) VALUES (?, ?, ?, ?)',
+                     booking_rows())
+    conn.executemany('INSERT INTO messages (from_user, to_user, text, is_read) VALUES (?, ?, ?, ?)',
+                     ((rnd.randrange(1, staff + 1), rnd.randrange(1, staff + 1), 'текст', rnd.random() < 0.95)
+                      for _ in range(messages)))
+    statuses = ['убрано'] * 18 + ['в работе', 'в ожидании уборки']
+    conn.executemany('INSERT INTO maintenance_tasks (room_number, description, assigned_to, created_by, status) '
+                     'VALUES (?, ?, ?, ?, ?)',
+                     ((str(100 + rnd.randrange(rooms)), 'уборка', rnd.randrange(1, staff + 1), 1, rnd.choice(statuses))
+                      for _ in range(tasks)))
+    conn.commit()
+
+
+def hot_queries(rooms):
+    month_start = TODAY.replace(day=1).isoformat()
+    month_end = (TODAY.replace(day=28) + timedelta(days=4)).replace(day=1).isoformat()
+    day = TODAY.isoformat()
+    week = (TODAY + timedelta(days=7)).isoformat()
+    room_number = str(100 + rooms // 2)
+
+    return [
+        ("Шахматка за месяц", '''
+            SELECT rooms.room_number, last_name, check_in_date, check_out_date
+            FROM bookings
+            JOIN guests ON bookings.guest_id = guests.id
+            JOIN rooms ON bookings.room_id = rooms.id
+            WHERE check_in_date <= ? AND check_out_date >= ?''', (month_end, month_start)),
+        ("Свободные номера", '''
+            SELECT r.room_number FROM rooms r
+            WHERE r.id NOT IN (SELECT b.room_id FROM bookings b
+                               WHERE b.check_out_date > ? AND b.check_in_date < ?)''', (day, week)),
+        ("Занятость номера", '''
+            SELECT COUNT(*) FROM bookings
+            WHERE room_id = ? AND check_out_date > ? AND check_in_date < ?''', (rooms // 2, day, week)),
+        ("Бронь по номеру и дате", '''
+            SELECT bookings.id FROM bookings
+            JOIN rooms ON bookings.room_id = rooms.id
+            WHERE rooms.room_number = ? AND bookings.check_in_date <= ? AND bookings.check_out_date >= ?''',
+         (room_number, day, day)),
+        ("Выезды за день", '''
+            SELECT DISTINCT r.room_number FROM bookings b
+            JOIN rooms r ON b.room_id = r.id
+            WHERE b.check_out_date = ?''', (day,)),
+        ("Непрочитанные уведомления", '''
+            SELECT m.id FROM messages m
+            WHERE m.to_user = ? AND m.is_read = 0
+            ORDER BY m.created_at DESC LIMIT 20''', (3,)),
+        ("Активное задание номера", '''
+            SELECT id FROM maintenance_tasks
+            WHERE room_number = ? AND status IN ('в работе', 'в ожидании уборки')''', (room_number,)),
+        ("Задания сотрудника", '''
+            SELECT id FROM maintenance_tasks
+            WHERE assigned_to = ? AND status = 'в работе' ''', (3,)),
+    ]
+
+
+def measure(conn, queries, repeat):
+    results = []
+    for title, sql, params in queries:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            conn.execute(sql, params).fetchall()
+        results.append((title, (time.perf_counter() - started) / repeat * 1000))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замер горячих запросов до и после индексов")
+    parser.add_argument('--bookings', type=int, default=1_000_000)
+    parser.add_argument('--rooms', type=int, default=300)
+    parser.add_argument('--staff', type=int, default=40)
+    parser.add_argument('--messages', type=int, default=200_000)
+    parser.add_argument('--tasks', type=int, default=200_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        conn = sqlite3.connect(os.path.join(tmp_dir, 'bench.db'))
+
+        started = time.perf_counter()
+        fill_database(conn, args.bookings, args.rooms, args.staff, args.messages, args.tasks)
+        print(f"База заполнена за {time.perf_counter() - started:.1f} с: "
+              f"{args.bookings} броней, {args.messages} сообщений, {args.tasks} заданий")
+
+        queries = hot_queries(args.rooms)
+        before = measure(conn, queries, args.repeat)
+
+        started = time.perf_counter()
+        run_migrations(conn)
+        print(f"Миграции применены за {time.perf_counter() - started:.1f} с\n")
+
+        after = measure(conn, queries, args.repeat)
+        conn.close()
+
+    print(f"{'Запрос':<28}{'до, мс':>12}{'после, мс':>12}{'ускорение':>12}")
+    for (title, before_ms), (_, after_ms) in zip(before, after):
+        speedup = before_ms / after_ms if after_ms else float('inf')
+        print(f"{title:<28}{before_ms:>12.2f}{after_ms:>12.2f}{speedup:>11.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# bench_snapshot.py
+"""Замер времени снимка базы через backup API в зависимости от размера базы.
+
+Для каждого размера снимок делается целиком за один шаг и шагами по
+SNAPSHOT_PAGES страниц; параллельно другое соединение пишет в базу,
+и для обоих вариантов печатается самая долгая запись за время снимка.
+
+Запуск из корня проекта:
+    python benchmarks/bench_snapshot.py --bookings 10000 100000 1000000
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_indexes import fill_database
+from delta_sync import take_snapshot, SNAPSHOT_PAGES, SNAPSHOT_SLEEP
+from migrations import run_migrations
+
+
+def writer(path, stop_event, latencies):
+    """Пишет в базу, как окно регистратора, и запоминает время каждой записи"""
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute('PRAGMA busy_timeout = 30000')
+    while not stop_event.is_set():
+        started = time.perf_counter()
+        with conn:
+            conn.execute("INSERT INTO messages (from_user, to_user, text) VALUES (1, 2, 'текст')")
+        latencies.append(time.perf_counter() - started)
+        time.sleep(0.01)
+    conn.close()
+
+
+def measure(path, target_path, pages, sleep):
+    conn = sqlite3.connect(path)
+    stop_event = threading.Event()
+    latencies = []
+    thread = threading.Thread(target=writer, args=(path, stop_event, latencies))
+    thread.start()
+    time.sleep(0.05)
+
+    started = time.perf_counter()
+    take_snapshot(conn, target_path, pages=pages, sleep=sleep)
+    elapsed = time.perf_counter() - started
+
+    stop_event.set()
+    thread.join()
+    conn.close()
+    os.remove(target_path)
+    return elapsed, max(latencies, default=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замер времени снимка базы")
+    parser.add_argument('--bookings', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--rooms', type=int, default=300)
+    args = parser.parse_args()
+
+    print(f"{'Броней':>10}{'Размер, МБ':>12}{'целиком, с':>13}{'запись, мс':>12}"
+          f"{'шагами, с':>12}{'запись, мс':>12}")
+
+    for bookings in args.bookings:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'bench.db')
+            conn = sqlite3.connect(path)
+            conn.execute('PRAGMA journal_mode = WAL')
+            fill_database(conn, bookings, args.rooms, staff=40, messages=bookings // 5, tasks=bookings // 5)
+            run_migrations(conn)
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            conn.close()
+
+            size_mb = os.path.getsize(path) / 1024 / 1024
+            target_path = os.path.join(tmp_dir, 'snapshot.db')
+            whole, whole_write = measure(path, target_path, -1, 0)
+            paged, paged_write = measure(path, target_path, SNAPSHOT_PAGES, SNAPSHOT_SLEEP)
+
+        print(f"{bookings:>10}{size_mb:>12.1f}{whole:>13.2f}{whole_write * 1000:>12.1f}"
+              f"{paged:>12.2f}{paged_write * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# change_bus.py
+import sqlite3
+
+from PyQt6.QtCore import QObject, QTimer, Qt, pyqtSignal, pyqtSlot
+
+from db_pool import get_connection
+
+# Темы изменений - по одной на таблицу, за которой следят окна
+TASKS = 'maintenance_tasks'
+MESSAGES = 'messages'
+BOOKINGS = 'bookings'
+STAFF = 'staff'
+
+TOPICS = (TASKS, MESSAGES, BOOKINGS, STAFF)
+
+# Как часто проверять изменения от других рабочих станций (мс).
+# Проверка - это один PRAGMA data_version без обращения к таблицам.
+CHECK_INTERVAL = 1000
+
+_bus = None
+# Кэши процесса, которые сверяют ревизию BOOKINGS и др. (индекс занятости, список номеров)
+_caches = []
+
+
+def publish(conn, *topics):
+    """Отмечает изменение тем в текущей транзакции записи.
+
+    Вызывается внутри `with conn:` рядом с самой записью: ревизия темы
+    увеличивается в той же транзакции, поэтому при откате изменение
+    не будет опубликовано.
+    """
+    conn.executemany('''
+        INSERT INTO data_revisions (topic, revision) VALUES (?, 1)
+        ON CONFLICT(topic) DO UPDATE SET revision = revision + 1
+    ''', [(topic,) for topic in topics])
+
+    # Окна этого же процесса узнают об изменении сразу после фиксации
+    if _bus is not None:
+        _bus.poke.emit()
+
+
+def register_cache(cache):
+    """Регистрирует кэш с методом invalidate() - его сбросит refresh_all"""
+    if cache not in _caches:
+        _caches.append(cache)
+
+
+class ChangeBus(QObject):
+    """Шина изменений данных.
+
+    Хранит последние увиденные ревизии тем и вызывает подписчиков тех
+    тем, ревизия которых выросла. Изменения из других процессов
+    замечаются по PRAGMA data_version - SQLite меняет его, когда другое
+    соединение фиксирует транзакцию.
+    """
+
+    changed = pyqtSignal(str, int)
+    poke = pyqtSignal()
+
+    def __init__(self):
+        super().__init__()
+        self.subscribers = {}
+        self.data_version = None
+        self.revisions = self.read_revisions()
+
+        # Очередь событий: проверка выполнится после выхода из `with conn:`
+        self.poke.connect(self.check, Qt.ConnectionType.QueuedConnection)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.check_data_version)
+        self.timer.start(CHECK_INTERVAL)
+
+    def subscribe(self, topic, callback):
+        callbacks = self.subscribers.setdefault(topic, [])
+        if callback not in callbacks:
+            callbacks.append(callback)
+
+    def unsubscribe(self, callback):
+        for callbacks in self.subscribers.values():
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def read_revisions(self):
+        try:
+            cursor = get_connection().execute('SELECT topic, revision FROM data_revisions')
+            return dict(cursor.fetchall())
+        except sqlite3.Error as e:
+            print(f"Ошибка чтения ревизий данных: {e}")
+            return {}
+
+    @pyqtSlot()
+    def refresh_all(self):
+        """Оповещает подписчиков всех тем - например, после замены базы синхронизацией"""
+        # Номер ревизии в новой базе может совпасть с запомненным кэшем
+        for cache in _caches:
+            cache.invalidate()
+        self.revisions = {}
+        self.check()
+
+    def check_data_version(self):
+        try:
+            version = get_connection().execute('PRAGMA data_version').fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"Ошибка проверки версии данных: {e}")
+            return
+
+        if version != self.data_version:
+            self.data_version = version
+            self.check()
+
+    def check(self):
+        current = self.read_revisions()
+
+        for topic, revision in current.items():
+            if revision == self.revisions.get(topic):
+                continue
+
+            self.revisions[topic] = revision
+            self.changed.emit(topic, revision)
+
+            for callback in list(self.subscribers.get(topic, [])):
+                try:
+                    callback()
+                except RuntimeError:
+                    # Окно подписчика уже удалено Qt
+                    self.unsubscribe(callback)
+                except Exception as e:
+                    print(f"Ошибка обработки изменения {topic}: {e}")
+
+
+def get_bus():
+    """Общая шина изменений процесса (создается в потоке интерфейса)"""
+    global _bus
+    if _bus is None:
+        _bus = ChangeBus()
+    return _bus
@@ -0,0 +1,242 @@
+# daily_stats.py
+from collections import namedtuple
+
+from db_pool import get_connection
+
+# Статусы выполненного задания: 'убрано' ставит горничная, 'выполнена' - старые записи
+DONE_STATUSES = ('убрано', 'выполнена')
+
+# Календарь дней для триггеров: в триггерах SQLite нельзя писать WITH RECURSIVE,
+# поэтому дни брони берутся соединением с готовой таблицей дат.
+# Даты броней (тип DATE) в соединении приводятся к TEXT: иначе сравнение идет
+# с числовым приведением, первичный ключ календаря не используется и запрос
+# перебирает весь календарь. CROSS JOIN закрепляет порядок: от броней к календарю
+CALENDAR_START = '2000-01-01'
+CALENDAR_END = '2100-01-01'
+
+PeriodStats = namedtuple('PeriodStats', [
+    'check_ins', 'nights', 'revenue', 'tasks_created', 'tasks_completed', 'avg_cleaning_minutes'
+])
+
+DayStats = namedtuple('DayStats', [
+    'day', 'occupied_rooms', 'check_ins', 'revenue', 'tasks_created', 'tasks_completed', 'avg_cleaning_minutes'
+])
+
+_DONE = ', '.join(f"'{status}'" for status in DONE_STATUSES)
+
+
+def _room_price(row):
+    return f'COALESCE((SELECT price_per_night FROM rooms WHERE id = {row}.room_id), 0)'
+
+
+def _cleaning_seconds(row):
+    return (f'MAX(0, COALESCE((julianday({row}.completed_at) - julianday({row}.created_at)) * 86400, 0))')
+
+
+def _add_booking(row):
+    return f'''
+        INSERT INTO daily_stats (day, occupied_rooms, revenue)
+        SELECT day, 1, {_room_price(row)} FROM stats_calendar
+        WHERE day >= {row}.check_in_date AND day < {row}.check_out_date
+        ON CONFLICT (day) DO UPDATE SET
+            occupied_rooms = occupied_rooms + 1,
+            revenue = revenue + excluded.revenue;
+        INSERT INTO daily_stats (day, check_ins)
+        SELECT {row}.check_in_date, 1 WHERE {row}.check_in_date IS NOT NULL
+        ON CONFLICT (day) DO UPDATE SET check_ins = check_ins + 1;
+    '''
+
+
+def _remove_booking(row):
+    return f'''
+        UPDATE daily_stats SET
+            occupied_rooms = occupied_rooms - 1,
+            revenue = revenue - {_room_price(row)}
+        WHERE day >= {row}.check_in_date AND day < {row}.check_out_date;
+        UPDATE daily_stats SET check_ins = check_ins - 1 WHERE day = {row}.check_in_date;
+    '''
+
+
+def _add_task(row):
+    return f'''
+        INSERT INTO daily_stats (day, tasks_created)
+        SELECT date({row}.created_at, 'localtime'), 1 WHERE date({row}.created_at, 'localtime') IS NOT NULL
+        ON CONFLICT (day) DO UPDATE SET tasks_created = tasks_created + 1;
+        INSERT INTO daily_stats (day, tasks_completed, cleaning_seconds)
+        SELECT date({row}.completed_at, 'localtime'), 1, {_cleaning_seconds(row)}
+        WHERE date({row}.completed_at, 'localtime') IS NOT NULL AND {row}.status IN ({_DONE})
+        ON CONFLICT (day) DO UPDATE SET
+            tasks_completed = tasks_completed + 1,
+            cleaning_seconds = cleaning_seconds + excluded.cleaning_seconds;
+    '''
+
+
+def _remove_task(row):
+    return f'''
+        UPDATE daily_stats SET tasks_created = tasks_created - 1
+        WHERE day = date({row}.created_at, 'localtime');
+        UPDATE daily_stats SET
+            tasks_completed = tasks_completed - 1,
+            cleaning_seconds = cleaning_seconds - {_cleaning_seconds(row)}
+        WHERE day = date({row}.completed_at, 'localtime') AND {row}.status IN ({_DONE});
+    '''
+
+
+# Смена цены номера пересчитывает выручку всех дней с бронями этого номера
+_REPRICE_ROOM = '''
+    UPDATE daily_stats SET revenue = revenue + ({new_price} - COALESCE(old.price_per_night, 0)) * (
+        SELECT COUNT(*) FROM bookings b
+        WHERE b.room_id = old.id AND b.check_in_date <= daily_stats.day AND b.check_out_date > daily_stats.day
+    )
+    WHERE day IN (
+        SELECT c.day FROM bookings b
+        CROSS JOIN stats_calendar c
+            ON c.day >= CAST(b.check_in_date AS TEXT) AND c.day < CAST(b.check_out_date AS TEXT)
+        WHERE b.room_id = old.id
+    );
+'''
+
+TRIGGERS = {
+    'trg_daily_stats_booking_insert': f'AFTER INSERT ON bookings BEGIN {_add_booking("new")} END',
+    'trg_daily_stats_booking_delete': f'AFTER DELETE ON bookings BEGIN {_remove_booking("old")} END',
+    'trg_daily_stats_booking_update': (
+        'AFTER UPDATE OF room_id, check_in_date, check_out_date ON bookings '
+        f'BEGIN {_remove_booking("old")} {_add_booking("new")} END'
+    ),
+    'trg_daily_stats_task_insert': f'AFTER INSERT ON maintenance_tasks BEGIN {_add_task("new")} END',
+    'trg_daily_stats_task_delete': f'AFTER DELETE ON maintenance_tasks BEGIN {_remove_task("old")} END',
+    'trg_daily_stats_task_update': (
+        'AFTER UPDATE OF status, created_at, completed_at ON maintenance_tasks '
+        f'BEGIN {_remove_task("old")} {_add_task("new")} END'
+    ),
+    'trg_daily_stats_room_price': (
+        'AFTER UPDATE OF price_per_night ON rooms '
+        'WHEN new.price_per_night IS NOT old.price_per_night '
+        f'BEGIN {_REPRICE_ROOM.format(new_price="COALESCE(new.price_per_night, 0)")} END'
+    ),
+    'trg_daily_stats_room_delete': (
+        f'AFTER DELETE ON rooms BEGIN {_REPRICE_ROOM.format(new_price="0")} END'
+    ),
+}
+
+
+def install_daily_stats(conn):
+    """Таблица дневной статистики и триггеры, которые ее ведут (шаг миграции)"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stats_calendar (
+            day TEXT PRIMARY KEY
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        INSERT OR IGNORE INTO stats_calendar (day)
+        WITH RECURSIVE days(day) AS (
+            SELECT date(?)
+            UNION ALL
+            SELECT date(day, '+1 day') FROM days WHERE day < date(?, '-1 day')
+        )
+        SELECT day FROM days
+    ''', (CALENDAR_START, CALENDAR_END))
+
+    # Строка на день: занятые номера (проданные ночи) и выручка за ночь,
+    # заезды, созданные и выполненные задания, суммарное время уборки
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS daily_stats (
+            day TEXT PRIMARY KEY,
+            occupied_rooms INTEGER NOT NULL DEFAULT 0,
+            check_ins INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            tasks_created INTEGER NOT NULL DEFAULT 0,
+            tasks_completed INTEGER NOT NULL DEFAULT 0,
+            cleaning_seconds REAL NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    ''')
+
+    for name, body in TRIGGERS.items():
+        conn.execute(f'CREATE TRIGGER IF NOT EXISTS {name} {body}')
+
+    rebuild_daily_stats(conn)
+
+
+def rebuild_daily_stats(conn=None):
+    """Пересчитывает статистику заново по броням и заданиям.
+
+    Обычно не нужен - таблицу ведут триггеры; вызывается при установке
+    и для проверки. Выполняется в транзакции вызывающего кода.
+    """
+    conn = conn or get_connection()
+    conn.execute('DELETE FROM daily_stats')
+    conn.execute('''
+        INSERT INTO daily_stats (day, occupied_rooms, revenue)
+        SELECT c.day, COUNT(*), SUM(COALESCE(r.price_per_night, 0))
+        FROM bookings b
+        CROSS JOIN stats_calendar c
+            ON c.day >= CAST(b.check_in_date AS TEXT) AND c.day < CAST(b.check_out_date AS TEXT)
+        LEFT JOIN rooms r ON r.id = b.room_id
+        GROUP BY c.day
+    ''')
+    conn.execute('''
+        INSERT INTO daily_stats (day, check_ins)
+        SELECT check_in_date, COUNT(*) FROM bookings
+        WHERE check_in_date IS NOT NULL
+        GROUP BY check_in_date
+        ON CONFLICT (day) DO UPDATE SET check_ins = excluded.check_ins
+    ''')
+    conn.execute('''
+        INSERT INTO daily_stats (day, tasks_created)
+        SELECT date(created_at, 'localtime'), COUNT(*) FROM maintenance_tasks
+        WHERE date(created_at, 'localtime') IS NOT NULL
+        GROUP BY 1
+        ON CONFLICT (day) DO UPDATE SET tasks_created = excluded.tasks_created
+    ''')
+    conn.execute(f'''
+        INSERT INTO daily_stats (day, tasks_completed, cleaning_seconds)
+        SELECT date(completed_at, 'localtime'), COUNT(*), SUM({_cleaning_seconds('maintenance_tasks')})
+        FROM maintenance_tasks
+        WHERE date(completed_at, 'localtime') IS NOT NULL AND status IN ({_DONE})
+        GROUP BY 1
+        ON CONFLICT (day) DO UPDATE SET
+            tasks_completed = excluded.tasks_completed,
+            cleaning_seconds = excluded.cleaning_seconds
+    ''')
+
+
+def _avg_minutes(cleaning_seconds, tasks_completed):
+    return cleaning_seconds / tasks_completed / 60 if tasks_completed else 0
+
+
+def period_stats(start_date, end_date, conn=None):
+    """Итоги за дни с start_date по end_date включительно (даты ГГГГ-ММ-ДД)"""
+    conn = conn or get_connection()
+    row = conn.execute('''
+        SELECT COALESCE(SUM(check_ins), 0), COALESCE(SUM(occupied_rooms), 0), COALESCE(SUM(revenue), 0),
+               COALESCE(SUM(tasks_created), 0), COALESCE(SUM(tasks_completed), 0),
+               COALESCE(SUM(cleaning_seconds), 0)
+        FROM daily_stats
+        WHERE day BETWEEN ? AND ?
+    ''', (start_date, end_date)).fetchone()
+
+    check_ins, nights, revenue, tasks_created, tasks_completed, cleaning_seconds = row
+    return PeriodStats(check_ins, nights, revenue, tasks_created, tasks_completed,
+                       _avg_minutes(cleaning_seconds, tasks_completed))
+
+
+def daily_rows(start_date, end_date, conn=None):
+    """Статистика по дням периода (только дни, где что-то было)"""
+    conn = conn or get_connection()
+    cursor = conn.execute('''
+        SELECT day, occupied_rooms, check_ins, revenue, tasks_created, tasks_completed, cleaning_seconds
+        FROM daily_stats
+        WHERE day BETWEEN ? AND ?
+        AND (occupied_rooms OR check_ins OR tasks_created OR tasks_completed)
+        ORDER BY day
+    ''', (start_date, end_date))
+
+    return [DayStats(day, occupied, check_ins, revenue, created, completed, _avg_minutes(seconds, completed))
+            for day, occupied, check_ins, revenue, created, completed, seconds in cursor]
+
+
+if __name__ == '__main__':
+    conn = get_connection()
+    with conn:
+        rebuild_daily_stats(conn)
+    print("Дневная статистика пересчитана")
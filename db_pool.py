@@ -0,0 +1,91 @@
+# db_pool.py
+import atexit
+import sqlite3
+import threading
+
+from utils import get_database_path
+
+# Сколько ждать снятия блокировки другой рабочей станцией (секунды)
+BUSY_TIMEOUT = 10
+# Размер кэша подготовленных запросов на одно соединение
+CACHED_STATEMENTS = 256
+
+_local = threading.local()
+_lock = threading.Lock()
+_connections = []
+# Растет при закрытии всех соединений: поток, у которого соединение уже
+# закрыто, при следующем обращении откроет новое
+_generation = 0
+
+
+def _open_connection():
+    """Открывает новое соединение с базой и настраивает его"""
+    conn = sqlite3.connect(
+        get_database_path(),
+        timeout=BUSY_TIMEOUT,
+        cached_statements=CACHED_STATEMENTS,
+        check_same_thread=False
+    )
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT * 1000}')
+    return conn
+
+
+def get_connection():
+    """Соединение текущего потока с базой данных.
+
+    Соединение создается при первом обращении и дальше переиспользуется,
+    поэтому закрывать его после запроса не нужно. Запись оборачивается
+    в `with conn:` - при ошибке транзакция откатывается.
+    """
+    conn = getattr(_local, 'connection', None)
+
+    if conn is not None and _local.generation != _generation:
+        _forget(conn)
+        conn = None
+
+    if conn is None:
+        conn = _open_connection()
+        with _lock:
+            _connections.append(conn)
+        _local.connection = conn
+        _local.generation = _generation
+
+    return conn
+
+
+def _forget(conn):
+    with _lock:
+        if conn in _connections:
+            _connections.remove(conn)
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+    _local.connection = None
+
+
+def close_connection():
+    """Закрывает соединение текущего потока (например, при завершении рабочего потока)"""
+    conn = getattr(_local, 'connection', None)
+    if conn is not None:
+        _forget(conn)
+
+
+def close_all_connections():
+    """Закрывает все открытые соединения (при выходе из приложения)"""
+    global _generation
+    with _lock:
+        _generation += 1
+        connections = list(_connections)
+        _connections.clear()
+
+    for conn in connections:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+
+atexit.register(close_all_connections)
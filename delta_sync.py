@@ -0,0 +1,277 @@
+# delta_sync.py
+import hashlib
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import tempfile
+import time
+
+from change_bus import TOPICS
+from db_pool import get_connection
+from replication import adopt_restored_database
+
+MANIFEST_PATH = "manifest.json"
+CHUNKS_DIR = "chunks"
+# Размер куска в страницах SQLite (при странице 4 КБ кусок - 64 КБ)
+CHUNK_PAGES = 16
+MANIFEST_FORMAT = 1
+# Снимок копируется шагами по SNAPSHOT_PAGES страниц с паузой между ними,
+# чтобы запись в базу из окон не ждала окончания копирования
+SNAPSHOT_PAGES = 1024
+SNAPSHOT_SLEEP = 0.005
+
+
+class DeltaSyncError(Exception):
+    pass
+
+
+def take_snapshot(conn, path, pages=SNAPSHOT_PAGES, sleep=SNAPSHOT_SLEEP, progress=None):
+    """Согласованная копия базы через backup API.
+
+    Копирование идет шагами, все шаги читают одно состояние базы: на
+    время копирования на исходном соединении открыта читающая транзакция.
+    Без нее каждая запись из другого соединения начинала бы копию заново,
+    и при частой записи снимок не заканчивался бы. В режиме WAL читающая
+    транзакция запись не блокирует.
+    progress(статус, осталось_страниц, всего_страниц) вызывается после каждого шага.
+    """
+    own_transaction = not conn.in_transaction
+    if own_transaction:
+        conn.execute('BEGIN')
+        conn.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+
+    target = sqlite3.connect(path)
+    try:
+        conn.backup(target, pages=pages, sleep=sleep, progress=progress)
+        # Копия хранится в обычном режиме журнала, чтобы весь файл был одним куском данных
+        target.execute('PRAGMA journal_mode = DELETE')
+    finally:
+        target.close()
+        if own_transaction:
+            conn.rollback()
+
+
+def restore_snapshot(path, conn):
+    """Переносит базу из файла path в рабочую через backup API.
+
+    Файл рабочей базы не подменяется: копирование идет одной транзакцией
+    через соединение conn, поэтому открытые соединения других потоков
+    (окна, планировщик) и файлы -wal/-shm остаются согласованными.
+    После копирования ревизии тем становятся больше прежних локальных,
+    а журнал репликации согласуется с новой базой.
+    """
+    source = sqlite3.connect(path)
+    try:
+        result = source.execute('PRAGMA integrity_check').fetchone()[0]
+        if result != 'ok':
+            raise DeltaSyncError(f"Полученная база повреждена: {result}")
+
+        if conn.in_transaction:
+            conn.commit()
+        # Ревизии из чужой базы могут совпасть с локальными, и кэши (индекс
+        # занятости, список номеров) решат, что данные не менялись
+        revisions = dict(conn.execute('SELECT topic, revision FROM data_revisions'))
+        source.backup(conn)
+    finally:
+        source.close()
+
+    with conn:
+        conn.executemany('''
+            INSERT INTO data_revisions (topic, revision) VALUES (?, ?)
+            ON CONFLICT(topic) DO UPDATE SET revision = MAX(revision, excluded.revision - 1) + 1
+        ''', [(topic, revisions.get(topic, 0) + 1) for topic in TOPICS])
+        adopt_restored_database(conn)
+
+
+def chunk_hashes(path, chunk_size):
+    hashes = []
+    with open(path, 'rb') as file:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            hashes.append(hashlib.sha256(chunk).hexdigest())
+    return hashes
+
+
+def read_chunk(path, index, chunk_size):
+    with open(path, 'rb') as file:
+        file.seek(index * chunk_size)
+        return file.read(chunk_size)
+
+
+class DeltaSync:
+    """Синхронизация базы кусками.
+
+    Файл базы делится на куски по CHUNK_PAGES страниц, в хранилище
+    лежат манифест (список хэшей кусков) и сами куски под именами-хэшами.
+    Отправляются и скачиваются только куски, которых нет на другой стороне.
+    Скачанная версия собирается во временном файле и применяется к рабочей
+    базе через backup API - одной транзакцией, под открытыми соединениями.
+    """
+
+    def __init__(self, storage, conn=None, state_path=None):
+        self.storage = storage
+        self.conn = conn
+        # Файл с номером версии, до которой синхронизирована локальная база
+        self.state_path = state_path
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.local_version = self.load_state()
+        # Метка версии манифеста в хранилище, которую уже проверяли
+        self.seen_revision = None
+
+    def load_state(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return 0
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as file:
+                return int(json.load(file).get('version', 0))
+        except (OSError, ValueError):
+            return 0
+
+    def save_state(self, version):
+        self.local_version = version
+        if not self.state_path:
+            return
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump({'version': version}, file)
+        os.replace(tmp_path, self.state_path)
+
+    def connection(self):
+        return self.conn or get_connection()
+
+    def remote_manifest(self):
+        if not self.storage.exists(MANIFEST_PATH):
+            return None
+        try:
+            manifest = json.loads(self.storage.read_bytes(MANIFEST_PATH).decode('utf-8'))
+        except (ValueError, UnicodeDecodeError) as e:
+            raise DeltaSyncError(f"Поврежден манифест синхронизации: {e}")
+        if manifest.get('format') != MANIFEST_FORMAT:
+            raise DeltaSyncError(f"Неизвестный формат манифеста: {manifest.get('format')}")
+        return manifest
+
+    def chunk_size(self, conn):
+        page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+        return page_size * CHUNK_PAGES
+
+    def has_remote_update(self):
+        """Есть ли в хранилище версия новее локальной.
+
+        Обычно это одно обращение к хранилищу - метка версии манифеста;
+        сам манифест читается, только если метка изменилась.
+        """
+        revision = self.storage.revision(MANIFEST_PATH)
+        if revision is None:
+            return False
+        if revision == self.seen_revision:
+            return False
+
+        manifest = self.remote_manifest()
+        if manifest is not None and manifest['version'] > self.local_version:
+            # Метку не запоминаем, пока новая версия не применена
+            return True
+        self.seen_revision = revision
+        return False
+
+    def push(self):
+        """Отправляет в хранилище изменившиеся куски и новый манифест.
+
+        Возвращает число отправленных кусков.
+        """
+        conn = self.connection()
+        chunk_size = self.chunk_size(conn)
+        previous = self.remote_manifest()
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            snapshot_path = os.path.join(tmp_dir, 'snapshot.db')
+            take_snapshot(conn, snapshot_path)
+            hashes = chunk_hashes(snapshot_path, chunk_size)
+
+            if previous and previous['chunks'] == hashes and previous['chunk_size'] == chunk_size:
+                self.save_state(previous['version'])
+                return 0
+
+            remote_chunks = set(self.storage.list(CHUNKS_DIR))
+            sent = 0
+            for index, chunk_hash in enumerate(hashes):
+                if chunk_hash in remote_chunks:
+                    continue
+                self.storage.write_bytes(f"{CHUNKS_DIR}/{chunk_hash}",
+                                         read_chunk(snapshot_path, index, chunk_size))
+                remote_chunks.add(chunk_hash)
+                sent += 1
+
+            manifest = {
+                'format': MANIFEST_FORMAT,
+                'version': (previous['version'] if previous else 0) + 1,
+                'chunk_size': chunk_size,
+                'size': os.path.getsize(snapshot_path),
+                'chunks': hashes,
+                'created_at': time.time(),
+                'source': self.worker_id,
+            }
+            # Манифест пишется последним: до этого момента читатели видят прежнюю версию
+            self.storage.write_bytes(MANIFEST_PATH, json.dumps(manifest).encode('utf-8'))
+
+        self.save_state(manifest['version'])
+        self.collect_garbage(manifest, previous)
+        return sent
+
+    def pull(self):
+        """Скачивает недостающие куски и применяет новую версию к базе.
+
+        Возвращает число скачанных кусков или None, если обновлений нет.
+        """
+        manifest = self.remote_manifest()
+        if manifest is None or manifest['version'] <= self.local_version:
+            return None
+
+        conn = self.connection()
+        chunk_size = manifest['chunk_size']
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            local_path = os.path.join(tmp_dir, 'local.db')
+            take_snapshot(conn, local_path)
+            local_hashes = chunk_hashes(local_path, chunk_size)
+
+            new_path = os.path.join(tmp_dir, 'new.db')
+            shutil.copyfile(local_path, new_path)
+
+            received = 0
+            with open(new_path, 'r+b') as file:
+                for index, chunk_hash in enumerate(manifest['chunks']):
+                    if index < len(local_hashes) and local_hashes[index] == chunk_hash:
+                        continue
+
+                    data = self.storage.read_bytes(f"{CHUNKS_DIR}/{chunk_hash}")
+                    if hashlib.sha256(data).hexdigest() != chunk_hash:
+                        raise DeltaSyncError(f"Кусок {index} поврежден при передаче")
+
+                    file.seek(index * chunk_size)
+                    file.write(data)
+                    received += 1
+
+                file.truncate(manifest['size'])
+
+            self.apply(new_path, conn)
+
+        self.save_state(manifest['version'])
+        return received
+
+    def apply(self, path, conn):
+        """Переносит собранную базу в рабочую через backup API"""
+        restore_snapshot(path, conn)
+
+    def collect_garbage(self, manifest, previous):
+        """Удаляет куски, на которые не ссылаются текущий и предыдущий манифесты"""
+        keep = set(manifest['chunks'])
+        if previous:
+            keep.update(previous['chunks'])
+
+        for name in self.storage.list(CHUNKS_DIR):
+            if name not in keep:
+                self.storage.delete(f"{CHUNKS_DIR}/{name}")
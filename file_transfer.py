@@ -0,0 +1,171 @@
+# file_transfer.py
+import gzip
+import hashlib
+import json
+import os
+import zlib
+
+# Размер части до сжатия
+PART_SIZE = 1024 * 1024
+COMPRESS_LEVEL = 6
+TRANSFER_FORMAT = 1
+
+
+class TransferError(Exception):
+    pass
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(PART_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class StreamTransfer:
+    """Передача файла в хранилище частями со сжатием gzip.
+
+    Файл режется на части по PART_SIZE, каждая сжимается отдельно и
+    кладется в хранилище как <имя>.parts/<хэш>-<номер>.gz, последним
+    пишется манифест <имя>.json с размером и SHA-256 всего файла.
+    Прерванная отправка продолжается с первой недостающей части,
+    прерванное скачивание - с части, на которой остановилось.
+    Хранилище - любой объект с интерфейсом sync_storage (LocalStorage,
+    YandexDiskStorage).
+    """
+
+    def __init__(self, storage, part_size=PART_SIZE):
+        self.storage = storage
+        self.part_size = part_size
+
+    def manifest_path(self, remote_name):
+        return f"{remote_name}.json"
+
+    def parts_dir(self, remote_name):
+        return f"{remote_name}.parts"
+
+    def part_name(self, checksum, index):
+        return f"{checksum[:16]}-{index:05d}.gz"
+
+    def remote_manifest(self, remote_name):
+        path = self.manifest_path(remote_name)
+        if not self.storage.exists(path):
+            return None
+        try:
+            manifest = json.loads(self.storage.read_bytes(path).decode('utf-8'))
+        except (ValueError, UnicodeDecodeError) as e:
+            raise TransferError(f"Поврежден манифест {path}: {e}")
+        if manifest.get('format') != TRANSFER_FORMAT:
+            raise TransferError(f"Неизвестный формат манифеста {path}")
+        return manifest
+
+    def upload(self, local_path, remote_name, progress=None):
+        """Отправляет файл. progress(отправлено_байт, всего_байт) вызывается после каждой части"""
+        if not os.path.exists(local_path):
+            raise TransferError(f"Файл {local_path} не найден")
+
+        size = os.path.getsize(local_path)
+        checksum = file_sha256(local_path)
+        parts_count = (size + self.part_size - 1) // self.part_size
+        parts_dir = self.parts_dir(remote_name)
+
+        manifest = self.remote_manifest(remote_name)
+        if manifest and manifest['sha256'] == checksum:
+            if progress:
+                progress(size, size)
+            return 0
+
+        # Части этого же файла, отправленные до обрыва
+        uploaded = set(self.storage.list(parts_dir))
+        sent = 0
+
+        with open(local_path, 'rb') as file:
+            for index in range(parts_count):
+                name = self.part_name(checksum, index)
+                if name in uploaded:
+                    continue
+
+                file.seek(index * self.part_size)
+                data = file.read(self.part_size)
+                self.storage.write_bytes(f"{parts_dir}/{name}",
+                                         gzip.compress(data, compresslevel=COMPRESS_LEVEL))
+                sent += 1
+
+                if progress:
+                    progress(min((index + 1) * self.part_size, size), size)
+
+        manifest = {
+            'format': TRANSFER_FORMAT,
+            'size': size,
+            'sha256': checksum,
+            'part_size': self.part_size,
+            'parts': parts_count,
+        }
+        self.storage.write_bytes(self.manifest_path(remote_name), json.dumps(manifest).encode('utf-8'))
+
+        # Части прежних версий больше не нужны
+        prefix = checksum[:16] + '-'
+        for name in self.storage.list(parts_dir):
+            if not name.startswith(prefix):
+                self.storage.delete(f"{parts_dir}/{name}")
+
+        if progress:
+            progress(size, size)
+        return sent
+
+    def download(self, remote_name, local_path, progress=None):
+        """Скачивает файл в local_path. Файл заменяется только после проверки контрольной суммы"""
+        manifest = self.remote_manifest(remote_name)
+        if manifest is None:
+            raise TransferError(f"Файл {remote_name} не найден в хранилище")
+
+        size = manifest['size']
+        part_size = manifest['part_size']
+        partial_path = local_path + '.download'
+        state_path = partial_path + '.json'
+
+        # Продолжаем прерванное скачивание той же версии файла
+        done = 0
+        if os.path.exists(partial_path) and os.path.exists(state_path):
+            try:
+                with open(state_path, 'r', encoding='utf-8') as file:
+                    state = json.load(file)
+                if state.get('sha256') == manifest['sha256']:
+                    done = int(state.get('parts', 0))
+            except (OSError, ValueError):
+                done = 0
+
+        mode = 'r+b' if done else 'wb'
+        with open(partial_path, mode) as file:
+            file.seek(done * part_size)
+            file.truncate()
+
+            for index in range(done, manifest['parts']):
+                name = self.part_name(manifest['sha256'], index)
+                compressed = self.storage.read_bytes(f"{self.parts_dir(remote_name)}/{name}")
+                try:
+                    data = gzip.decompress(compressed)
+                except (OSError, EOFError, zlib.error) as e:
+                    raise TransferError(f"Часть {index} повреждена: {e}")
+
+                file.write(data)
+                file.flush()
+                with open(state_path, 'w', encoding='utf-8') as state_file:
+                    json.dump({'sha256': manifest['sha256'], 'parts': index + 1}, state_file)
+
+                if progress:
+                    progress(min((index + 1) * part_size, size), size)
+
+        if os.path.getsize(partial_path) != size or file_sha256(partial_path) != manifest['sha256']:
+            os.remove(partial_path)
+            if os.path.exists(state_path):
+                os.remove(state_path)
+            raise TransferError("Контрольная сумма скачанного файла не совпадает")
+
+        os.replace(partial_path, local_path)
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        if progress:
+            progress(size, size)
+        return size
@@ -12,8 +12,11 @@ from regist.regist_script import RegistrarWindow
 from staff.staff_script import StaffWindow
 
 from sync_update import SimpleAutoSync
+from migrations import run_migrations, MigrationError
+from scheduler import Scheduler
 
-from utils import get_resource_path, get_database_path
+from utils import get_resource_path
+from session import open_session
 
 class EmptyCredentialsError(Exception):
     pass
@@ -68,28 +71,9 @@ class LoginWindow(QMainWindow):
         return hashlib.sha256(password.encode()).hexdigest()
 
     def verify_credentials(self, username, password):
+        # Сессия: id, роль и имя пользователя определяются один раз при входе
         try:
-            db_path = get_database_path()
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-
-            password_hash = self.hash_password(password)
-
-            cursor.execute('''
-                SELECT first_name, last_name, position FROM staff 
-                WHERE login = ? AND password_hash = ?
-            ''', (username, password_hash))
-
-            result = cursor.fetchone()
-            conn.close()
-
-            if result:
-                return {
-                    'first_name': result[0],
-                    'last_name': result[1],
-                    'position': result[2]
-                }
-            return None
+            return open_session(username, self.hash_password(password))
 
         except sqlite3.Error as e:
             QMessageBox.warning(self, "Ошибка", "Ошибка базы данных")
@@ -107,18 +91,16 @@ class LoginWindow(QMainWindow):
             if not username or not password:
                 raise EmptyCredentialsError("Введите логин и пароль")
 
-            user_info = self.verify_credentials(username, password)
+            session = self.verify_credentials(username, password)
 
-            if not user_info:
+            if not session:
                 raise InvalidCredentialsError("Неверный логин или пароль")
 
             remember_me = self.remember_me_checkbox.isChecked()
 
             self.save_credentials(username, password, remember_me)
 
-            position = user_info['position']
-            full_name = f"{user_info['first_name']} {user_info['last_name']}"
-            self.open_role_window(position, full_name, username)
+            self.open_role_window(session)
 
         except EmptyCredentialsError as e:
             QMessageBox.warning(self, "Ошибка ввода", str(e))
@@ -127,20 +109,21 @@ class LoginWindow(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, "Неизвестная ошибка", f"Произошла непредвиденная ошибка: {str(e)}")
 
-    def open_role_window(self, position, full_name, username):
+    def open_role_window(self, session):
         self.hide()
+        position = session.position
         if position == "обслуживающий персонал":
-            self.staff_window = StaffWindow(full_name, username)
+            self.staff_window = StaffWindow(session)
             self.staff_window.show()
             self.staff_window.closed.connect(self.show_login)
 
         elif position == "администратор":
-            self.admin_window = AdminWindow(full_name, username)
+            self.admin_window = AdminWindow(session)
             self.admin_window.show()
             self.admin_window.closed.connect(self.show_login)
 
         elif position == "регистратор":
-            self.registrar_window = RegistrarWindow(full_name, username)
+            self.registrar_window = RegistrarWindow(session)
             self.registrar_window.show()
             self.registrar_window.closed.connect(self.show_login)
 
@@ -151,6 +134,18 @@ class LoginWindow(QMainWindow):
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+
+    try:
+        run_migrations()
+    except MigrationError as e:
+        QMessageBox.critical(None, "Ошибка базы данных", str(e))
+    else:
+        # Периодические задачи (уборка после выезда, резервные копии и т.д.);
+        # без миграций их таблиц нет, поэтому планировщик не запускается
+        scheduler = Scheduler()
+        scheduler.start()
+        app.aboutToQuit.connect(scheduler.stop)
+
     window = LoginWindow()
     window.show()
     sys.exit(app.exec())
\ No newline at end of file
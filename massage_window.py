@@ -1,13 +1,16 @@
-import pickle
 import sqlite3
 
 from PyQt6.QtCore import Qt
-from PyQt6.QtWidgets import QDialog, QMainWindow, QMessageBox
+from PyQt6.QtWidgets import QDialog, QMainWindow, QMessageBox, QListWidgetItem
 from PyQt6 import uic
 
 
 from bd_manager import YandexDiskUploader
-from utils import get_resource_path, get_database_path
+from utils import get_resource_path
+from db_pool import get_connection
+from message_codec import encode_message
+from change_bus import publish, MESSAGES
+from session import get_staff_directory
 
 
 class EmptyRecipientError(Exception):
@@ -19,14 +22,16 @@ class EmptyMassageError(Exception):
 
 
 class MassageWindow(QDialog):
-    def __init__(self,full_name, parent=None):
+    def __init__(self, session, parent=None):
         super().__init__(parent)
         uic.loadUi(get_resource_path('UI/Reg/Окно отправки сообщений.ui'), self)
         self.setWindowTitle("Отправка сообщений")
 
-        self.full_name = full_name
+        self.session = session
+        self.full_name = session.full_name
+        self.recipient_id = None
         self.load_staff('')
-        self.search_recipient_input.textChanged.connect(lambda: self.load_staff(self.search_recipient_input.text().title()))
+        self.search_recipient_input.textChanged.connect(self.load_staff)
         self.recipients_list.itemClicked.connect(self.selected_recipient)
 
         self.send_button.clicked.connect(self.send_message)
@@ -68,16 +73,14 @@ class MassageWindow(QDialog):
 
     def selected_recipient(self, item):
         self.recipient = item.text()
+        self.recipient_id = item.data(Qt.ItemDataRole.UserRole)
         self.selected_recipient_label.setText("Отправить: " + self.recipient)
 
     def send_message(self):
         try:
-            binary_message = pickle.dumps(self.message_text_edit.toPlainText())
-
-            db_path = get_database_path()
-            con = sqlite3.connect(db_path)
-            cur = con.cursor()
+            message_text = encode_message(self.message_text_edit.toPlainText())
 
+            con = get_connection()
 
             if not hasattr(self, 'recipient') or not self.recipient:
                 raise EmptyRecipientError("Не выбран получатель")
@@ -85,37 +88,16 @@ class MassageWindow(QDialog):
             if not self.message_text_edit.toPlainText().strip():
                 raise EmptyMassageError("Введите текст сообщения")
 
-            recipient_parts = self.recipient.split()
-            # if len(recipient_parts) < 2:
-            #     raise ValueError("Некорректное имя получателя")
-            #
-            sender_parts = self.full_name.split()
-            # if len(sender_parts) < 2:
-            #     raise ValueError("Некорректное имя отправителя")
-
-
-            cur.execute('''SELECT id FROM staff WHERE last_name = ? AND first_name = ?''',
-                        (recipient_parts[0], recipient_parts[1]))
-            recipient_result = cur.fetchone()
-            if not recipient_result:
-                raise sqlite3.Error("Получатель не найден в базе данных")
-            self.id_recipient = recipient_result[0]
-
+            # id получателя хранится в строке списка, id отправителя - в сессии
+            self.id_recipient = self.recipient_id
+            self.id_sender = self.session.user_id
 
-            cur.execute('''SELECT id FROM staff WHERE last_name = ? AND first_name = ?''',
-                        (sender_parts[1], sender_parts[0]))
-            sender_result = cur.fetchone()
-            if not sender_result:
-                raise ValueError("Отправитель не найден в базе данных")
-            self.id_sender = sender_result[0]
+            with con:
+                con.execute('''INSERT INTO messages (from_user, to_user, text)
+                                VALUES (?, ?, ?)''',
+                            (self.id_sender, self.id_recipient, message_text))
+                publish(con, MESSAGES)
 
-
-            cur.execute('''INSERT INTO messages (from_user, to_user, text)
-                            VALUES (?, ?, ?)''',
-                        (self.id_sender, self.id_recipient, binary_message))
-
-            con.commit()
-            con.close()
             QMessageBox.information(self, "Успех",
                                     f"Сообщение отправлено")
             self.close()
@@ -130,32 +112,18 @@ class MassageWindow(QDialog):
             QMessageBox.critical(self, "Ошибка", str(e))
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", str(e))
-        finally:
-            if 'con' in locals():
-                con.close()
 
 
     def load_staff(self, name):
         try:
-            db_path = get_database_path()
-            conn =sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            if name and name.strip():
-                search_pattern = f'{name}%'
-                cursor.execute('''
-                                    SELECT last_name || ' ' || first_name || ' (' || position || ')' as staff_name 
-                                    FROM staff WHERE first_name LIKE ? OR last_name LIKE ? 
-                                    ORDER BY last_name, first_name
-                                    ''', (search_pattern, search_pattern))
-            else:
-                cursor.execute('''
-                                    SELECT last_name || ' ' || first_name || ' (' || position || ')' as staff_name 
-                                    FROM staff 
-                                    ORDER BY last_name, first_name
-                                    ''')
+            # Поиск по индексу справочника в памяти, без запроса на каждое нажатие клавиши
+            members = get_staff_directory().search(name)
+
             self.recipients_list.clear()
-            self.recipients_list.addItems(row[0] for row in cursor.fetchall())
-            conn.close()
+            for member in members:
+                item = QListWidgetItem(f"{member.last_name} {member.first_name} ({member.position})")
+                item.setData(Qt.ItemDataRole.UserRole, member.id)
+                self.recipients_list.addItem(item)
 
 
         except sqlite3.Error as e:
@@ -0,0 +1,79 @@
+# message_codec.py
+import io
+import pickle
+from functools import lru_cache
+
+# Сколько раскодированных сообщений держать в памяти
+DECODE_CACHE_SIZE = 1024
+
+
+class MessageDecodeError(Exception):
+    pass
+
+
+class _TextOnlyUnpickler(pickle.Unpickler):
+    """Читает только старые сообщения-строки: любые классы и функции запрещены"""
+
+    def find_class(self, module, name):
+        raise MessageDecodeError(f"Недопустимый объект в сообщении: {module}.{name}")
+
+
+def encode_message(text):
+    """Текст сообщения для записи в messages.text (обычная строка UTF-8)"""
+    if text is None:
+        return ""
+    if isinstance(text, bytes):
+        return text.decode('utf-8', errors='replace')
+    return str(text)
+
+
+def _decode_legacy(data):
+    # Сообщения старых версий хранились как pickle.dumps(строка)
+    try:
+        value = _TextOnlyUnpickler(io.BytesIO(data)).load()
+    except (MessageDecodeError, pickle.UnpicklingError, EOFError, ValueError, TypeError, IndexError):
+        return data.decode('utf-8', errors='replace')
+
+    if isinstance(value, bytes):
+        return value.decode('utf-8', errors='replace')
+    return str(value)
+
+
+@lru_cache(maxsize=DECODE_CACHE_SIZE)
+def _decode_cached(data):
+    return _decode_legacy(data)
+
+
+def decode_message(value):
+    """Текст сообщения из значения столбца messages.text"""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return _decode_cached(bytes(value))
+    return str(value)
+
+
+def convert_legacy_messages(conn, batch_size=500):
+    """Перекодирует сохраненные через pickle сообщения в текст. Возвращает число строк"""
+    converted = 0
+    last_id = 0
+
+    while True:
+        rows = conn.execute('''
+            SELECT id, text FROM messages
+            WHERE typeof(text) = 'blob' AND id > ?
+            ORDER BY id
+            LIMIT ?
+        ''', (last_id, batch_size)).fetchall()
+
+        if not rows:
+            break
+
+        conn.executemany('UPDATE messages SET text = ? WHERE id = ?',
+                         [(_decode_legacy(bytes(text)), message_id) for message_id, text in rows])
+        converted += len(rows)
+        last_id = rows[-1][0]
+
+    return converted
@@ -0,0 +1,167 @@
+# migrations.py
+import sqlite3
+
+from db_pool import get_connection
+from message_codec import convert_legacy_messages
+from replication import install_change_log, install_row_versions
+from daily_stats import install_daily_stats
+from regist.guest_search import install_guest_search
+
+
+# Каждая миграция: (версия, описание, список шагов).
+# Шаг - это SQL-строка или функция, принимающая соединение.
+MIGRATIONS = [
+    (1, "Таблица заданий на уборку", [
+        '''CREATE TABLE IF NOT EXISTS maintenance_tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                room_number VARCHAR(10) NOT NULL,
+                description TEXT NOT NULL,
+                assigned_to INTEGER,
+                created_by INTEGER NOT NULL,
+                status VARCHAR(20) DEFAULT 'в ожидании уборки',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                completed_at TIMESTAMP,
+                notes TEXT,
+                FOREIGN KEY (assigned_to) REFERENCES staff(id) ON DELETE SET NULL,
+                FOREIGN KEY (created_by) REFERENCES staff(id) ON DELETE RESTRICT
+            )''',
+    ]),
+    (2, "Индексы для бронирований, сообщений и заданий", [
+        # Шахматка, проверка свободных номеров, поиск брони по номеру и дате.
+        # Дата выезда идет раньше даты заезда: условие check_out_date >= ?
+        # отсекает всю прошлую историю номера, а check_in_date <= ? - нет.
+        '''CREATE INDEX IF NOT EXISTS idx_bookings_room_dates
+               ON bookings (room_id, check_out_date, check_in_date)''',
+        # Выезды за день и пересечения периодов
+        '''CREATE INDEX IF NOT EXISTS idx_bookings_check_out
+               ON bookings (check_out_date, check_in_date)''',
+        # Отчеты и статистика за период
+        '''CREATE INDEX IF NOT EXISTS idx_bookings_check_in
+               ON bookings (check_in_date)''',
+        # Непрочитанные уведомления пользователя
+        '''CREATE INDEX IF NOT EXISTS idx_messages_inbox
+               ON messages (to_user, is_read, created_at)''',
+        # Статусы номеров и поиск активного задания по номеру
+        '''CREATE INDEX IF NOT EXISTS idx_tasks_status_room
+               ON maintenance_tasks (status, room_number, assigned_to)''',
+        # Задания сотрудника и неназначенные задания
+        '''CREATE INDEX IF NOT EXISTS idx_tasks_assigned
+               ON maintenance_tasks (assigned_to, status)''',
+        'ANALYZE',
+    ]),
+    (3, "Ревизии данных для шины изменений", [
+        '''CREATE TABLE IF NOT EXISTS data_revisions (
+                topic TEXT PRIMARY KEY,
+                revision INTEGER NOT NULL DEFAULT 0
+            )''',
+        '''INSERT OR IGNORE INTO data_revisions (topic, revision)
+               VALUES ('maintenance_tasks', 0), ('messages', 0), ('bookings', 0)''',
+    ]),
+    (4, "Текст сообщений вместо pickle", [
+        convert_legacy_messages,
+    ]),
+    (5, "Фоновый планировщик задач", [
+        # Строка на задачу - одновременно расписание и блокировка между рабочими станциями
+        '''CREATE TABLE IF NOT EXISTS scheduler_jobs (
+                name TEXT PRIMARY KEY,
+                last_run_at REAL,
+                last_result TEXT,
+                last_error TEXT,
+                locked_by TEXT,
+                locked_until REAL
+            )''',
+        # Задания, о которых уже сообщили администраторам
+        '''CREATE TABLE IF NOT EXISTS task_escalations (
+                task_id INTEGER PRIMARY KEY,
+                escalated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (task_id) REFERENCES maintenance_tasks(id) ON DELETE CASCADE
+            )''',
+    ]),
+    (6, "Журнал изменений строк для репликации", [
+        install_change_log,
+    ]),
+    (7, "Полнотекстовый поиск гостей", [
+        install_guest_search,
+    ]),
+    (8, "Дневная статистика загрузки, выручки и уборки", [
+        install_daily_stats,
+    ]),
+    (9, "Версии строк для разрешения конфликтов репликации", [
+        install_row_versions,
+    ]),
+]
+
+
+class MigrationError(Exception):
+    pass
+
+
+def _ensure_version_table(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def get_schema_version(conn=None):
+    """Текущая версия схемы базы (0 - миграции еще не применялись)"""
+    conn = conn or get_connection()
+    _ensure_version_table(conn)
+    result = conn.execute('SELECT MAX(version) FROM schema_version').fetchone()
+    return result[0] or 0
+
+
+def _apply(conn, version, description, steps):
+    # BEGIN IMMEDIATE: две рабочие станции не применят одну миграцию дважды
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        applied = conn.execute('SELECT 1 FROM schema_version WHERE version = ?', (version,)).fetchone()
+        if applied:
+            conn.rollback()
+            return False
+
+        for step in steps:
+            if callable(step):
+                step(conn)
+            else:
+                conn.execute(step)
+
+        conn.execute('INSERT INTO schema_version (version, description) VALUES (?, ?)',
+                     (version, description))
+        conn.commit()
+        return True
+
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def run_migrations(conn=None):
+    """Применяет к базе все недостающие миграции, возвращает список примененных версий"""
+    conn = conn or get_connection()
+    if conn.in_transaction:
+        conn.commit()
+
+    _ensure_version_table(conn)
+    current_version = get_schema_version(conn)
+
+    applied = []
+    for version, description, steps in MIGRATIONS:
+        if version <= current_version:
+            continue
+        try:
+            if _apply(conn, version, description, steps):
+                applied.append(version)
+                print(f"Миграция {version} применена: {description}")
+        except sqlite3.Error as e:
+            raise MigrationError(f"Ошибка миграции {version} ({description}): {e}")
+
+    return applied
+
+
+if __name__ == "__main__":
+    run_migrations()
+    print(f"Версия схемы: {get_schema_version()}")
@@ -1,23 +1,49 @@
 # notifications_manager.py
-import pickle
 import sqlite3
 from datetime import datetime
 from PyQt6.QtWidgets import QFrame, QVBoxLayout, QLabel, QScrollArea, QWidget, QMessageBox
-from PyQt6.QtCore import QTimer, Qt, QObject, pyqtSignal
+from PyQt6.QtCore import Qt, QObject, pyqtSignal
 
-from utils import get_database_path
+from db_pool import get_connection
+from message_codec import decode_message
+from change_bus import get_bus, MESSAGES
 from view_message_dialog import ViewMessageDialog
 from datetime import datetime, timezone
 
 
+# Сколько уведомлений показывать на панели
+MAX_NOTIFICATIONS = 20
+
+UNREAD_STYLE = """
+    QFrame {
+        background-color: #e3f2fd;
+        border: 1px solid #4a6fa5;
+        border-radius: 6px;
+        padding: 8px;
+        margin: 2px 0px;
+    }
+"""
+
+READ_STYLE = """
+    QFrame {
+        background-color: #f8f9fa;
+        border: 1px solid #e1e5eb;
+        border-radius: 6px;
+        padding: 8px;
+        margin: 2px 0px;
+    }
+"""
+
+
 class SimpleNotificationWidget(QFrame):
 
     clicked = pyqtSignal(dict)
 
     def __init__(self, message_data, parent=None):
         super().__init__(parent)
-        self.message_data = message_data
+        self.message_data = {}
         self.setup_ui()
+        self.set_message(message_data)
 
     def setup_ui(self):
         self.setFrameStyle(QFrame.Shape.StyledPanel)
@@ -26,42 +52,16 @@ class SimpleNotificationWidget(QFrame):
         self.setMaximumWidth(220)
         self.setMinimumWidth(210)
 
-        if not self.message_data.get('is_read', False):
-            self.setStyleSheet("""
-                QFrame {
-                    background-color: #e3f2fd;
-                    border: 1px solid #4a6fa5;
-                    border-radius: 6px;
-                    padding: 8px;
-                    margin: 2px 0px;
-                }
-            """)
-        else:
-            self.setStyleSheet("""
-                QFrame {
-                    background-color: #f8f9fa;
-                    border: 1px solid #e1e5eb;
-                    border-radius: 6px;
-                    padding: 8px;
-                    margin: 2px 0px;
-                }
-            """)
-
         layout = QVBoxLayout(self)
         layout.setSpacing(4)
         layout.setContentsMargins(8, 8, 8, 8)
 
-        message_text = self.message_data.get('text', '')
-        self.message_label = QLabel(message_text)
+        self.message_label = QLabel()
         self.message_label.setStyleSheet("font-size: 10px; color: #5a6c7d;")
         self.message_label.setWordWrap(True)
         self.message_label.setMaximumWidth(204)
 
-        sender_name = self.message_data.get('sender_name', 'Неизвестный')
-        time_str = self.message_data.get('created_at', '')
-        info_text = f"От: {sender_name} • {time_str}"
-
-        self.info_label = QLabel(info_text)
+        self.info_label = QLabel()
         self.info_label.setStyleSheet("font-size: 9px; color: #8798a7;")
         self.info_label.setWordWrap(True)
         self.info_label.setMaximumWidth(204)
@@ -69,8 +69,23 @@ class SimpleNotificationWidget(QFrame):
         layout.addWidget(self.message_label)
         layout.addWidget(self.info_label)
 
-        if not self.message_data.get('is_read', False):
+    def set_message(self, message_data):
+        """Показывает в карточке другое сообщение (карточки переиспользуются)"""
+        self.message_data = message_data
+        is_read = self.message_data.get('is_read', False)
+
+        self.setStyleSheet(READ_STYLE if is_read else UNREAD_STYLE)
+
+        self.message_label.setText(self.message_data.get('text', ''))
+
+        sender_name = self.message_data.get('sender_name', 'Неизвестный')
+        time_str = self.message_data.get('created_at', '')
+        self.info_label.setText(f"От: {sender_name} • {time_str}")
+
+        if not is_read:
             self.setCursor(Qt.CursorShape.PointingHandCursor)
+        else:
+            self.unsetCursor()
 
     def mousePressEvent(self, event):
         if (event.button() == Qt.MouseButton.LeftButton and
@@ -90,14 +105,19 @@ class SimpleNotificationsManager(QObject):
         self.main_window = main_window
         self.is_active = True
 
+        # Показанные карточки: id сообщения -> виджет, порядок - от новых к старым
         self.notification_widgets = {}
-
-        self.update_timer = QTimer()
-        self.update_timer.timeout.connect(self.safe_load_notifications)
+        self.display_order = []
+        # Скрытые карточки для повторного использования
+        self.widget_pool = []
+        self.last_message_id = 0
+        # Пока открыт диалог сообщения, обновления откладываются
+        self.updates_paused = False
+        self.pending_update = False
 
         self.setup_notifications_panel()
         self.safe_load_notifications()
-        self.update_timer.start(15000)
+        get_bus().subscribe(MESSAGES, self.on_messages_changed)
 
     def setup_notifications_panel(self):
         if not self.is_widget_valid(self.notifications_frame):
@@ -147,6 +167,12 @@ class SimpleNotificationsManager(QObject):
         except Exception as e:
             QMessageBox.critical(self.main_window, "Ошибка", str(e))
 
+    def on_messages_changed(self):
+        if self.updates_paused:
+            self.pending_update = True
+            return
+        self.safe_load_notifications()
+
     def safe_load_notifications(self):
         if not self.is_active or not self.is_widget_valid(self.notifications_frame):
             return
@@ -158,51 +184,74 @@ class SimpleNotificationsManager(QObject):
 
     def load_notifications(self):
         try:
-            db_path = get_database_path()
-            conn = sqlite3.connect(db_path)
+            conn = get_connection()
             cursor = conn.cursor()
 
+            # Убираем карточки сообщений, которые уже прочитаны (в том числе в другом окне)
+            if self.display_order:
+                placeholders = ', '.join('?' * len(self.display_order))
+                cursor.execute(f'''
+                    SELECT id FROM messages
+                    WHERE id IN ({placeholders}) AND is_read = 0
+                ''', self.display_order)
+                still_unread = {row[0] for row in cursor.fetchall()}
+
+                for msg_id in list(self.display_order):
+                    if msg_id not in still_unread:
+                        self.immediately_remove_notification(msg_id)
+
+            # Загружаем только сообщения новее последнего увиденного
             cursor.execute('''
                 SELECT m.id, m.text, m.created_at, m.from_user, 
                        s.first_name, s.last_name, s.position, m.is_read
                 FROM messages m
                 JOIN staff s ON m.from_user = s.id
-                WHERE m.to_user = ? AND m.is_read = 0
+                WHERE m.to_user = ? AND m.is_read = 0 AND m.id > ?
                 ORDER BY m.created_at DESC
-                LIMIT 20
-            ''', (self.user_id,))
+                LIMIT ?
+            ''', (self.user_id, self.last_message_id, MAX_NOTIFICATIONS))
 
             messages = cursor.fetchall()
-            conn.close()
 
             self.display_notifications(messages)
 
+            # Если карточки ушли с панели, дополняем ее более старыми непрочитанными
+            free_slots = MAX_NOTIFICATIONS - len(self.display_order)
+            if free_slots > 0:
+                oldest_id = min(self.display_order) if self.display_order else self.last_message_id + 1
+                cursor.execute('''
+                    SELECT m.id, m.text, m.created_at, m.from_user, 
+                           s.first_name, s.last_name, s.position, m.is_read
+                    FROM messages m
+                    JOIN staff s ON m.from_user = s.id
+                    WHERE m.to_user = ? AND m.is_read = 0 AND m.id < ?
+                    ORDER BY m.created_at DESC
+                    LIMIT ?
+                ''', (self.user_id, oldest_id, free_slots))
+
+                self.display_notifications(cursor.fetchall(), at_bottom=True)
+
         except Exception as e:
             QMessageBox.critical(self.main_window, "Ошибка", str(e))
 
-    def display_notifications(self, messages):
+    def display_notifications(self, messages, at_bottom=False):
+        """Добавляет карточки новых сообщений сверху панели (или снизу - для более старых)"""
         if not self.is_widget_valid(self.scroll_widget):
             return
 
-        try:
-            while self.scroll_layout.count() > 0:
-                child = self.scroll_layout.takeAt(0)
-                if child and child.widget():
-                    child.widget().deleteLater()
-        except Exception as e:
-            QMessageBox.critical(self.main_window, "Ошибка", str(e))
-            return
-
-        self.scroll_layout.addStretch()
-        self.notification_widgets.clear()
-
         if not messages:
             return
 
-        for msg_id, text, created_at, from_user, first_name, last_name, position, is_read in reversed(messages):
+        self.last_message_id = max(self.last_message_id, max(message[0] for message in messages))
+
+        ordered = messages if at_bottom else reversed(messages)
+        for msg_id, text, created_at, from_user, first_name, last_name, position, is_read in ordered:
             if not self.is_active:
                 break
 
+            if msg_id in self.notification_widgets:
+                continue
+
             full_text = self.convert_to_full_text(text)
 
             message_data = {
@@ -218,16 +267,45 @@ class SimpleNotificationsManager(QObject):
             }
 
             try:
-                notification_widget = SimpleNotificationWidget(message_data)
-                notification_widget.clicked.connect(self.on_notification_clicked)
-
-                self.scroll_layout.insertWidget(0, notification_widget)
+                notification_widget = self.acquire_widget(message_data)
+
+                if at_bottom:
+                    # Последний элемент разметки - растяжка, вставляем перед ней
+                    self.scroll_layout.insertWidget(len(self.display_order), notification_widget)
+                    self.display_order.append(msg_id)
+                else:
+                    self.scroll_layout.insertWidget(0, notification_widget)
+                    self.display_order.insert(0, msg_id)
+                notification_widget.show()
                 self.notification_widgets[msg_id] = notification_widget
 
             except Exception as e:
                 QMessageBox.critical(self.main_window, "Ошибка", str(e))
                 continue
 
+        # Самые старые карточки уходят с панели
+        while len(self.display_order) > MAX_NOTIFICATIONS:
+            self.immediately_remove_notification(self.display_order[-1])
+
+    def acquire_widget(self, message_data):
+        while self.widget_pool:
+            widget = self.widget_pool.pop()
+            if self.is_widget_valid(widget):
+                widget.set_message(message_data)
+                return widget
+
+        widget = SimpleNotificationWidget(message_data)
+        widget.clicked.connect(self.on_notification_clicked)
+        return widget
+
+    def release_widget(self, widget):
+        self.scroll_layout.removeWidget(widget)
+        widget.hide()
+        if len(self.widget_pool) < MAX_NOTIFICATIONS:
+            self.widget_pool.append(widget)
+        else:
+            widget.deleteLater()
+
     def convert_to_display_text(self, data):
         text = self.convert_to_string(data)
         if len(text) > 20:
@@ -238,26 +316,8 @@ class SimpleNotificationsManager(QObject):
         return self.convert_to_string(data)
 
     def convert_to_string(self, data):
-
-        if data is None:
-            return ""
-
-        if isinstance(data, bytes):
-            try:
-                decoded_data = pickle.loads(data)
-                if isinstance(decoded_data, bytes):
-                    decoded_data = decoded_data.decode('utf-8', errors='ignore')
-                decoded_data = str(decoded_data)
-            except Exception as e:
-                QMessageBox.critical(self.main_window, "Ошибка", str(e))
-                try:
-                    decoded_data = data.decode('utf-8', errors='ignore')
-                except:
-                    decoded_data = "Нечитаемые данные"
-        else:
-            decoded_data = str(data)
-
-        return decoded_data
+        # Старые сообщения в pickle раскодирует кодек, результат кэшируется
+        return decode_message(data)
 
     def format_time(self, timestamp):
         if isinstance(timestamp, bytes):
@@ -298,20 +358,19 @@ class SimpleNotificationsManager(QObject):
 
         try:
             if message_id in self.notification_widgets:
-                widget = self.notification_widgets[message_id]
+                widget = self.notification_widgets.pop(message_id)
+                if message_id in self.display_order:
+                    self.display_order.remove(message_id)
 
                 if (self.is_widget_valid(widget) and
                         self.is_widget_valid(self.scroll_widget) and
                         self.scroll_layout is not None):
-                    self.scroll_layout.removeWidget(widget)
-                    widget.deleteLater()
-                    del self.notification_widgets[message_id]
+                    self.release_widget(widget)
 
 
         except Exception as e:
             QMessageBox.critical(self.main_window, "Ошибка", str(e))
-            if message_id in self.notification_widgets:
-                del self.notification_widgets[message_id]
+            self.notification_widgets.pop(message_id, None)
 
     def on_message_read(self, message_id):
         self.immediately_remove_notification(message_id)
@@ -332,15 +391,13 @@ class SimpleNotificationsManager(QObject):
     def stop_updates(self):
 
         self.is_active = False
-        if hasattr(self, 'update_timer'):
-            self.update_timer.stop()
+        get_bus().unsubscribe(self.on_messages_changed)
 
     def on_notification_clicked(self, message_data):
 
         try:
 
-            if hasattr(self, 'update_timer') and self.update_timer.isActive():
-                self.update_timer.stop()
+            self.updates_paused = True
 
             dialog = ViewMessageDialog(message_data, self.main_window)
 
@@ -350,13 +407,17 @@ class SimpleNotificationsManager(QObject):
                 except Exception as e:
                     QMessageBox.critical(self.main_window, "Ошибка", str(e))
                 finally:
-                    if hasattr(self, 'update_timer') and not self.update_timer.isActive():
-                        self.update_timer.start(30000)
+                    self.resume_updates()
 
             dialog.finished.connect(safe_remove)
             dialog.exec()
 
         except Exception as e:
             QMessageBox.critical(self.main_window, "Ошибка", str(e))
-            if hasattr(self, 'update_timer') and not self.update_timer.isActive():
-                self.update_timer.start(30000)
\ No newline at end of file
+            self.resume_updates()
+
+    def resume_updates(self):
+        self.updates_paused = False
+        if self.pending_update:
+            self.pending_update = False
+            self.safe_load_notifications()
\ No newline at end of file
@@ -5,7 +5,9 @@ from PyQt6.QtWidgets import (QApplication, QMainWindow, QTableWidget, QTableWidg
                              QHBoxLayout, QTabWidget, QMenu, QLabel, QDialog,
                              QDialogButtonBox, QFormLayout, QLineEdit, QComboBox, QInputDialog)
 from PyQt6.QtCore import Qt
-from datetime import datetime
+from datetime import datetime, timedelta
+
+from daily_stats import period_stats
 
 
 class DeleteConfirmationDialog(QDialog):
@@ -959,6 +961,13 @@ class HotelManager(QMainWindow):
             ''')
             staff_stats = cursor.fetchall()
 
+            # Создано и выполнено за месяц - из дневной статистики, без просмотра всех заданий
+            month_stats = None
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'daily_stats'")
+            if cursor.fetchone():
+                today = datetime.now().date()
+                month_stats = period_stats((today - timedelta(days=30)).isoformat(), today.isoformat(), conn)
+
             conn.close()
 
             # Формируем отчет
@@ -968,6 +977,11 @@ class HotelManager(QMainWindow):
             for status, count in status_stats:
                 stats_text += f"  {status:<12}: {count:>2} заданий\n"
 
+            if month_stats:
+                stats_text += "\n📅 ЗА 30 ДНЕЙ:\n"
+                stats_text += f"  Создано: {month_stats.tasks_created}, выполнено: {month_stats.tasks_completed}\n"
+                stats_text += f"  Среднее время уборки: {month_stats.avg_cleaning_minutes:.0f} мин\n"
+
             stats_text += "\n🏠 ПО КОМНАТАМ (ТОП-10):\n"
             for room, total, completed in room_stats:
                 stats_text += f"  Комната {room}: {total} заданий ({completed} выполнено)\n"
@@ -0,0 +1,147 @@
+from bisect import bisect_left, insort
+from datetime import date, timedelta
+
+from change_bus import BOOKINGS, register_cache
+from db_pool import get_connection
+
+# Брони, закончившиеся раньше этого числа дней назад, в памяти не держим:
+# запросы по такому прошлому идут прямо в базу
+HISTORY_DAYS = 60
+
+_availability = None
+
+
+class RoomIntervals:
+    """Брони одного номера: отсортированные даты заезда и префиксный максимум дат выезда.
+
+    Период [check_in, check_out) пересекается с какой-то бронью, если среди
+    броней с заездом раньше check_out есть бронь с выездом позже check_in.
+    Брони с заездом раньше check_out - это префикс списка (bisect), а самый
+    поздний выезд в префиксе хранится заранее, поэтому проверка - O(log n).
+    """
+
+    def __init__(self):
+        self.bookings = []  # (check_in, check_out, booking_id), по дате заезда
+        self.starts = []
+        self.max_ends = []
+
+    def add(self, check_in, check_out, booking_id):
+        insort(self.bookings, (check_in, check_out, booking_id))
+
+    def build(self):
+        self.starts = [check_in for check_in, _, _ in self.bookings]
+        self.max_ends = []
+        max_end = ''
+        for _, check_out, _ in self.bookings:
+            max_end = max(max_end, check_out)
+            self.max_ends.append(max_end)
+
+    def is_free(self, check_in, check_out, exclude_booking_id=None):
+        count = bisect_left(self.starts, check_out)
+        if count == 0 or self.max_ends[count - 1] <= check_in:
+            return True
+        if exclude_booking_id is None:
+            return False
+
+        # Пересечение есть - проверяем, не с самой ли изменяемой бронью
+        return not any(
+            booking_check_out > check_in and booking_id != exclude_booking_id
+            for _, booking_check_out, booking_id in self.bookings[:count]
+        )
+
+
+class AvailabilityIndex:
+    """Занятость номеров в памяти - общая для окон заселения, изменения и загрузки броней.
+
+    Перестраивается, когда растет ревизия темы BOOKINGS: ее увеличивает
+    в той же транзакции любая запись броней и номеров (change_bus.publish),
+    в том числе из других рабочих станций. Проверка ревизии - один запрос
+    по первичному ключу.
+    """
+
+    def __init__(self, history_days=HISTORY_DAYS):
+        self.history_days = history_days
+        self.revision = None
+        self.since = None
+        self.rooms = []  # (room_number, room_id) в порядке номеров
+        self.room_ids = {}
+        self.intervals = {}
+
+    def invalidate(self):
+        """Перечитать данные при следующем обращении, даже если ревизия та же"""
+        self.revision = None
+
+    def current_revision(self, conn):
+        row = conn.execute('SELECT revision FROM data_revisions WHERE topic = ?', (BOOKINGS,)).fetchone()
+        return row[0] if row else 0
+
+    def refresh(self, conn=None):
+        """Перестраивает индекс, если брони или номера изменились"""
+        conn = conn or get_connection()
+        revision = self.current_revision(conn)
+        since = (date.today() - timedelta(days=self.history_days)).isoformat()
+        if revision == self.revision and since == self.since:
+            return
+
+        self.rooms = conn.execute('SELECT room_number, id FROM rooms ORDER BY room_number').fetchall()
+        self.room_ids = {str(room_number): room_id for room_number, room_id in self.rooms}
+        self.intervals = {room_id: RoomIntervals() for _, room_id in self.rooms}
+
+        cursor = conn.execute('''
+            SELECT room_id, check_in_date, check_out_date, id FROM bookings
+            WHERE check_out_date > ?
+        ''', (since,))
+        for room_id, check_in, check_out, booking_id in cursor:
+            if room_id in self.intervals:
+                self.intervals[room_id].add(check_in, check_out, booking_id)
+
+        for intervals in self.intervals.values():
+            intervals.build()
+
+        self.revision = revision
+        self.since = since
+
+    def room_exists(self, room_number, conn=None):
+        self.refresh(conn)
+        return str(room_number) in self.room_ids
+
+    def is_free(self, room_number, check_in, check_out, exclude_booking_id=None, conn=None):
+        """Свободен ли номер на период [check_in, check_out) (даты в формате ГГГГ-ММ-ДД)"""
+        conn = conn or get_connection()
+        self.refresh(conn)
+        room_id = self.room_ids.get(str(room_number))
+        if room_id is None:
+            return False
+
+        if check_in < self.since:
+            return self.is_free_in_db(conn, room_id, check_in, check_out, exclude_booking_id)
+        return self.intervals[room_id].is_free(check_in, check_out, exclude_booking_id)
+
+    def free_rooms(self, check_in, check_out, exclude_booking_id=None, conn=None):
+        """Номера, свободные на период [check_in, check_out), в порядке номеров"""
+        conn = conn or get_connection()
+        self.refresh(conn)
+
+        if check_in < self.since:
+            return [str(room_number) for room_number, room_id in self.rooms
+                    if self.is_free_in_db(conn, room_id, check_in, check_out, exclude_booking_id)]
+
+        return [str(room_number) for room_number, room_id in self.rooms
+                if self.intervals[room_id].is_free(check_in, check_out, exclude_booking_id)]
+
+    def is_free_in_db(self, conn, room_id, check_in, check_out, exclude_booking_id):
+        return conn.execute('''
+            SELECT 1 FROM bookings
+            WHERE room_id = ? AND check_out_date > ? AND check_in_date < ?
+            AND id IS NOT ?
+            LIMIT 1
+        ''', (room_id, check_in, check_out, exclude_booking_id)).fetchone() is None
+
+
+def get_availability():
+    """Общий индекс занятости процесса (для окон в потоке интерфейса)"""
+    global _availability
+    if _availability is None:
+        _availability = AvailabilityIndex()
+        register_cache(_availability)
+    return _availability
@@ -0,0 +1,174 @@
+import csv
+import gzip
+import os
+from datetime import date
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from db_pool import get_connection, close_connection
+
+# Строк, читаемых из курсора за раз: в памяти держится одна порция, а не вся выгрузка
+EXPORT_BATCH = 1000
+# Сколько строк показывать в окне для предпросмотра
+PREVIEW_LIMIT = 200
+
+REPORT_HEADERS = ['Номер', 'Гость', 'Заезд', 'Выезд', 'Ночей', 'Тип', 'Стоимость', 'Общая стоимость', 'Статус']
+
+REPORT_QUERY = '''
+    SELECT room_number,
+           last_name || '.' || SUBSTR(first_name,1,1) || '.' || SUBSTR(patronymic,1,1) as guest_initials,
+           check_in_date,
+           check_out_date,
+           CAST(JULIANDAY(check_out_date) - JULIANDAY(check_in_date) AS INTEGER) as nights,
+           room_type,
+           price_per_night,
+           (CAST(JULIANDAY(check_out_date) - JULIANDAY(check_in_date) AS INTEGER) * price_per_night) as total_cost,
+           CASE
+             WHEN date(check_out_date) < date('now') THEN 'Завершено'
+             WHEN date(check_in_date) <= date('now') THEN 'Активно'
+             ELSE 'Ожидается'
+           END as booking_status
+    FROM rooms JOIN bookings ON rooms.id = bookings.room_id
+    JOIN guests ON bookings.guest_id = guests.id
+    WHERE check_in_date BETWEEN date(?) AND date('now')
+    ORDER BY check_in_date, room_number
+'''
+
+
+def open_report(file_path, encoding, newline=None, compress=False):
+    """Открывает файл отчета на запись, при compress - со сжатием gzip"""
+    if compress:
+        return gzip.open(file_path, 'wt', encoding=encoding, newline=newline)
+    return open(file_path, 'w', encoding=encoding, newline=newline)
+
+
+def fetch_preview(start_date, conn=None, limit=PREVIEW_LIMIT):
+    """Первая страница отчета и общее число строк за период"""
+    conn = conn or get_connection()
+    start = start_date.strftime('%Y-%m-%d')
+    rows = conn.execute(REPORT_QUERY + ' LIMIT ?', (start, limit)).fetchall()
+    total = conn.execute(
+        f'SELECT COUNT(*) FROM ({REPORT_QUERY})', (start,)
+    ).fetchone()[0]
+    return rows, total
+
+
+def iter_report(conn, start_date, batch_size=EXPORT_BATCH):
+    """Строки отчета порциями по batch_size"""
+    cursor = conn.execute(REPORT_QUERY, (start_date.strftime('%Y-%m-%d'),))
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield rows
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+class BookingExportWorker(QThread):
+    """Выгрузка отчета о бронированиях в файл в фоновом потоке.
+
+    Строки идут из курсора в файл порциями, пишутся во временный файл
+    рядом с целевым и переименовываются только после успешной записи.
+    """
+
+    # Записано строк
+    progress = pyqtSignal(int)
+    export_finished = pyqtSignal(int)
+    # Исключение, из-за которого выгрузка не удалась
+    export_failed = pyqtSignal(object)
+
+    def __init__(self, file_path, start_date, batch_size=EXPORT_BATCH):
+        super().__init__()
+        self.file_path = file_path
+        self.start_date = start_date
+        self.batch_size = batch_size
+        # report.csv.gz - тот же отчет, сжатый gzip
+        self.compress = file_path.lower().endswith('.gz')
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        part_path = self.file_path + '.part'
+        try:
+            conn = get_connection()
+            # Оба прохода текстового отчета читают один снимок базы
+            conn.execute('BEGIN')
+            try:
+                if self.file_path.lower().removesuffix('.gz').endswith('.txt'):
+                    written = self.write_txt(conn, part_path)
+                else:
+                    written = self.write_csv(conn, part_path)
+            finally:
+                conn.rollback()
+
+            os.replace(part_path, self.file_path)
+            self.export_finished.emit(written)
+
+        except Exception as e:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            self.export_failed.emit(e)
+        finally:
+            close_connection()
+
+    def batches(self, conn):
+        for rows in iter_report(conn, self.start_date, self.batch_size):
+            if self.cancelled:
+                raise ExportCancelled("Выгрузка остановлена")
+            yield rows
+
+    def write_csv(self, conn, file_path):
+        written = 0
+        with open_report(file_path, 'utf-8-sig', newline='', compress=self.compress) as f:
+            writer = csv.writer(
+                f,
+                delimiter=';',
+                quotechar='"',
+                quoting=csv.QUOTE_MINIMAL)
+            writer.writerow(REPORT_HEADERS)
+
+            for rows in self.batches(conn):
+                writer.writerows(rows)
+                written += len(rows)
+                self.progress.emit(written)
+        return written
+
+    def write_txt(self, conn, file_path):
+        # Ширина колонок зависит от всех строк: первый проход считает ее,
+        # не сохраняя строки, второй пишет отчет
+        col_widths = [len(header) for header in REPORT_HEADERS]
+        for rows in self.batches(conn):
+            for row in rows:
+                for i, cell in enumerate(row):
+                    col_widths[i] = max(col_widths[i], len(str(cell)))
+
+        col_widths = [width + 2 for width in col_widths]
+
+        written = 0
+        with open_report(file_path, 'utf-8', compress=self.compress) as f:
+
+            f.write("ОТЧЕТ О БРОНИРОВАНИЯХ\n")
+            f.write("=" * 100 + "\n")
+            f.write(
+                f"Период: с {self.start_date.strftime('%d.%m.%Y')} по {date.today().strftime('%d.%m.%Y')}\n")
+            f.write("=" * 100 + "\n\n")
+
+            header_line = "".join([REPORT_HEADERS[i].ljust(col_widths[i]) for i in range(len(REPORT_HEADERS))])
+            f.write(header_line + "\n")
+            f.write("-" * len(header_line) + "\n")
+
+            for rows in self.batches(conn):
+                f.writelines(
+                    "".join([str(cell).ljust(col_widths[i]) for i, cell in enumerate(row)]) + "\n"
+                    for row in rows
+                )
+                written += len(rows)
+                self.progress.emit(written)
+
+            f.write("\n" + "=" * 100 + "\n")
+        return written
@@ -0,0 +1,108 @@
+import csv
+
+from PyQt6.QtCore import Qt, QThread, QAbstractTableModel, QModelIndex, pyqtSignal
+
+from regist.booking_import import read_booking_file
+
+# Строк в одной порции, передаваемой из потока чтения в окно
+LOAD_CHUNK = 2000
+
+
+class BookingFileLoader(QThread):
+    """Чтение файла броней в фоновом потоке.
+
+    Строки передаются в окно порциями (rows_loaded), поэтому окно
+    не замирает и показывает начало файла сразу. cancel() останавливает
+    чтение после текущей порции.
+    """
+
+    # object, а не list: иначе каждая порция конвертируется в QVariantList и обратно
+    header_loaded = pyqtSignal(object)
+    rows_loaded = pyqtSignal(object)
+    # Прочитано байт, размер файла
+    progress = pyqtSignal(int, int)
+    load_failed = pyqtSignal(str)
+
+    def __init__(self, file_path, chunk_size=LOAD_CHUNK):
+        super().__init__()
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+        # Свой флаг: isInterruptionRequested() после завершения потока снова False
+        self.cancelled = False
+        # Чтение прервано ошибкой - прочитана только часть файла
+        self.failed = False
+
+    def cancel(self):
+        self.cancelled = True
+        self.requestInterruption()
+
+    def run(self):
+        try:
+            chunks = read_booking_file(self.file_path, self.chunk_size, progress=self.progress.emit)
+            self.header_loaded.emit(next(chunks))
+
+            for chunk in chunks:
+                if self.isInterruptionRequested():
+                    chunks.close()
+                    return
+                self.rows_loaded.emit(chunk)
+
+        except (OSError, UnicodeDecodeError, csv.Error) as e:
+            self.failed = True
+            self.load_failed.emit(str(e))
+
+
+class ImportPreviewModel(QAbstractTableModel):
+    """Строки загружаемого файла для предпросмотра.
+
+    Хранит строки как есть (списки строк csv); таблица запрашивает
+    только видимые ячейки, поэтому элементы на каждую ячейку не создаются.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.header = []
+        self.rows = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.header)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+
+        row = self.rows[index.row()]
+        column = index.column()
+        return row[column] if column < len(row) else None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+
+        if orientation == Qt.Orientation.Horizontal:
+            return self.header[section] if section < len(self.header) else None
+        return section + 1
+
+    def set_header(self, header):
+        """Начинает новый файл: заголовок и пустой список строк"""
+        self.beginResetModel()
+        self.header = list(header)
+        self.rows = []
+        self.endResetModel()
+
+    def append_rows(self, rows):
+        if not rows:
+            return
+        first = len(self.rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self.rows.extend(rows)
+        self.endInsertRows()
+
+    def set_rows(self, rows):
+        """Подменяет строки целиком (после исправления или отмены строк)"""
+        self.beginResetModel()
+        self.rows = rows
+        self.endResetModel()
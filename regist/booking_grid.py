@@ -0,0 +1,124 @@
+from array import array
+from calendar import monthrange
+from collections import namedtuple
+from datetime import date
+
+from db_pool import get_connection
+
+EMPTY = -1
+
+STATUS_COLORS = {
+    'прошла': "#B0B0B0",
+    'сейчас': "#74E868",
+    'будет': "#68B5E8"
+}
+
+GridBooking = namedtuple('GridBooking', [
+    'booking_id', 'room_number', 'guest_name', 'check_in', 'check_out', 'status'
+])
+
+
+def booking_status(check_in, check_out, today):
+    if check_out < today:
+        return 'прошла'
+    if check_in <= today <= check_out:
+        return 'сейчас'
+    return 'будет'
+
+
+class MonthGrid:
+    """Шахматка за месяц: матрица номер x день с индексами бронирований.
+
+    Ячейки хранятся в одном плоском массиве (строка номера * число дней + день),
+    пустая ячейка - EMPTY, иначе индекс брони в self.bookings.
+    """
+
+    def __init__(self, room_numbers, year, month):
+        self.room_numbers = [str(room) for room in room_numbers]
+        self.room_rows = {room: row for row, room in enumerate(self.room_numbers)}
+        self.year = year
+        self.month = month
+        self.days = monthrange(year, month)[1]
+        self.first_day = date(year, month, 1)
+        self.last_day = date(year, month, self.days)
+        self.bookings = []
+        self.cells = array('i', [EMPTY]) * (len(self.room_numbers) * self.days)
+
+    @property
+    def rows(self):
+        return len(self.room_numbers)
+
+    def fill(self, rows, today=None):
+        """Заполняет сетку строками (id, номер, имя гостя, заезд, выезд)"""
+        today = today or date.today()
+        first_ordinal = self.first_day.toordinal()
+        last_ordinal = self.last_day.toordinal()
+        days = self.days
+        cells = self.cells
+
+        for booking_id, room_number, guest_name, check_in_str, check_out_str in rows:
+            row = self.room_rows.get(str(room_number))
+            if row is None:
+                continue
+
+            try:
+                check_in = date.fromisoformat(check_in_str)
+                check_out = date.fromisoformat(check_out_str)
+            except (TypeError, ValueError):
+                continue
+
+            start = max(check_in.toordinal(), first_ordinal) - first_ordinal
+            end = min(check_out.toordinal(), last_ordinal) - first_ordinal
+            if start > end:
+                continue
+
+            index = len(self.bookings)
+            self.bookings.append(GridBooking(
+                booking_id, str(room_number), guest_name, check_in, check_out,
+                booking_status(check_in, check_out, today)
+            ))
+
+            base = row * days
+            cells[base + start:base + end + 1] = array('i', [index]) * (end - start + 1)
+
+        return self
+
+    def booking_at(self, row, day_index):
+        """Бронь в ячейке (строка номера, день месяца с нуля) или None"""
+        if not (0 <= row < self.rows and 0 <= day_index < self.days):
+            return None
+        index = self.cells[row * self.days + day_index]
+        return self.bookings[index] if index != EMPTY else None
+
+    def is_check_in(self, row, day_index):
+        """День заезда брони в ячейке - в нем имя гостя выводится черным"""
+        booking = self.booking_at(row, day_index)
+        return booking is not None and booking.check_in.toordinal() - self.first_day.toordinal() == day_index
+
+    def occupied_cells(self):
+        """Непустые ячейки: (строка, день с нуля, бронь)"""
+        days = self.days
+        bookings = self.bookings
+        for position, index in enumerate(self.cells):
+            if index != EMPTY:
+                yield position // days, position % days, bookings[index]
+
+
+def load_month_grid(room_numbers, year, month, conn=None, today=None):
+    """Одним запросом загружает брони месяца и строит шахматку"""
+    grid = MonthGrid(room_numbers, year, month)
+    conn = conn or get_connection()
+
+    cursor = conn.execute('''
+        SELECT bookings.id,
+               rooms.room_number,
+               last_name || ' ' || SUBSTR(first_name, 1, 1) || '. ' || SUBSTR(patronymic, 1, 1) || '.' as guest_name,
+               check_in_date,
+               check_out_date
+        FROM bookings
+        JOIN guests ON bookings.guest_id = guests.id
+        JOIN rooms ON bookings.room_id = rooms.id
+        WHERE check_in_date <= ? AND check_out_date >= ?
+    ''', (grid.last_day.isoformat(), grid.first_day.isoformat()))
+
+    return grid.fill(cursor, today)
@@ -0,0 +1,217 @@
+import csv
+import os
+from bisect import bisect_left
+from datetime import date, datetime
+
+from change_bus import publish, BOOKINGS
+from db_pool import get_connection
+from regist.availability import get_availability
+from regist.regist_exceptions import *
+
+# Строк в одной порции: чтение файла, проверка и вставка идут порциями,
+# после каждой порции сообщается прогресс
+IMPORT_CHUNK = 1000
+COLUMNS_COUNT = 8
+
+
+def read_booking_file(file_path, chunk_size=IMPORT_CHUNK, progress=None):
+    """Читает файл броней (CSV/TXT с разделителем ';') порциями.
+
+    Первым возвращает заголовок, дальше - списки строк не длиннее chunk_size.
+    После каждой порции вызывается progress(прочитано байт, размер файла).
+    """
+    with open(file_path, encoding='utf-8', newline='') as f:
+        size = os.fstat(f.fileno()).st_size
+        reader = csv.reader(f, delimiter=';', quotechar='"')
+        yield next(reader, [])
+
+        chunk = []
+        for row in reader:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                if progress:
+                    # Позиция с учетом опережающего чтения - для прогресса точности хватает
+                    progress(f.buffer.tell(), size)
+                yield chunk
+                chunk = []
+        if progress:
+            progress(size, size)
+        if chunk:
+            yield chunk
+
+
+class FileBookings:
+    """Брони одного номера, уже принятые из загружаемого файла.
+
+    Принятые периоды не пересекаются, поэтому при сортировке по дате заезда
+    даты выезда тоже идут по возрастанию: с новым периодом может пересечься
+    только последняя бронь, заезжающая раньше его даты выезда.
+    """
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+
+    def is_free(self, check_in, check_out):
+        index = bisect_left(self.starts, check_out)
+        return index == 0 or self.ends[index - 1] <= check_in
+
+    def add(self, check_in, check_out):
+        index = bisect_left(self.starts, check_in)
+        self.starts.insert(index, check_in)
+        self.ends.insert(index, check_out)
+
+
+class BookingImport:
+    """Проверка и загрузка броней из файла туроператора.
+
+    Номера и занятость берутся один раз из общего индекса (regist.availability),
+    пересечения броней внутри самого файла проверяются по уже принятым строкам.
+    """
+
+    def __init__(self, conn=None, today=None):
+        self.conn = conn or get_connection()
+        self.today = today or date.today()
+        self.availability = get_availability()
+        self.availability.refresh(self.conn)
+        self.room_ids = dict(self.availability.room_ids)
+        self.revision = self.availability.revision
+        self.file_bookings = {}
+
+    def FIOCheck(self, text, field_name, required=True):
+
+        if not text:
+            if required:
+                raise FIOException(f"Поле '{field_name}' не заполнено")
+            else:
+                return True
+
+        if not text.isalpha():
+            raise FIOException(f"Поле '{field_name}' должно содержать только буквы")
+
+        if len(text) < 2:
+            raise FIOException(f"Поле '{field_name}' должно быть не менее 2 символов")
+
+    def FIOLowerCheck(self, first_name, last_name, patronymic):
+
+        if not first_name.istitle() or not last_name.istitle() or (patronymic and not patronymic.istitle()):
+            raise LowerNameError(first_name, last_name, patronymic)
+
+    def PassportCheck(self, passport):
+
+        if not passport:
+            raise PassportError("Паспорт не заполнен")
+
+        if not passport.isdigit():
+            raise PassportError("Паспорт должен содержать только цифры")
+
+    def PhoneCheck(self, phone):
+        if len(phone) < 10:
+            raise PhoneError("Номер должен быть заполнен полностью")
+
+    def DateCheck(self, check_in_str, check_out_str):
+
+        try:
+            check_in = datetime.strptime(check_in_str, '%Y-%m-%d').date()
+            check_out = datetime.strptime(check_out_str, '%Y-%m-%d').date()
+        except ValueError:
+            raise DateError("Неверный формат даты")
+
+        if check_in > check_out:
+            raise DateError("Дата заселения должна быть до даты выселения")
+
+        if check_in < self.today:
+            raise DateError("Дата заселения не может быть в прошлом")
+
+        return check_in, check_out
+
+    def RoomNumberCheck(self, room_number):
+        if room_number not in self.room_ids:
+            raise RoomError(f"Номер {room_number} не существует в базе данных")
+
+    def BookingAvailabilityCheck(self, room_number, check_in_str, check_out_str):
+        if not self.availability.is_free(room_number, check_in_str, check_out_str, conn=self.conn):
+            raise BookingError(f"Номер {room_number} занят на указанные даты")
+
+        file_bookings = self.file_bookings.setdefault(room_number, FileBookings())
+        if not file_bookings.is_free(check_in_str, check_out_str):
+            raise BookingError(f"Номер {room_number} уже забронирован на эти даты другой строкой файла")
+        file_bookings.add(check_in_str, check_out_str)
+
+    def check_row(self, row):
+        if len(row) != COLUMNS_COUNT:
+            raise InvalidFileFormatError(
+                f"Неправильное количество колонок (ожидается {COLUMNS_COUNT}, получено {len(row)})")
+
+        first_name, last_name, patronymic, passport, phone, check_in, check_out, room_number = row
+
+        self.FIOCheck(first_name, "Имя")
+        self.FIOCheck(last_name, "Фамилия")
+        self.FIOCheck(patronymic, "Отчество", required=False)
+        self.FIOLowerCheck(first_name, last_name, patronymic)
+        self.PassportCheck(passport)
+        self.PhoneCheck(phone)
+        # Индекс занятости сравнивает даты как строки, поэтому 2025-1-5 приводим к 2025-01-05
+        check_in, check_out = (day.isoformat() for day in self.DateCheck(check_in, check_out))
+        row[5], row[6] = check_in, check_out
+        self.RoomNumberCheck(room_number)
+        self.BookingAvailabilityCheck(room_number, check_in, check_out)
+
+    def check_rows(self, rows, first_row_number=1):
+        """Проверяет строки; возвращает список ошибок (номер строки, строка, текст ошибки).
+
+        Проверка в памяти: пересечения ищутся и с базой, и со строками файла,
+        принятыми раньше, поэтому порядок строк важен.
+        """
+        errors_data = []
+        for row_number, row in enumerate(rows, first_row_number):
+            try:
+                self.check_row(row)
+            except Exception as e:
+                errors_data.append((row_number, row, str(e)))
+        return errors_data
+
+    def insert(self, rows, progress=None, chunk_size=IMPORT_CHUNK):
+        """Добавляет проверенные строки в базу одной транзакцией.
+
+        Гости и брони вставляются порциями через executemany; после каждой
+        порции вызывается progress(готово, всего). Возвращает число броней.
+        """
+        total = len(rows)
+        conn = self.conn
+        # id новых гостей нужны для броней: под BEGIN IMMEDIATE никто
+        # другой не пишет, и новые id идут подряд после последнего
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Пока строки проверялись, брони могли измениться с другой рабочей станции
+            if self.availability.current_revision(conn) != self.revision:
+                raise BookingError("Брони изменились во время проверки файла, проверьте данные еще раз")
+
+            for start in range(0, total, chunk_size):
+                chunk = rows[start:start + chunk_size]
+
+                last_guest_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM guests').fetchone()[0]
+                conn.executemany('''
+                    INSERT INTO guests (first_name, last_name, patronymic, passport_number, phone_number)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (row[:5] for row in chunk))
+                guest_ids = [guest_id for guest_id, in conn.execute(
+                    'SELECT id FROM guests WHERE id > ? ORDER BY id', (last_guest_id,)
+                )]
+
+                conn.executemany('''
+                    INSERT INTO bookings (guest_id, room_id, check_in_date, check_out_date)
+                    VALUES (?, ?, ?, ?)
+                ''', ((guest_id, self.room_ids[row[7]], row[5], row[6])
+                      for guest_id, row in zip(guest_ids, chunk)))
+
+                if progress:
+                    progress(start + len(chunk), total)
+
+            publish(conn, BOOKINGS)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        return total
@@ -0,0 +1,154 @@
+from datetime import date, timedelta
+
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt6.QtGui import QBrush, QColor, QFont
+
+from regist.booking_grid import MonthGrid, STATUS_COLORS
+
+DAY_NAMES = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
+
+ROOM_STATUS_NAMES = {
+    'в работе': "⚡ В работе",
+    'в ожидании уборки': "⏳ Ожидание уборки",
+    'убрано': "✨ Убрано"
+}
+
+ROOM_STATUS_COLORS = {
+    'в работе': '#2196F3',
+    'в ожидании уборки': '#FF9800',
+    'убрано': '#9C27B0'
+}
+
+HIGHLIGHT_COLOR = "#FFD700"
+
+
+class BookingTableModel(QAbstractTableModel):
+    """Модель шахматки: столбец статуса уборки и дни месяца.
+
+    Данные ячеек берутся из MonthGrid при отрисовке, поэтому
+    объекты создаются только для видимых ячеек.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        today = date.today()
+        self.grid = MonthGrid([], today.year, today.month)
+        self.room_statuses = {}
+        self.highlighted = None
+
+        # Кисти и шрифт создаются один раз на модель
+        self.booking_brushes = {status: QBrush(QColor(color)) for status, color in STATUS_COLORS.items()}
+        self.status_brushes = {status: QBrush(QColor(color)) for status, color in ROOM_STATUS_COLORS.items()}
+        self.black_brush = QBrush(QColor("#000000"))
+        self.highlight_brush = QBrush(QColor(HIGHLIGHT_COLOR))
+        self.bold_font = QFont()
+        self.bold_font.setBold(True)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.grid.rows
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.grid.days + 1
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+
+        row = index.row()
+        column = index.column()
+
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignCenter
+
+        if column == 0:
+            return self.status_data(row, role)
+
+        booking = self.grid.booking_at(row, column - 1)
+        if booking is None:
+            return None
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            return booking.guest_name
+        if role == Qt.ItemDataRole.BackgroundRole:
+            if self.highlighted == (row, column):
+                return self.highlight_brush
+            return self.booking_brushes[booking.status]
+        if role == Qt.ItemDataRole.ForegroundRole:
+            if self.grid.is_check_in(row, column - 1):
+                return self.black_brush
+            return self.booking_brushes[booking.status]
+        return None
+
+    def status_data(self, row, role):
+        status = self.room_statuses.get(self.grid.room_numbers[row], 'убрано')
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            return ROOM_STATUS_NAMES.get(status, f"📋 {status}")
+        if role == Qt.ItemDataRole.ForegroundRole:
+            return self.status_brushes.get(status, self.black_brush)
+        if role == Qt.ItemDataRole.FontRole:
+            return self.bold_font
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.TextAlignmentRole and orientation == Qt.Orientation.Horizontal:
+            return Qt.AlignmentFlag.AlignCenter
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+
+        if orientation == Qt.Orientation.Vertical:
+            if 0 <= section < self.grid.rows:
+                return self.grid.room_numbers[section]
+            return None
+
+        if section == 0:
+            return "Статус"
+        day = self.date_for_column(section)
+        return f"{day.day} {DAY_NAMES[day.weekday()]}" if day else None
+
+    def set_grid(self, grid):
+        """Подменяет шахматку целиком (смена месяца или обновление броней)"""
+        self.beginResetModel()
+        self.grid = grid
+        self.highlighted = None
+        self.endResetModel()
+
+    def set_room_statuses(self, room_statuses):
+        """Статусы уборки по номерам; номера без активного задания считаются убранными"""
+        self.room_statuses = dict(room_statuses)
+        if self.grid.rows:
+            self.dataChanged.emit(self.index(0, 0), self.index(self.grid.rows - 1, 0))
+
+    def highlight_cell(self, row, column):
+        self.highlighted = (row, column)
+        changed = self.index(row, column)
+        self.dataChanged.emit(changed, changed, [Qt.ItemDataRole.BackgroundRole])
+
+    def clear_highlight(self):
+        if self.highlighted is None:
+            return
+        row, column = self.highlighted
+        self.highlighted = None
+        changed = self.index(row, column)
+        self.dataChanged.emit(changed, changed, [Qt.ItemDataRole.BackgroundRole])
+
+    def room_number(self, row):
+        return self.grid.room_numbers[row]
+
+    def room_row(self, room_number):
+        return self.grid.room_rows.get(str(room_number), -1)
+
+    def date_for_column(self, column):
+        if 1 <= column <= self.grid.days:
+            return self.grid.first_day + timedelta(days=column - 1)
+        return None
+
+    def column_for_date(self, day):
+        if self.grid.first_day <= day <= self.grid.last_day:
+            return (day - self.grid.first_day).days + 1
+        return -1
+
+    def booking_at(self, row, column):
+        if column < 1:
+            return None
+        return self.grid.booking_at(row, column - 1)
@@ -4,7 +4,7 @@ from PyQt6 import uic
 import sqlite3
 import os
 from regist.regist_exceptions import FIOException, LowerNameError, PassportError, DateError, PhoneError
-from utils import get_database_path
+from regist.availability import get_availability
 
 
 class CorrectionDialog(QMainWindow):
@@ -155,23 +155,7 @@ class CorrectionDialog(QMainWindow):
             check_in = self.dateIn.date().toString("yyyy-MM-dd")
             check_out = self.dateOut.date().toString("yyyy-MM-dd")
 
-            db_path = get_database_path()
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-
-            cursor.execute('''
-                SELECT r.room_number 
-                FROM rooms r
-                WHERE r.id NOT IN (
-                    SELECT b.room_id 
-                    FROM bookings b
-                    WHERE b.check_out_date > ? AND b.check_in_date < ?
-                )
-                ORDER BY r.room_number
-            ''', (check_in, check_out))
-
-            available_rooms = [str(row[0]) for row in cursor.fetchall()]
-            conn.close()
+            available_rooms = get_availability().free_rooms(check_in, check_out)
 
             current_room = self.number.currentText()
             self.number.clear()
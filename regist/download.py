@@ -1,16 +1,14 @@
-import csv
-import sqlite3
-from datetime import datetime
-
 from PyQt6.QtGui import QIcon
-from PyQt6.QtWidgets import QMainWindow, QDialog, QFileDialog, QMessageBox, QTableWidgetItem
+from PyQt6.QtWidgets import QMainWindow, QDialog, QFileDialog, QMessageBox, QHeaderView, QProgressBar
 from PyQt6.QtCore import pyqtSignal, Qt
 from PyQt6 import uic
 
 from regist.guest_registration_window import GuestRegistrationWindow
 from regist.regist_exceptions import *
 from regist.validation_dialog import DataValidationDialog
-from utils import get_resource_path, get_database_path
+from regist.booking_import import BookingImport
+from regist.booking_file_loader import BookingFileLoader, ImportPreviewModel
+from utils import get_resource_path
 
 
 # from regist.upload_or_download import UDWindow
@@ -19,6 +17,7 @@ from utils import get_resource_path, get_database_path
 class DownloadWindow(QMainWindow):
     closed = pyqtSignal()
     data_updated = pyqtSignal()
+    import_progress = pyqtSignal(int, int)
     def __init__(self):
         super().__init__()
 
@@ -26,7 +25,23 @@ class DownloadWindow(QMainWindow):
         self.setWindowTitle(f"Загрузка данных о брони")
         self.browseButton.clicked.connect(self.browse)
         self.loadButton.clicked.connect(self.download)
-        self.cancelButton.clicked.connect(self.show_ud_window)
+        self.cancelButton.clicked.connect(self.cancel_or_close)
+        self.import_progress.connect(self.show_import_progress)
+
+        # Предпросмотр через модель: таблица рисует только видимые строки
+        self.preview_model = ImportPreviewModel(self)
+        self.previewTable.setModel(self.preview_model)
+        self.previewTable.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.data = self.preview_model.rows
+
+        self.loader = None
+        # Файл прочитан целиком: после остановки или ошибки чтения в self.data
+        # только начало файла, и загружать его в базу нельзя
+        self.file_complete = False
+        self.load_progress = QProgressBar()
+        self.load_progress.setMaximumWidth(200)
+        self.load_progress.hide()
+        self.statusBar().addPermanentWidget(self.load_progress)
 
     def keyPressEvent(self, event):
         if event.key() == Qt.Key.Key_Escape:
@@ -59,6 +74,12 @@ class DownloadWindow(QMainWindow):
         else:
             self.show_ud_window()
 
+    def cancel_or_close(self):
+        if self.is_loading():
+            self.loader.cancel()
+        else:
+            self.show_ud_window()
+
     def show_ud_window(self):
 
         from regist.upload_or_download import UDWindow
@@ -66,132 +87,30 @@ class DownloadWindow(QMainWindow):
         self.ud_window.show()
         self.close()
 
-    def FIOCheck(self, text, field_name, required=True):
-
-        if not text:
-            if required:
-                raise FIOException(f"Поле '{field_name}' не заполнено")
-            else:
-                return True
-
-        if not text.isalpha():
-            raise FIOException(f"Поле '{field_name}' должно содержать только буквы")
-
-        if len(text) < 2:
-            raise FIOException(f"Поле '{field_name}' должно быть не менее 2 символов")
-
-    def FIOLowerCheck(self, first_name, last_name, patronymic):
-
-        if not first_name.istitle() or not last_name.istitle() or (patronymic and not patronymic.istitle()):
-            raise LowerNameError(first_name, last_name, patronymic)
-
-    def PassportCheck(self, passport):
-
-        if not passport:
-            raise PassportError("Паспорт не заполнен")
-
-        if not passport.isdigit():
-            raise PassportError("Паспорт должен содержать только цифры")
-
-    def PhoneCheck(self, phone):
-        if len(phone) < 10:
-            raise PhoneError("Номер должен быть заполнен полностью")
-
-    def DateCheck(self, check_in_str, check_out_str):
-
-        try:
-            check_in = datetime.strptime(check_in_str, '%Y-%m-%d').date()
-            check_out = datetime.strptime(check_out_str, '%Y-%m-%d').date()
-            today = datetime.now().date()
-
-            if check_in > check_out:
-                raise DateError("Дата заселения должна быть до даты выселения")
-
-            if check_in < today:
-                raise DateError("Дата заселения не может быть в прошлом")
-
-        except ValueError:
-            raise DateError("Неверный формат даты")
-
-    def RoomNumberCheck(self, room_number):
-        try:
-            db_path = get_database_path()
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-
-            cursor.execute('SELECT id FROM rooms WHERE room_number = ?', (room_number,))
-            result = cursor.fetchone()
-            conn.close()
-
-            if not result:
-                raise RoomError(f"Номер {room_number} не существует в базе данных")
-
-        except sqlite3.Error as e:
-            QMessageBox.critical(self,"Ошибка","Ошибка базы данных")
-
-    def BookingAvailabilityCheck(self, room_number, check_in_str, check_out_str):
-        try:
-            db_path = get_database_path()
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-
-            cursor.execute('SELECT id FROM rooms WHERE room_number = ?', (room_number,))
-            room_result = cursor.fetchone()
-
-            if not room_result:
-                raise RoomError(f"Номер {room_number} не существует")
-
-            room_id = room_result[0]
-
-            cursor.execute('''
-                SELECT COUNT(*) FROM bookings 
-                WHERE room_id = ? 
-                AND check_out_date > ? 
-                AND check_in_date < ?
-            ''', (room_id, check_in_str, check_out_str))
-
-            conflicting_bookings = cursor.fetchone()[0]
-            conn.close()
-
-            if conflicting_bookings > 0:
-                raise BookingError(f"Номер {room_number} занят на указанные даты")
-
-        except sqlite3.Error as e:
-            QMessageBox.critical(self,"Ошибка","Ошибка базы данных")
-
     def check_data(self):
-        errors_data = []
-
-        for i, row in enumerate(self.data):
-            try:
-                if len(row) != 8:
-                    errors_data.append(
-                        (i + 1, row, f"Неправильное количество колонок (ожидается 8, получено {len(row)})"))
-                    continue
-
-                first_name, last_name, patronymic, passport, phone, check_in, check_out, room_number = row
-
-                self.FIOCheck(first_name, "Имя")
-                self.FIOCheck(last_name, "Фамилия")
-                self.FIOCheck(patronymic, "Отчество", required=False)
-                self.FIOLowerCheck(first_name, last_name, patronymic)
-                self.PassportCheck(passport)
-                self.PhoneCheck(phone)
-                self.DateCheck(check_in, check_out)
-                self.RoomNumberCheck(room_number)
-                self.BookingAvailabilityCheck(room_number, check_in, check_out)
-
-            except Exception as e:
-                errors_data.append((i + 1, row, str(e)))
+        # Справочник номеров и занятость загружаются один раз на всю проверку
+        self.booking_import = BookingImport()
+        return self.booking_import.check_rows(self.data)
 
-        return errors_data
+    def show_import_progress(self, done, total):
+        # Загрузка идет в потоке интерфейса - перерисовываем только строку состояния
+        self.statusBar().showMessage(f"Загружено строк: {done} из {total}")
+        self.statusBar().repaint()
 
     def download(self):
 
-        if not hasattr(self, 'data') or not self.data:
+        if self.is_loading():
+            QMessageBox.warning(self, "Ошибка", "Дождитесь окончания чтения файла")
+            return
+
+        if not self.data:
             QMessageBox.warning(self, "Ошибка", "Сначала загрузите файл с данными")
             return
 
+        if not self.file_complete:
+            QMessageBox.warning(self, "Ошибка", "Файл прочитан не полностью. Выберите файл заново")
+            return
+
         errors_data = self.check_data()
 
         if errors_data:
@@ -234,50 +153,20 @@ class DownloadWindow(QMainWindow):
                 pass
         else:
             try:
-                db_path = get_database_path()
-                conn = sqlite3.connect(db_path)
-                cursor = conn.cursor()
-                for i, row in enumerate(self.data):
-
-                    if len(row) != 8:
-                        errors_data.append(
-                            (i + 1, row, f"Неправильное количество колонок (ожидается 8, получено {len(row)})"))
-                        continue
-
-                    first_name, last_name, patronymic, passport, phone, check_in, check_out, room_number = row
-                    cursor.execute('''
-                                                        INSERT INTO guests (first_name, last_name, patronymic, passport_number, phone_number)
-                                                        VALUES (?, ?, ?, ?, ?)
-                                                    ''', (first_name, last_name, patronymic, passport, phone))
-
-                    guest_id = cursor.lastrowid
-
-                    cursor.execute('SELECT id FROM rooms WHERE room_number = ?', (room_number,))
-                    room_id = cursor.fetchone()[0]
-
-                    cursor.execute('''
-                                                        INSERT INTO bookings (guest_id, room_id, check_in_date, check_out_date)
-                                                        VALUES (?, ?, ?, ?)
-                                                    ''', (guest_id, room_id, check_in, check_out))
-
-                conn.commit()
-                conn.close()
+                count = self.booking_import.insert(self.data, progress=self.import_progress.emit)
+
                 self.data_updated.emit()
                 QMessageBox.information(self, "Успех",
-                                        "Загруженные данные добавлены в базу данных")
+                                        f"Загруженные данные добавлены в базу данных ({count} броней)")
+            except BookingError as e:
+                QMessageBox.warning(self, "Ошибка", str(e))
             except Exception as e:
                 QMessageBox.critical(self,"Ошибка","Ошибка загрузки данных")
 
 
 
     def update_preview_after_correction(self):
-
-        self.previewTable.setRowCount(len(self.data))
-
-        for i, row in enumerate(self.data):
-            for j, elem in enumerate(row):
-                self.previewTable.setItem(i, j, QTableWidgetItem(elem))
-
+        self.preview_model.set_rows(self.data)
 
     def browse(self):
 
@@ -297,52 +186,72 @@ class DownloadWindow(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, "Ошибка выбора файла", f"Не удалось выбрать файл:\n{str(e)}")
 
-    def load_from_txt(self, file_path):
-
-        with open(file_path, encoding='utf-8') as f:
-            reader = csv.reader(f, delimiter=';', quotechar='"')
+    def is_loading(self):
+        return self.loader is not None and self.loader.isRunning()
 
+    def stop_loading(self):
+        if self.loader is not None:
+            self.loader.cancel()
+            self.loader.wait()
 
-            titel = next(reader)
-            self.previewTable.setColumnCount(len(titel))
-            self.previewTable.setHorizontalHeaderLabels(titel)
-
-            self.data = list(reader)
-
-            for i, row in enumerate(self.data):
-                self.previewTable.setRowCount(
-                    self.previewTable.rowCount() + 1
-                )
-                for j, elem in enumerate(row):
-                    self.previewTable.setItem(i, j, QTableWidgetItem(elem))
-
-    def load_from_csv(self, file_path):
-        with open(file_path, encoding='utf-8') as f:
-            reader = csv.reader(f, delimiter=';', quotechar='"')
-            titel = next(reader)
-            self.previewTable.setColumnCount(len(titel))
-            self.previewTable.setHorizontalHeaderLabels(titel)
+    def preview(self):
+        current_path = self.filePathEdit.text()
+        self.stop_loading()
+
+        self.loader = BookingFileLoader(current_path)
+        self.loader.header_loaded.connect(self.on_header_loaded)
+        self.loader.rows_loaded.connect(self.on_rows_loaded)
+        self.loader.progress.connect(self.on_load_progress)
+        self.loader.load_failed.connect(self.on_load_failed)
+        self.loader.finished.connect(self.on_load_finished)
+
+        self.file_complete = False
+        self.loadButton.setEnabled(False)
+        self.load_progress.setValue(0)
+        self.load_progress.show()
+        self.loader.start()
+
+    # Сигналы от прежнего, уже остановленного потока чтения могут прийти
+    # после запуска нового - такие пропускаем
+    def on_header_loaded(self, header):
+        if self.sender() is not self.loader:
+            return
+        self.preview_model.set_header(header)
+        self.data = self.preview_model.rows
 
-            self.data = list(reader)
+    def on_rows_loaded(self, rows):
+        # Порции, прочитанные до остановки, но еще не показанные, тоже отбрасываем
+        if self.sender() is not self.loader or self.loader.cancelled:
+            return
+        self.preview_model.append_rows(rows)
 
-            for i, row in enumerate(self.data):
-                self.previewTable.setRowCount(
-                    self.previewTable.rowCount() + 1
-                )
-                for j, elem in enumerate(row):
-                    self.previewTable.setItem(i, j, QTableWidgetItem(elem))
+    def on_load_progress(self, done, total):
+        if self.sender() is not self.loader:
+            return
+        self.load_progress.setMaximum(max(total, 1))
+        self.load_progress.setValue(done)
+        self.statusBar().showMessage(f"Прочитано строк: {len(self.data)}")
 
-    def preview(self):
-        current_path = self.filePathEdit.text()
-        try:
-            if current_path.lower().endswith('.txt'):
-                self.load_from_txt(current_path)
-            else:
-                self.load_from_csv(current_path)
+    def on_load_failed(self, error):
+        if self.sender() is not self.loader:
+            return
+        QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить файл: {error}")
 
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить файл: {str(e)}")
+    def on_load_finished(self):
+        if self.sender() is not self.loader:
+            return
+        self.load_progress.hide()
+        self.file_complete = not (self.loader.cancelled or self.loader.failed)
+        self.loadButton.setEnabled(self.file_complete)
+        if self.loader.cancelled:
+            self.statusBar().showMessage(f"Чтение файла остановлено, прочитано строк: {len(self.data)}. "
+                                         f"Для загрузки в базу выберите файл заново")
+        elif self.loader.failed:
+            self.statusBar().showMessage(f"Файл не прочитан до конца, прочитано строк: {len(self.data)}")
+        else:
+            self.statusBar().showMessage(f"Прочитано строк: {len(self.data)}")
 
     def closeEvent(self, event):
+        self.stop_loading()
         self.closed.emit()
-        event.accept()
\ No newline at end of file
+        event.accept()
@@ -5,7 +5,10 @@ import sqlite3
 from datetime import datetime
 from regist.regist_exceptions import FIOException, LowerNameError, PassportError, DateError, PhoneError
 from bd_manager import YandexDiskUploader
-from utils import get_resource_path, get_database_path
+from utils import get_resource_path
+from db_pool import get_connection
+from change_bus import publish, BOOKINGS
+from regist.availability import get_availability
 
 
 class GuestRegistrationWindow(QMainWindow):
@@ -107,23 +110,8 @@ class GuestRegistrationWindow(QMainWindow):
             check_in = self.dateIn.date().toString("yyyy-MM-dd")
             check_out = self.dateOut.date().toString("yyyy-MM-dd")
 
-            db_path = get_database_path()
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-
-            cursor.execute('''
-                        SELECT r.room_number 
-                        FROM rooms r
-                        WHERE r.id NOT IN (
-                            SELECT b.room_id 
-                            FROM bookings b
-                            WHERE b.check_out_date > ? AND b.check_in_date < ?
-                        )
-                        ORDER BY r.room_number
-                    ''', (check_in, check_out))
-
-            available_rooms = [row[0] for row in cursor.fetchall()]
-            conn.close()
+            # Свободные номера из общего индекса занятости, без запроса на каждое изменение даты
+            available_rooms = get_availability().free_rooms(check_in, check_out)
             self.number.clear()
             self.number.addItems(available_rooms)
 
@@ -224,26 +212,25 @@ class GuestRegistrationWindow(QMainWindow):
             in_date = self.dateIn.date().toString("yyyy-MM-dd")
             out_date = self.dateOut.date().toString("yyyy-MM-dd")
 
-            db_path = get_database_path()
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
+            conn = get_connection()
+            with conn:
+                cursor = conn.cursor()
 
-            cursor.execute('''
-                        INSERT INTO guests (first_name, last_name, patronymic, passport_number, phone_number)
-                        VALUES (?, ?, ?, ?, ?)
-                    ''', (first_name, last_name, otchestvo, passport, phone))
+                cursor.execute('''
+                            INSERT INTO guests (first_name, last_name, patronymic, passport_number, phone_number)
+                            VALUES (?, ?, ?, ?, ?)
+                        ''', (first_name, last_name, otchestvo, passport, phone))
 
-            guest_id = cursor.lastrowid
+                guest_id = cursor.lastrowid
 
-            cursor.execute('SELECT id FROM rooms WHERE room_number = ?', (guest_number,))
-            room_id = cursor.fetchone()[0]
+                cursor.execute('SELECT id FROM rooms WHERE room_number = ?', (guest_number,))
+                room_id = cursor.fetchone()[0]
 
-            cursor.execute('''
-                        INSERT INTO bookings (guest_id, room_id, check_in_date, check_out_date)
-                        VALUES (?, ?, ?, ?)
-                    ''', (guest_id, room_id, in_date, out_date))
-            conn.commit()
-            conn.close()
+                cursor.execute('''
+                            INSERT INTO bookings (guest_id, room_id, check_in_date, check_out_date)
+                            VALUES (?, ?, ?, ?)
+                        ''', (guest_id, room_id, in_date, out_date))
+                publish(conn, BOOKINGS)
             QMessageBox.information(self, "Успех",
                                     f"Гость успешно заселен\n"
                                     f"Номер: {guest_number}\n"
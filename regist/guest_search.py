@@ -0,0 +1,117 @@
+import sqlite3
+from collections import namedtuple
+from datetime import date
+
+from db_pool import get_connection
+
+# Полнотекстовый индекс по гостям: поиск по любой части ФИО, паспорта и телефона
+FTS_TABLE = 'guests_fts'
+FTS_COLUMNS = ('last_name', 'first_name', 'patronymic', 'passport_number', 'phone_number')
+# Триграммный индекс находит подстроки не короче трех символов
+MIN_FTS_LENGTH = 3
+SEARCH_LIMIT = 50
+
+GuestMatch = namedtuple('GuestMatch', [
+    'booking_id', 'guest_name', 'room_number', 'check_in', 'check_out'
+])
+
+
+def fts_available(conn):
+    """Есть ли в сборке SQLite FTS5 с триграммным токенайзером (SQLite 3.34+)"""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp.fts_probe USING fts5(text, tokenize='trigram')")
+        conn.execute('DROP TABLE temp.fts_probe')
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def has_search_index(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+    ).fetchone() is not None
+
+
+def install_guest_search(conn):
+    """Индекс поиска гостей и триггеры, которые держат его в актуальном состоянии (шаг миграции).
+
+    Если FTS5 в сборке SQLite нет, индекс не создается и поиск идет через LIKE.
+    """
+    if not fts_available(conn):
+        print("FTS5 недоступен, поиск гостей будет работать без индекса")
+        return
+
+    columns = ', '.join(FTS_COLUMNS)
+    new_values = ', '.join(f'new.{column}' for column in FTS_COLUMNS)
+    old_values = ', '.join(f'old.{column}' for column in FTS_COLUMNS)
+
+    conn.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE}
+        USING fts5({columns}, content='guests', content_rowid='id', tokenize='trigram')
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_guests_fts_insert AFTER INSERT ON guests BEGIN
+            INSERT INTO {FTS_TABLE} (rowid, {columns}) VALUES (new.id, {new_values});
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_guests_fts_delete AFTER DELETE ON guests BEGIN
+            INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_guests_fts_update AFTER UPDATE ON guests BEGIN
+            INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO {FTS_TABLE} (rowid, {columns}) VALUES (new.id, {new_values});
+        END
+    ''')
+    conn.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def search_bookings(text, conn=None, limit=SEARCH_LIMIT, today=None):
+    """Брони гостей, у которых ФИО, паспорт или телефон содержат все слова запроса.
+
+    Поиск идет по всем датам; ближайшие к сегодняшнему дню брони - первыми.
+    """
+    conn = conn or get_connection()
+    today = (today or date.today()).isoformat()
+    words = text.split()
+    if not words:
+        return []
+
+    conditions = []
+    params = []
+
+    long_words = [word for word in words if len(word) >= MIN_FTS_LENGTH]
+    if long_words and has_search_index(conn):
+        # Каждое слово - отдельная фраза в кавычках, все фразы обязательны
+        query = ' AND '.join('"' + word.replace('"', '""') + '"' for word in long_words)
+        conditions.append(f'guests.id IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ?)')
+        params.append(query)
+        like_words = [word for word in words if len(word) < MIN_FTS_LENGTH]
+    else:
+        like_words = words
+
+    searchable = " || ' ' || ".join(f"COALESCE(guests.{column}, '')" for column in FTS_COLUMNS)
+    for word in like_words:
+        # LIKE в SQLite не различает регистр только для латиницы - перебираем варианты написания
+        variants = list(dict.fromkeys((word, word.lower(), word.capitalize(), word.upper())))
+        conditions.append('(' + ' OR '.join(f"({searchable}) LIKE ?" for _ in variants) + ')')
+        params.extend(f'%{variant}%' for variant in variants)
+
+    cursor = conn.execute(f'''
+        SELECT bookings.id,
+               guests.last_name || ' ' || guests.first_name || COALESCE(' ' || guests.patronymic, ''),
+               rooms.room_number,
+               bookings.check_in_date,
+               bookings.check_out_date
+        FROM guests
+        JOIN bookings ON bookings.guest_id = guests.id
+        JOIN rooms ON bookings.room_id = rooms.id
+        WHERE {' AND '.join(conditions)}
+        ORDER BY CASE WHEN bookings.check_out_date >= ? THEN 0 ELSE 1 END,
+                 ABS(julianday(bookings.check_in_date) - julianday(?))
+        LIMIT ?
+    ''', (*params, today, today, limit))
+
+    return [GuestMatch(*row) for row in cursor.fetchall()]
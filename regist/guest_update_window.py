@@ -5,7 +5,10 @@ import sqlite3
 from datetime import datetime
 from regist.guest_registration_window import GuestRegistrationWindow
 from bd_manager import YandexDiskUploader
-from utils import get_resource_path, get_database_path
+from utils import get_resource_path
+from db_pool import get_connection
+from change_bus import publish, BOOKINGS
+from regist.availability import get_availability
 from regist.regist_exceptions import LowerNameError, PassportError, FIOException, DateError, PhoneError
 
 class GuestUpdateWindow(GuestRegistrationWindow):
@@ -66,24 +69,10 @@ class GuestUpdateWindow(GuestRegistrationWindow):
             check_in = self.dateIn.date().toString("yyyy-MM-dd")
             check_out = self.dateOut.date().toString("yyyy-MM-dd")
 
-            db_path = get_database_path()
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-
-            cursor.execute('''
-                SELECT r.room_number 
-                FROM rooms r
-                WHERE r.id NOT IN (
-                    SELECT b.room_id 
-                    FROM bookings b
-                    WHERE b.check_out_date > ? AND b.check_in_date < ?
-                    AND b.id != ?  
-                )
-                ORDER BY r.room_number
-            ''', (check_in, check_out, self.guest_data.get('booking_id', -1)))
-
-            available_rooms = [row[0] for row in cursor.fetchall()]
-            conn.close()
+            # Изменяемая бронь не мешает сама себе
+            available_rooms = get_availability().free_rooms(
+                check_in, check_out, exclude_booking_id=self.guest_data.get('booking_id')
+            )
 
             self.number.clear()
             self.number.addItems(available_rooms)
@@ -116,27 +105,26 @@ class GuestUpdateWindow(GuestRegistrationWindow):
             in_date = self.dateIn.date().toString("yyyy-MM-dd")
             out_date = self.dateOut.date().toString("yyyy-MM-dd")
 
-            db_path = get_database_path()
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
+            conn = get_connection()
+            with conn:
+                cursor = conn.cursor()
 
-            cursor.execute('''
-                UPDATE guests 
-                SET first_name = ?, last_name = ?, patronymic = ?, passport_number = ?, phone_number = ?
-                WHERE id = ?
-            ''', (first_name, last_name, patronymic, passport, phone, self.guest_data.get('guest_id')))
+                cursor.execute('''
+                    UPDATE guests 
+                    SET first_name = ?, last_name = ?, patronymic = ?, passport_number = ?, phone_number = ?
+                    WHERE id = ?
+                ''', (first_name, last_name, patronymic, passport, phone, self.guest_data.get('guest_id')))
 
-            cursor.execute('SELECT id FROM rooms WHERE room_number = ?', (room_number,))
-            room_id = cursor.fetchone()[0]
+                cursor.execute('SELECT id FROM rooms WHERE room_number = ?', (room_number,))
+                room_id = cursor.fetchone()[0]
 
-            cursor.execute('''
-                UPDATE bookings 
-                SET room_id = ?, check_in_date = ?, check_out_date = ?
-                WHERE id = ?
-            ''', (room_id, in_date, out_date, self.guest_data.get('booking_id')))
+                cursor.execute('''
+                    UPDATE bookings 
+                    SET room_id = ?, check_in_date = ?, check_out_date = ?
+                    WHERE id = ?
+                ''', (room_id, in_date, out_date, self.guest_data.get('booking_id')))
+                publish(conn, BOOKINGS)
 
-            conn.commit()
-            conn.close()
 
             QMessageBox.information(self, "Успех",
                                     f"Данные гостя успешно обновлены\n"
@@ -2,12 +2,12 @@ import sqlite3
 from calendar import monthrange
 from datetime import datetime, timedelta
 
-from PyQt6.QtWidgets import QMainWindow, QTableWidgetItem, QDialog, QVBoxLayout, QMessageBox, QMenu
+from PyQt6.QtWidgets import QMainWindow, QDialog, QVBoxLayout, QMessageBox, QMenu, QInputDialog
 from PyQt6.QtCore import pyqtSignal, Qt
 from PyQt6 import uic, QtCore, QtWidgets
 from PyQt6.QtWidgets import QCalendarWidget
 from PyQt6.QtCore import QDate
-from PyQt6.QtGui import QBrush, QColor, QAction
+from PyQt6.QtGui import QAction
 
 from regist.guest_registration_window import GuestRegistrationWindow
 from massage_window import MassageWindow
@@ -15,32 +15,40 @@ from massage_window import MassageWindow
 from regist.guest_update_window import GuestUpdateWindow
 from regist.upload_or_download import UDWindow
 from regist.task_script import TaskWindow
+from regist.booking_grid import MonthGrid, load_month_grid
+from regist.booking_table_model import BookingTableModel
+from regist.guest_search import search_bookings
 
-from utils import get_resource_path, get_database_path
+from utils import get_resource_path
+from db_pool import get_connection
+from change_bus import get_bus, publish, TASKS, BOOKINGS
 from notifications_manager import SimpleNotificationsManager
 
 class RegistrarWindow(QMainWindow):
     closed = pyqtSignal()
 
-    def __init__(self, full_name, username):
+    def __init__(self, session):
         super().__init__()
         self.showMaximized()
-        self.full_name = full_name
-        self.username = username
+        self.session = session
+        self.full_name = session.full_name
+        self.username = session.login
+        self.user_id = session.user_id
         self.current_date = datetime.now()
         self.visible_days = 14
+        self.room_numbers = []
 
         uic.loadUi(get_resource_path('UI/Reg/Регистратор итог.ui'), self)
         self.setWindowTitle(f"Регистратор - {self.full_name}")
         self.current_date_label.setText(QDate.currentDate().toString("dd.MM.yyyy"))
-        self.user_id = self.get_user_id(username)
-
         self.notifications_manager = SimpleNotificationsManager(
             self.user_id,
             self.notifications_frame,
             self
         )
 
+        self.booking_model = BookingTableModel(self)
+        self.guest_table.setModel(self.booking_model)
         self.guest_table.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
 
         self.guest_table.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
@@ -54,16 +62,12 @@ class RegistrarWindow(QMainWindow):
         # self.check_updating_guest_data()
 
 
-        self.checkout_timer = QtCore.QTimer()
-        self.checkout_timer.timeout.connect(self.check_checkout_dates)
-        self.checkout_timer.start(86400000)
-        QtCore.QTimer.singleShot(5000, self.check_checkout_dates)
+        # Задания на уборку по выездам создает фоновый планировщик (scheduler.py)
 
         QtCore.QTimer.singleShot(500, self.updating_guest_data)
 
         QtCore.QTimer.singleShot(50, self.scroll_to_current_date)
 
-        self.last_status_count = 0
         self.setup_task_monitoring()
 
         # self.current_month_label.mousePressEvent = self.on_month_label_click
@@ -136,44 +140,15 @@ class RegistrarWindow(QMainWindow):
         event.accept()
 
     def setup_task_monitoring(self):
-        self.task_check_timer = QtCore.QTimer()
-        self.task_check_timer.timeout.connect(self.check_task_updates)
-        self.task_check_timer.start(15000)
-
-
-    def check_task_updates(self):
-
-        try:
-            db_path = get_database_path()
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-
-
-            cursor.execute('''
-                SELECT GROUP_CONCAT(room_number || ':' || status, '|') 
-                FROM maintenance_tasks 
-                WHERE status IN ('в работе', 'в ожидании уборки', 'убрано')
-                ORDER BY room_number
-            ''')
-
-            current_status_hash = cursor.fetchone()[0] or ""
-            conn.close()
-
-
-            if not hasattr(self, 'last_status_hash') or current_status_hash != self.last_status_hash:
-                self.last_status_hash = current_status_hash
-                self.update_status_column()
-
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка")
-
-    def closeEvent(self, event):
-        if hasattr(self, 'task_check_timer'):
-            self.task_check_timer.stop()
-        if hasattr(self, 'notifications_manager'):
-            self.notifications_manager.stop_updates()
-        super().closeEvent(event)
+        # Статусы уборки и шахматка обновляются по событиям шины изменений
+        bus = get_bus()
+        bus.subscribe(TASKS, self.update_status_column)
+        bus.subscribe(BOOKINGS, self.updating_guest_data)
 
+    def stop_task_monitoring(self):
+        bus = get_bus()
+        bus.unsubscribe(self.update_status_column)
+        bus.unsubscribe(self.updating_guest_data)
 
     def scroll_to_current_date(self):
         try:
@@ -188,28 +163,13 @@ class RegistrarWindow(QMainWindow):
 
 
             if today.year == self.current_date.year and today.month == self.current_date.month:
+                index = self.booking_model.index(0, target_day)
 
-                for column in range(1, self.guest_table.columnCount()):
-                    header = self.guest_table.horizontalHeaderItem(column)
-                    if header:
-                        header_text = header.text()
-                        try:
-                            day = int(header_text.split()[0])
-                            if day == target_day:
-                                self.guest_table.horizontalScrollBar().setValue(column)
+                if index.isValid():
+                    self.guest_table.scrollTo(index)
+                    self.guest_table.setCurrentIndex(index)
 
-                                if self.guest_table.rowCount() > 0:
-                                    self.guest_table.setCurrentCell(0, column)
-
-
-                                self.guest_table.verticalScrollBar().setValue(0)
-                                break
-                        except (ValueError, IndexError):
-                            continue
-                else:
-                    pass
-            else:
-                pass
+                self.guest_table.verticalScrollBar().setValue(0)
 
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Ошибка прокрутки к текущей дате")
@@ -222,144 +182,86 @@ class RegistrarWindow(QMainWindow):
                 QMessageBox.information(self, "Поиск", "Введите фамилию для поиска")
                 return
 
-            found_cells = []
-
-            for row in range(self.guest_table.rowCount()):
-                for column in range(1, self.guest_table.columnCount()):  # Пропускаем столбец статусов
-                    item = self.guest_table.item(row, column)
-                    if item and item.text():
-                        if search_text.lower() in item.text().lower():
-                            found_cells.append((row, column, item.text()))
-
-            if found_cells:
-                row, column, guest_name = found_cells[0]
-
-                self.scroll_to_cell(row, column)
+            # Поиск по индексу гостей за все даты, а не только в открытом месяце
+            matches = search_bookings(search_text)
 
-                self.highlight_found_cell(row, column)
-
-                QMessageBox.information(
-                    self,
-                    "Найден",
-                    f"Гость: {guest_name}"
-                )
-
-            else:
+            if not matches:
                 QMessageBox.information(
                     self,
                     "Не найдено",
                     f"Гость с фамилией '{search_text}' не найден"
                 )
+                return
 
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка прокрутки к текущей дате: {e}")
-
-    def scroll_to_cell(self, row, column):
-        try:
-            self.guest_table.horizontalScrollBar().setValue(column)
-
-            self.guest_table.verticalScrollBar().setValue(row)
+            match = matches[0]
+            if len(matches) > 1:
+                titles = [
+                    f"{m.guest_name} - номер {m.room_number}, "
+                    f"{self.format_date(m.check_in)} - {self.format_date(m.check_out)}"
+                    for m in matches
+                ]
+                title, ok = QInputDialog.getItem(self, "Найдено", "Выберите бронь:", titles, 0, False)
+                if not ok:
+                    return
+                match = matches[titles.index(title)]
 
-            self.guest_table.setCurrentCell(row, column)
+            self.show_booking(match)
 
         except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка прокрутки к текущей дате: {e}")
-
+            QMessageBox.critical(self, "Ошибка", f"Ошибка поиска гостя: {e}")
 
+    def format_date(self, value):
+        return datetime.strptime(value, '%Y-%m-%d').strftime('%d.%m.%Y')
 
-    def highlight_found_cell(self, row, column):
-        try:
-            item = self.guest_table.item(row, column)
-            if item:
-                original_color = item.background()
+    def show_booking(self, match):
+        """Переходит к месяцу брони и выделяет ее ячейку"""
+        check_in = datetime.strptime(match.check_in, '%Y-%m-%d').date()
+        check_out = datetime.strptime(match.check_out, '%Y-%m-%d').date()
+        # Если гость живет сейчас - показываем сегодняшний день, иначе день заезда
+        today = datetime.now().date()
+        target_day = today if check_in <= today <= check_out else check_in
 
-                item.setBackground(QBrush(QColor("#FFD700")))
+        if (target_day.year, target_day.month) != (self.current_date.year, self.current_date.month):
+            self.current_date = datetime(target_day.year, target_day.month, 1)
+            self.update_month_display()
+            self.updating_guest_data()
 
-                QtCore.QTimer.singleShot(3000, lambda: item.setBackground(original_color))
+        row = self.booking_model.room_row(match.room_number)
+        column = self.booking_model.column_for_date(target_day)
+        if row < 0 or column < 0:
+            return
 
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка")
+        self.scroll_to_cell(row, column)
+        self.highlight_found_cell(row, column)
 
-    def check_checkout_dates(self):
+    def scroll_to_cell(self, row, column):
         try:
-            db_path = get_database_path()
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-
-            today = datetime.now().strftime('%Y-%m-%d')
-
-            cursor.execute('''
-                SELECT DISTINCT r.room_number
-                FROM bookings b
-                JOIN rooms r ON b.room_id = r.id
-                WHERE b.check_out_date = ?
-            ''', (today,))
-
-            today_checkouts = cursor.fetchall()
-            created_tasks_count = 0
-
-            for room_data in today_checkouts:
-                room_number = room_data[0]
-
-                cursor.execute('''
-                    SELECT id FROM maintenance_tasks 
-                    WHERE room_number = ? 
-                    AND status IN ('в работе', 'в ожидании уборки')
-                ''', (room_number,))
-
-                existing_task = cursor.fetchone()
-
-                if not existing_task:
-                    try:
-                        cleaning_task = TaskWindow(room_number, self.user_id)
-                        cleaning_task.create_task(self.user_id)
-                        created_tasks_count += 1
-                    except Exception as e:
-                        QMessageBox.critical(self, "Ошибка", f"Ошибка создания задания на уборку: {e}")
-            conn.close()
+            index = self.booking_model.index(row, column)
 
-            if created_tasks_count > 0:
-                self.update_status_column()
+            self.guest_table.scrollTo(index, QtWidgets.QAbstractItemView.ScrollHint.PositionAtCenter)
 
+            self.guest_table.setCurrentIndex(index)
 
         except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка проверки дат выселения: {e}")
+            QMessageBox.critical(self, "Ошибка", f"Ошибка прокрутки к текущей дате: {e}")
 
-    def get_status_display_name(self, status):
-        status_names = {
-            'в работе': "⚡ В работе",
-            'в ожидании уборки': "⏳ Ожидание уборки",
-            'убрано': "✨ Убрано"
-        }
-        return status_names.get(status, f"📋 {status}")
 
-    def apply_status_text_style(self, item, status):
-        text_colors = {
-            'в работе': '#2196F3',
-            'в ожидании уборки': '#FF9800',
-            'убрано': '#9C27B0'
-        }
 
-        color = text_colors.get(status, '#000000')
+    def highlight_found_cell(self, row, column):
+        try:
+            if self.booking_model.booking_at(row, column):
+                self.booking_model.highlight_cell(row, column)
 
-        item.setForeground(QBrush(QColor(color)))
+                QtCore.QTimer.singleShot(3000, self.booking_model.clear_highlight)
 
-        font = item.font()
-        font.setBold(True)
-        item.setFont(font)
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Ошибка")
 
     def update_status_column(self):
         try:
-            db_path = get_database_path()
-            conn = sqlite3.connect(db_path)
+            conn = get_connection()
             cursor = conn.cursor()
 
-            for row in range(self.guest_table.rowCount()):
-                status_item = QTableWidgetItem("✨ Убрано")
-                status_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                self.apply_status_text_style(status_item, "убрано")
-                self.guest_table.setItem(row, 0, status_item)
-
             cursor.execute('''
                 SELECT DISTINCT room_number, status 
                 FROM maintenance_tasks 
@@ -370,68 +272,44 @@ class RegistrarWindow(QMainWindow):
 
             active_tasks = cursor.fetchall()
 
-            for room_number, status in active_tasks:
-                row = self.find_room_row(room_number)
-                if row != -1:
-                    status_display = self.get_status_display_name(status)
-                    status_item = QTableWidgetItem(status_display)
-                    status_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                    self.apply_status_text_style(status_item, status)
-                    self.guest_table.setItem(row, 0, status_item)
-
-            conn.close()
+            self.booking_model.set_room_statuses(
+                {str(room_number): status for room_number, status in active_tasks}
+            )
 
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Ошибка обновления статусов")
 
     def find_room_row(self, room_number):
-        for row in range(self.guest_table.rowCount()):
-            header_item = self.guest_table.verticalHeaderItem(row)
-            if header_item and header_item.text() == str(room_number):
-                return row
-        return -1
+        return self.booking_model.room_row(room_number)
 
     def upload_or_download(self):
 
         self.udwindow = UDWindow(on_data_updated=self.updating_guest_data)
         self.udwindow.show()
 
-    def get_user_id(self, username):
-        try:
-            db_path = get_database_path()
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            cursor.execute('SELECT id FROM staff WHERE login = ?', (username,))
-            result = cursor.fetchone()
-            conn.close()
-            return result[0] if result else 1
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка")
-            return 1
-
     def closeEvent(self, event):
+        self.stop_task_monitoring()
         if hasattr(self, 'notifications_manager'):
             self.notifications_manager.stop_updates()
         super().closeEvent(event)
 
-    def get_guest_data(self, row, column):
-        try:
-            room_number = self.guest_table.verticalHeaderItem(row).text()
-            guest_name = self.guest_table.item(row, column).text()
+    def get_cell_info(self, row, column):
+        room_number = self.booking_model.room_number(row)
+        booking = self.booking_model.booking_at(row, column)
+        guest_name = booking.guest_name if booking else ""
 
-            header = self.guest_table.horizontalHeaderItem(column)
-            date_info = header.text() if header else "неизвестная дата"
+        date_info = self.booking_model.headerData(column, Qt.Orientation.Horizontal) or "неизвестная дата"
+        cell_date = self.booking_model.date_for_column(column)
+        current_date_str = (cell_date or self.current_date).strftime('%Y-%m-%d')
 
-            try:
-                day = int(date_info.split()[0])
-                current_date = datetime(self.current_date.year, self.current_date.month, day)
-                current_date_str = current_date.strftime('%Y-%m-%d')
-            except:
-                current_date_str = self.current_date.strftime('%Y-%m-%d')
+        return room_number, guest_name, date_info, current_date_str
 
+    def get_guest_data(self, row, column):
+        try:
+            room_number, guest_name, date_info, current_date_str = self.get_cell_info(row, column)
 
-            db_path = get_database_path()
-            conn = sqlite3.connect(db_path)
+
+            conn = get_connection()
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -455,7 +333,6 @@ class RegistrarWindow(QMainWindow):
             ''', (room_number, current_date_str, current_date_str))
 
             booking_info = cursor.fetchone()
-            conn.close()
 
             if booking_info:
                 (guest_id, first_name, last_name, patronymic, phone,
@@ -502,9 +379,9 @@ class RegistrarWindow(QMainWindow):
             column = index.column()
 
             if column > 0:
-                item = self.guest_table.item(row, column)
+                booking = self.booking_model.booking_at(row, column)
 
-                if item and item.text().strip():
+                if booking and booking.guest_name:
 
                     context_menu = QMenu(self)
 
@@ -528,7 +405,7 @@ class RegistrarWindow(QMainWindow):
 
     def show_task_window(self,row):
         try:
-            self.room_number = self.guest_table.verticalHeaderItem(row).text()
+            self.room_number = self.booking_model.room_number(row)
             self.task_window = TaskWindow(self.room_number, self.user_id)
             self.task_window.task_created.connect(self.update_status_column)
             self.task_window.show()
@@ -538,21 +415,9 @@ class RegistrarWindow(QMainWindow):
 
     def show_guest_info(self, row, column):
         try:
-            room_number = self.guest_table.verticalHeaderItem(row).text()
-            guest_name = self.guest_table.item(row, column).text()
-
-            header = self.guest_table.horizontalHeaderItem(column)
-            date_info = header.text() if header else "неизвестная дата"
+            room_number, guest_name, date_info, current_date_str = self.get_cell_info(row, column)
 
-            try:
-                day = int(date_info.split()[0])
-                current_date = datetime(self.current_date.year, self.current_date.month, day)
-                current_date_str = current_date.strftime('%Y-%m-%d')
-            except:
-                current_date_str = self.current_date.strftime('%Y-%m-%d')
-
-            db_path = get_database_path()
-            conn = sqlite3.connect(db_path)
+            conn = get_connection()
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -575,7 +440,6 @@ class RegistrarWindow(QMainWindow):
             ''', (room_number, current_date_str, current_date_str))
 
             booking_info = cursor.fetchone()
-            conn.close()
 
             if booking_info:
                 (first_name, last_name, patronymic, phone,
@@ -616,18 +480,7 @@ class RegistrarWindow(QMainWindow):
 
     def delete_booking(self, row, column):
         try:
-            room_number = self.guest_table.verticalHeaderItem(row).text()
-            guest_name = self.guest_table.item(row, column).text()
-
-            header = self.guest_table.horizontalHeaderItem(column)
-            date_info = header.text() if header else "неизвестная дата"
-
-            try:
-                day = int(date_info.split()[0])
-                current_date = datetime(self.current_date.year, self.current_date.month, day)
-                current_date_str = current_date.strftime('%Y-%m-%d')
-            except:
-                current_date_str = self.current_date.strftime('%Y-%m-%d')
+            room_number, guest_name, date_info, current_date_str = self.get_cell_info(row, column)
 
             reply = QMessageBox.question(
                 self,
@@ -641,8 +494,7 @@ class RegistrarWindow(QMainWindow):
             )
 
             if reply == QMessageBox.StandardButton.Yes:
-                db_path = get_database_path()
-                conn = sqlite3.connect(db_path)
+                conn = get_connection()
                 cursor = conn.cursor()
 
                 cursor.execute('''
@@ -660,8 +512,9 @@ class RegistrarWindow(QMainWindow):
                 if booking_id_result:
                     booking_id = booking_id_result[0]
 
-                    cursor.execute('DELETE FROM bookings WHERE id = ?', (booking_id,))
-                    conn.commit()
+                    with conn:
+                        conn.execute('DELETE FROM bookings WHERE id = ?', (booking_id,))
+                        publish(conn, BOOKINGS)
                     QMessageBox.information(
                         self,
                         "Успех",
@@ -681,9 +534,6 @@ class RegistrarWindow(QMainWindow):
                         "Бронь не найдена в базе данных для указанной даты"
                     )
 
-                conn.close()
-
-
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Не удалось удалить бронь: {str(e)}")
 
@@ -699,102 +549,17 @@ class RegistrarWindow(QMainWindow):
 
         self.guest_table.setFocusPolicy(Qt.FocusPolicy.NoFocus)
 
-    def clear_table_data(self):
-        for row in range(self.guest_table.rowCount()):
-            for column in range(1, self.guest_table.columnCount()):
-                self.guest_table.setItem(row, column, None)
-
     def updating_guest_data(self):
         try:
-            self.clear_table_data()
-            db_path = get_database_path()
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-
-            first_day_of_month = self.current_date.replace(day=1).strftime('%Y-%m-%d')
-            last_day_of_month = (self.current_date.replace(day=1) + timedelta(days=32)).replace(day=1) - timedelta(
-                days=1)
-            last_day_of_month_str = last_day_of_month.strftime('%Y-%m-%d')
-
-            cursor.execute('''
-                SELECT rooms.room_number, 
-                       last_name || ' ' || SUBSTR(first_name, 1, 1) || '. ' || SUBSTR(patronymic, 1, 1) || '.' as guest_name, 
-                       check_in_date, 
-                       check_out_date 
-                FROM bookings 
-                JOIN guests ON bookings.guest_id = guests.id
-                JOIN rooms ON bookings.room_id = rooms.id
-                WHERE check_in_date <= ? AND check_out_date >= ?
-            ''', (last_day_of_month_str, first_day_of_month))
-
-            guests = cursor.fetchall()
-            today = datetime.now().date()
-
-            for guest in guests:
-                room_number = guest[0]
-                guest_name = guest[1]
-                check_in_date = datetime.strptime(guest[2], '%Y-%m-%d').date()
-                check_out_date = datetime.strptime(guest[3], '%Y-%m-%d').date()
-
-                row = -1
-                for i in range(self.guest_table.rowCount()):
-                    header_item = self.guest_table.verticalHeaderItem(i)
-                    if header_item and header_item.text() == room_number:
-                        row = i
-                        break
-
-                if row == -1:
-                    continue
-
-                first_day_set = False
-                for column in range(1, self.guest_table.columnCount()):
-                    header = self.guest_table.horizontalHeaderItem(column)
-                    if header:
-                        header_text = header.text()
-                        try:
-                            day = int(header_text.split()[0])
-                            header_date = datetime(self.current_date.year, self.current_date.month, day).date()
-
-                            if check_in_date <= header_date <= check_out_date:
-                                item = QTableWidgetItem(guest_name)
-                                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-
-
-                                if check_out_date < today:
-
-                                    color = "#B0B0B0"
-                                    status = "прошла"
-                                elif check_in_date <= today <= check_out_date:
-
-                                    color = "#74E868"
-                                    status = "сейчас"
-                                else:
-
-                                    color = "#68B5E8"
-                                    status = "будет"
-
-                                item.setBackground(QBrush(QColor(color)))
-                                if not first_day_set and header_date == check_in_date:
-                                    first_day_set = True
-                                    item.setForeground(QBrush(QColor("#000000")))
-                                else:
-                                    item.setForeground(QBrush(QColor(color)))
-
-                                self.guest_table.setItem(row, column, item)
-
-                        except (ValueError, IndexError):
-                            continue
+            self.booking_model.set_grid(
+                load_month_grid(self.room_numbers, self.current_date.year, self.current_date.month)
+            )
 
-            conn.close()
             self.update_status_column()
 
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", str(e))
 
-
-
-
-
     def on_month_label_click(self, event):
         self.show_month_picker()
 
@@ -830,29 +595,20 @@ class RegistrarWindow(QMainWindow):
         self.guest_window.show()
 
     def open_massage(self):
-        self.massage_window = MassageWindow(full_name=self.full_name)
+        self.massage_window = MassageWindow(self.session)
         self.massage_window.show()
 
     def fill_rooms(self):
         try:
-            db_path = get_database_path()
-            conn = sqlite3.connect(db_path)
+            conn = get_connection()
             cursor = conn.cursor()
 
             cursor.execute('SELECT room_number FROM rooms ORDER BY room_number')
             rooms = cursor.fetchall()
 
-            self.guest_table.setRowCount(0)
-            self.guest_table.setRowCount(len(rooms))
-
-
-            for row, room_data in enumerate(rooms):
-                room_number = str(room_data[0])
+            self.room_numbers = [str(room_data[0]) for room_data in rooms]
+            self.booking_model.set_grid(MonthGrid(self.room_numbers, self.current_date.year, self.current_date.month))
 
-                item = QTableWidgetItem(room_number)
-                self.guest_table.setVerticalHeaderItem(row, item)
-
-            conn.close()
 
         except sqlite3.Error as e:
             QMessageBox.critical(self, "Ошибка загрузки данных о постояльцах", str(e))
@@ -861,44 +617,9 @@ class RegistrarWindow(QMainWindow):
             # import traceback
             # traceback.print_exc()
 
-    def get_month_dates(self):
-        year = self.current_date.year
-        month = self.current_date.month
-
-        _, num_days = monthrange(year, month)
-
-        dates = []
-        for day in range(1, num_days + 1):
-            date = datetime(year, month, day)
-            dates.append(date)
-
-        return dates
-
     def update_headers(self):
-        dates = self.get_month_dates()
-
-        self.guest_table.setColumnCount(len(dates) + 1)
-
-        self.guest_table.setHorizontalHeaderItem(0, QTableWidgetItem("Статус"))
-
-        for col, date in enumerate(dates, 1):
-            day_name = self.get_day_name(date.weekday())
-            header_text = f"{date.day} {day_name}"
-            header_item = QTableWidgetItem(header_text)
-            header_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.guest_table.setHorizontalHeaderItem(col, header_item)
-
-    def get_day_name(self, weekday):
-        days = {
-            0: "Пн",
-            1: "Вт",
-            2: "Ср",
-            3: "Чт",
-            4: "Пт",
-            5: "Сб",
-            6: "Вс"
-        }
-        return days.get(weekday, "")
+        # Заголовки дней строит модель; до загрузки броней месяц показывается пустым
+        self.booking_model.set_grid(MonthGrid(self.room_numbers, self.current_date.year, self.current_date.month))
 
     def update_month_display(self):
         try:
@@ -1,11 +1,11 @@
-import pickle
 import sqlite3
 
 from PyQt6.QtWidgets import QMainWindow, QDialog, QMessageBox
 from PyQt6.QtCore import pyqtSignal
 from PyQt6 import uic
 
-from utils import get_resource_path, get_database_path
+from utils import get_resource_path
+from task_service import create_cleaning_tasks
 
 
 class TaskWindow(QDialog):
@@ -24,39 +24,10 @@ class TaskWindow(QDialog):
 
     def create_task(self, user_id):
         try:
-            db_path = get_database_path()
-            db_path = get_resource_path(db_path)
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-
             comment_text = self.comment_text.toPlainText().strip()
             notes = comment_text if comment_text else None
 
-            binary_message = pickle.dumps(f"Требуется убраться в комнате номер: {self.room_number}")
-
-
-
-            cursor.execute('''INSERT INTO maintenance_tasks 
-                              (room_number, description, created_by, status, notes) 
-                              VALUES (?, ?, ?, ?, ?)''',
-                           (str(self.room_number),
-                            f"Убраться в комнате номер: {self.room_number}",
-                            user_id,
-                            'в ожидании уборки',
-                            notes))
-
-            cursor.execute('''SELECT id FROM staff 
-                                     WHERE position = 'обслуживающий персонал' ''')
-
-            staff_members = cursor.fetchall()
-            for staff_member in staff_members:
-                staff_id = staff_member[0]
-                cursor.execute('''INSERT INTO messages (from_user, to_user, text)
-                                        VALUES (?, ?, ?)''',
-                               (user_id, staff_id, binary_message))
-
-            conn.commit()
-            conn.close()
+            create_cleaning_tasks([self.room_number], user_id, notes, skip_active=False)
 
             QMessageBox.information(self,"Успех",f"Задание на уборку комнаты {self.room_number} создано!\n")
 
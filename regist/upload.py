@@ -1,4 +1,3 @@
-import csv
 import sqlite3
 from datetime import datetime, timedelta
 
@@ -7,7 +6,9 @@ from PyQt6.QtWidgets import QMainWindow, QDialog, QTableWidgetItem, QFileDialog,
 from PyQt6.QtCore import pyqtSignal, Qt
 from PyQt6 import uic
 from regist.regist_exceptions import EmptyPathError, InvalidFileFormatError
-from utils import get_database_path, get_resource_path
+from regist.booking_export import (BookingExportWorker, ExportCancelled, REPORT_HEADERS,
+                                   fetch_preview)
+from utils import get_resource_path
 
 
 class UploadWindow(QMainWindow):
@@ -17,6 +18,8 @@ class UploadWindow(QMainWindow):
 
         uic.loadUi(get_resource_path('UI/Reg/Окно сохранения данных.ui'), self)
         self.setWindowTitle(f"Сохранение данных о брони")
+        self.export_worker = None
+        self.close_after_export = False
         self.get_data()
 
         self.allowed_formats = ['.csv', '.txt']
@@ -56,18 +59,24 @@ class UploadWindow(QMainWindow):
 
             if clicked_button == save_button:
                 self.save()
-                self.close()
+                # Окно закроется, когда фоновая выгрузка закончится
+                if self.is_exporting():
+                    self.close_after_export = True
+                else:
+                    self.close()
             elif clicked_button == close_button:
                 self.close()
         else:
             self.close()
 
     def validate_file_format(self, file_path):
-        file_extension = file_path[file_path.rfind('.'):].lower()
+        # report.csv.gz - тот же CSV, только сжатый
+        name = file_path.lower().removesuffix('.gz')
+        file_extension = name[name.rfind('.'):]
         if file_extension not in self.allowed_formats:
             raise InvalidFileFormatError(
                 f"Недопустимый формат файла: {file_extension}. "
-                f"Разрешены только: {', '.join(self.allowed_formats)}"
+                f"Разрешены только: {', '.join(self.allowed_formats)} (можно со сжатием .gz)"
             )
 
     def show_ud_window(self):
@@ -85,75 +94,58 @@ class UploadWindow(QMainWindow):
 
             self.validate_file_format(current_file_path)
 
-            if current_file_path.lower().endswith('.txt'):
-                self.save_as_txt(current_file_path)
-            else:
-                self.save_as_csv(current_file_path)
+            if self.is_exporting():
+                return
 
-            QMessageBox.information(self, "Успех", f"Отчет успешно сохранен в:\n{current_file_path}")
-            self.filePathEdit.clear()
+            # Выгрузка идет в фоновом потоке порциями прямо из базы в файл
+            self.export_path = current_file_path
+            self.export_worker = BookingExportWorker(current_file_path, self.start_date)
+            self.export_worker.progress.connect(self.on_export_progress)
+            self.export_worker.export_finished.connect(self.on_export_finished)
+            self.export_worker.export_failed.connect(self.on_export_failed)
+
+            self.exportButton.setEnabled(False)
+            self.statusBar().showMessage("Выгрузка отчета...")
+            self.export_worker.start()
         except EmptyPathError:
             QMessageBox.critical(self, "Ошибка пустого пути", "Выберите путь для записи")
 
         except InvalidFileFormatError as e:
             QMessageBox.critical(self, "Ошибка формата файла", str(e))
-        except PermissionError:
-            QMessageBox.critical(self, "Ошибка доступа", "Файл заблокирован или нет прав для записи")
 
-        except FileNotFoundError:
+    def is_exporting(self):
+        return self.export_worker is not None and self.export_worker.isRunning()
+
+    def on_export_progress(self, written):
+        self.statusBar().showMessage(f"Выгружено строк: {written} из {self.total_rows}")
+
+    def on_export_finished(self, written):
+        self.exportButton.setEnabled(True)
+        self.statusBar().showMessage(f"Выгружено строк: {written}")
+        QMessageBox.information(self, "Успех", f"Отчет успешно сохранен в:\n{self.export_path}")
+        self.filePathEdit.clear()
+        self.close_if_requested()
+
+    def on_export_failed(self, error):
+        self.exportButton.setEnabled(True)
+        self.statusBar().clearMessage()
+        if isinstance(error, ExportCancelled):
+            pass
+        elif isinstance(error, PermissionError):
+            QMessageBox.critical(self, "Ошибка доступа", "Файл заблокирован или нет прав для записи")
+        elif isinstance(error, FileNotFoundError):
             QMessageBox.critical(self, "Ошибка пути", "Указан неверный путь к файлу")
-        except UnicodeEncodeError:
+        elif isinstance(error, UnicodeEncodeError):
             QMessageBox.critical(self, "Ошибка кодировки", "Ошибка при сохранении русских символов")
+        elif isinstance(error, sqlite3.Error):
+            QMessageBox.critical(self, "Ошибка базы данных", "Не удалось выгрузить данные")
+        else:
+            QMessageBox.critical(self, "Неизвестная ошибка", f"Произошла непредвиденная ошибка:\n{str(error)}")
+        self.close_if_requested()
 
-        except Exception as e:
-            QMessageBox.critical(self, "Неизвестная ошибка", f"Произошла непредвиденная ошибка:\n{str(e)}")
-
-    def save_as_csv(self, file_path):
-        with open(file_path, 'w', newline='', encoding='utf-8-sig') as f:
-            writer = csv.writer(
-                f,
-                delimiter=';',
-                quotechar='"',
-                quoting=csv.QUOTE_MINIMAL)
-            writer.writerow(
-                [self.previewTable.horizontalHeaderItem(i).text()
-                 for i in range(self.previewTable.columnCount())
-                 ]
-            )
-
-            for i in self.data:
-                writer.writerow(i)
-
-    def save_as_txt(self, file_path):
-        with open(file_path, 'w', encoding='utf-8') as f:
-
-            f.write("ОТЧЕТ О БРОНИРОВАНИЯХ\n")
-            f.write("=" * 100 + "\n")
-            f.write(
-                f"Период: с {self.start_date.strftime('%d.%m.%Y')} по {datetime.now().date().strftime('%d.%m.%Y')}\n")
-            f.write("=" * 100 + "\n\n")
-
-
-            headers = [self.previewTable.horizontalHeaderItem(i).text() for i in range(self.previewTable.columnCount())]
-
-
-            col_widths = [len(header) for header in headers]
-            for row in self.data:
-                for i, cell in enumerate(row):
-                    col_widths[i] = max(col_widths[i], len(str(cell)))
-
-            col_widths = [width + 2 for width in col_widths]
-
-
-            header_line = "".join([headers[i].ljust(col_widths[i]) for i in range(len(headers))])
-            f.write(header_line + "\n")
-            f.write("-" * len(header_line) + "\n")
-
-            for row in self.data:
-                row_line = "".join([str(cell).ljust(col_widths[i]) for i, cell in enumerate(row)])
-                f.write(row_line + "\n")
-
-            f.write("\n" + "=" * 100 + "\n")
+    def close_if_requested(self):
+        if self.close_after_export:
+            self.close()
 
     def browse(self):
 
@@ -162,7 +154,8 @@ class UploadWindow(QMainWindow):
                 self,
                 "Сохранить отчет о бронированиях",
                 f"отчет_бронирования_за_период_{self.start_date.strftime('%d.%m.%Y')}-{datetime.now().date().strftime('%d.%m.%Y')}",
-                "CSV Files (*.csv);;Text Files (*.txt)"
+                "CSV Files (*.csv);;Text Files (*.txt);;"
+                "CSV gzip (*.csv.gz);;Text gzip (*.txt.gz)"
             )
 
             if file_path:
@@ -177,9 +170,8 @@ class UploadWindow(QMainWindow):
                 self.previewTable.setRowCount(0)
                 return
 
-            headers = ['Номер', 'Гость', 'Заезд', 'Выезд', 'Ночей', 'Тип', 'Стоимость', 'Общая стоимость', 'Статус']
-            self.previewTable.setColumnCount(len(headers))
-            self.previewTable.setHorizontalHeaderLabels(headers)
+            self.previewTable.setColumnCount(len(REPORT_HEADERS))
+            self.previewTable.setHorizontalHeaderLabels(REPORT_HEADERS)
 
             self.previewTable.setRowCount(len(data))
 
@@ -204,35 +196,22 @@ class UploadWindow(QMainWindow):
             elif self.yearRadio.isChecked():
                 self.start_date = today - timedelta(days=365)
 
-            db_path = get_database_path()
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            cursor.execute('''SELECT 
-                                         room_number, 
-                                         last_name || '.' || SUBSTR(first_name,1,1) || '.' || SUBSTR(patronymic,1,1) as guest_initials, 
-                                         check_in_date, 
-                                         check_out_date,
-                                         CAST(JULIANDAY(check_out_date) - JULIANDAY(check_in_date) AS INTEGER) as nights,
-                                         room_type, 
-                                         price_per_night, 
-                                         (CAST(JULIANDAY(check_out_date) - JULIANDAY(check_in_date) AS INTEGER) * price_per_night) as total_cost,
-                                         CASE 
-                                           WHEN date(check_out_date) < date('now') THEN 'Завершено'
-                                           WHEN date(check_in_date) <= date('now') THEN 'Активно'
-                                           ELSE 'Ожидается'
-                                         END as booking_status
-                                FROM rooms JOIN bookings ON rooms.id = bookings.room_id 
-                                JOIN guests ON bookings.guest_id = guests.id
-                                WHERE check_in_date BETWEEN date(?) AND date('now')
-                                ORDER BY check_in_date, room_number''', (self.start_date.strftime('%Y-%m-%d'),))
-
-            self.data = cursor.fetchall()
-            self.update_preview_table(self.data)
+            # Для предпросмотра читаем только первую страницу, весь период выгружает save()
+            self.preview_data, self.total_rows = fetch_preview(self.start_date)
+            if self.total_rows > len(self.preview_data):
+                self.statusBar().showMessage(
+                    f"Показаны первые {len(self.preview_data)} строк из {self.total_rows}")
+            else:
+                self.statusBar().showMessage(f"Строк за период: {self.total_rows}")
+            self.update_preview_table(self.preview_data)
         except sqlite3.Error as e:
             QMessageBox.critical(self, "Ошибка базы данных", f"Не удалось загрузить базу данных")
         except Exception as e:
             QMessageBox.critical(self, "Ошибка загрузки данных", f"Произошла непредвиденная ошибка:\n{str(e)}")
 
     def closeEvent(self, event):
+        if self.is_exporting():
+            self.export_worker.cancel()
+            self.export_worker.wait()
         self.closed.emit()
         event.accept()
\ No newline at end of file
@@ -0,0 +1,538 @@
+# replication.py
+import json
+import sqlite3
+import uuid
+
+from change_bus import publish, TASKS, MESSAGES, BOOKINGS
+from db_pool import get_connection
+
+# Реплицируемые таблицы и внешние ключи на другие реплицируемые таблицы.
+# Сотрудники и номера не реплицируются: их id на всех станциях одинаковые.
+REPLICATED_TABLES = {
+    'guests': {},
+    'bookings': {'guest_id': 'guests'},
+    'maintenance_tasks': {},
+    'messages': {},
+}
+
+TABLE_TOPICS = {
+    'bookings': BOOKINGS,
+    'guests': BOOKINGS,
+    'maintenance_tasks': TASKS,
+    'messages': MESSAGES,
+}
+
+# Станция-источник строк, которые были в базе до включения журнала:
+# все станции начинают с одной копии базы, и у этих строк id везде одинаковые
+SHARED_NODE = "*"
+CHANGES_DIR = "changes"
+BATCH_FORMAT = 1
+# Сколько дней хранить последнюю запись журнала об уже отправленной строке:
+# по ней решается, чье изменение новее, если строку изменили на двух станциях
+CHANGE_LOG_DAYS = 30
+
+
+class ReplicationError(Exception):
+    pass
+
+
+def install_change_log(conn):
+    """Таблицы журнала изменений и триггеры (шаг миграции)"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            op TEXT NOT NULL,
+            changed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_change_log_row ON change_log (table_name, row_id)')
+
+    # Пока в таблице есть строка, триггеры не пишут в журнал: так чужие изменения,
+    # применяемые репликацией, не уходят обратно. Строка живет только внутри
+    # транзакции применения и другим соединениям не видна.
+    conn.execute('CREATE TABLE IF NOT EXISTS replication_guard (active INTEGER)')
+
+    # Соответствие строк, пришедших с других станций, локальным id
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS replication_ids (
+            table_name TEXT NOT NULL,
+            origin_node TEXT NOT NULL,
+            origin_id INTEGER NOT NULL,
+            local_id INTEGER NOT NULL,
+            PRIMARY KEY (table_name, origin_node, origin_id)
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_replication_ids_local ON replication_ids (table_name, local_id)')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS replication_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    ''')
+    for table in REPLICATED_TABLES:
+        conn.execute(f'''
+            INSERT OR IGNORE INTO replication_meta (key, value)
+            SELECT 'baseline_{table}', COALESCE(MAX(id), 0) FROM {table}
+        ''')
+
+    # Сколько записей журнала уже получено от каждой станции
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS replication_peers (
+            node_id TEXT PRIMARY KEY,
+            last_seq INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS replication_conflicts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            origin_node TEXT NOT NULL,
+            origin_id INTEGER NOT NULL,
+            row_data TEXT,
+            reason TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    for table in REPLICATED_TABLES:
+        for op, event, row in (('insert', 'INSERT', 'NEW'), ('update', 'UPDATE', 'NEW'), ('delete', 'DELETE', 'OLD')):
+            conn.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_{op}_log
+                AFTER {event} ON {table}
+                WHEN NOT EXISTS (SELECT 1 FROM replication_guard)
+                BEGIN
+                    INSERT INTO change_log (table_name, row_id, op) VALUES ('{table}', {row}.id, '{op}');
+                END
+            ''')
+
+
+def install_row_versions(conn):
+    """Версии строк для разрешения конфликтов (шаг миграции).
+
+    Версия - (время изменения, станция, которая его сделала). Для своих
+    изменений она записывается при выгрузке, для чужих - при применении,
+    поэтому на всех станциях версия одной строки одинакова и не зависит
+    от того, сколько хранится журнал.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS replication_versions (
+            table_name TEXT NOT NULL,
+            local_id INTEGER NOT NULL,
+            changed_at TEXT NOT NULL,
+            node_id TEXT NOT NULL,
+            PRIMARY KEY (table_name, local_id)
+        )
+    ''')
+
+
+def adopt_restored_database(conn):
+    """Согласует журнал с базой, целиком скачанной с другой станции.
+
+    После DeltaSync.pull или скачивания базы в файле лежат id станции,
+    журнал, курсоры и идентификатор той станции, с которой база пришла.
+    Станция получает новый идентификатор: id строк теперь чужие, и
+    прежние ключи (станция, id) этой станции к ним не относятся. Строки,
+    созданные станцией-источником, связываются с ее ключами, а ее пачки,
+    уже вошедшие в базу, отмечаются полученными. Вызывается в транзакции
+    вызывающего кода.
+    """
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'replication_meta'").fetchone() is None:
+        return
+
+    meta = dict(conn.execute('SELECT key, value FROM replication_meta'))
+    source_node = meta.get('node_id')
+
+    if source_node is not None:
+        for table in REPLICATED_TABLES:
+            conn.execute(f'''
+                INSERT OR IGNORE INTO replication_ids (table_name, origin_node, origin_id, local_id)
+                SELECT ?, ?, t.id, t.id FROM {table} t
+                WHERE t.id > ?
+                AND NOT EXISTS (SELECT 1 FROM replication_ids r WHERE r.table_name = ? AND r.local_id = t.id)
+            ''', (table, source_node, int(meta.get(f'baseline_{table}', 0)), table))
+
+        # Пачки источника до last_exported_seq уже в базе; следующую пачку можно
+        # применить повторно - строки найдутся по ключам выше
+        conn.execute('''
+            INSERT INTO replication_peers (node_id, last_seq) VALUES (?, ?)
+            ON CONFLICT(node_id) DO UPDATE SET last_seq = MAX(last_seq, excluded.last_seq)
+        ''', (source_node, int(meta.get('last_exported_seq', 0))))
+
+    # Записи журнала источника - не изменения этой станции, отправлять их не нужно
+    last_seq = conn.execute('SELECT COALESCE(MAX(seq), 0) FROM change_log').fetchone()[0]
+    conn.execute("DELETE FROM replication_meta WHERE key = 'node_id'")
+    conn.execute("INSERT OR REPLACE INTO replication_meta (key, value) VALUES ('last_exported_seq', ?)",
+                 (str(last_seq),))
+
+
+def prune_change_log(conn, keep_days=CHANGE_LOG_DAYS):
+    """Удаляет ненужные записи журнала. Возвращает число удаленных.
+
+    Выгрузка все равно сворачивает изменения строки в последнее, поэтому
+    более ранние записи о той же строке не нужны. Последняя запись об
+    отправленной строке хранится keep_days дней. Вызывается в транзакции
+    вызывающего кода.
+    """
+    row = conn.execute("SELECT value FROM replication_meta WHERE key = 'last_exported_seq'").fetchone()
+    last_exported = int(row[0]) if row else 0
+
+    deleted = conn.execute('''
+        DELETE FROM change_log
+        WHERE seq NOT IN (SELECT MAX(seq) FROM change_log GROUP BY table_name, row_id)
+    ''').rowcount
+    deleted += conn.execute('''
+        DELETE FROM change_log
+        WHERE seq <= ? AND changed_at < strftime('%Y-%m-%d %H:%M:%f', 'now', ?)
+    ''', (last_exported, f'-{keep_days} days')).rowcount
+    return deleted
+
+
+def overlapping_bookings(conn, room_id, check_in, check_out, exclude_id=None):
+    """id броней этого номера, пересекающихся с периодом (то же правило, что при заселении)"""
+    return [row[0] for row in conn.execute('''
+        SELECT id FROM bookings
+        WHERE room_id = ? AND check_out_date > ? AND check_in_date < ?
+        AND id IS NOT ?
+    ''', (room_id, check_in, check_out, exclude_id))]
+
+
+class Replicator:
+    """Обмен изменениями строк между рабочими станциями через хранилище.
+
+    Каждая станция выкладывает новые записи своего журнала пачками в
+    changes/<id станции>/ и забирает чужие пачки. Строки опознаются по
+    паре (станция-источник, id на источнике), поэтому одинаковые id на
+    разных станциях не конфликтуют.
+    """
+
+    def __init__(self, storage, conn=None):
+        self.storage = storage
+        self.conn = conn
+
+    def connection(self):
+        return self.conn or get_connection()
+
+    # --- состояние
+
+    def get_meta(self, conn, key, default=None):
+        row = conn.execute('SELECT value FROM replication_meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, conn, key, value):
+        conn.execute('INSERT OR REPLACE INTO replication_meta (key, value) VALUES (?, ?)', (key, str(value)))
+
+    def node_id(self, conn=None):
+        conn = conn or self.connection()
+        node = self.get_meta(conn, 'node_id')
+        if node is None:
+            node = uuid.uuid4().hex
+            with conn:
+                conn.execute('INSERT OR IGNORE INTO replication_meta (key, value) VALUES (?, ?)', ('node_id', node))
+            node = self.get_meta(conn, 'node_id')
+        return node
+
+    def columns(self, conn, table):
+        return [row[1] for row in conn.execute(f'PRAGMA table_info({table})') if row[1] != 'id']
+
+    # --- ключи строк
+
+    def origin_key(self, conn, node, table, local_id):
+        row = conn.execute('''
+            SELECT origin_node, origin_id FROM replication_ids
+            WHERE table_name = ? AND local_id = ?
+        ''', (table, local_id)).fetchone()
+        if row:
+            return [row[0], row[1]]
+        if local_id <= int(self.get_meta(conn, f'baseline_{table}', 0)):
+            return [SHARED_NODE, local_id]
+        return [node, local_id]
+
+    def row_version(self, conn, node, table, local_id):
+        """Версия строки (время изменения, станция) - одинаковая на всех станциях"""
+        versions = []
+        row = conn.execute('''
+            SELECT MAX(changed_at) FROM change_log WHERE table_name = ? AND row_id = ?
+        ''', (table, local_id)).fetchone()
+        if row[0] is not None:
+            versions.append((row[0], node))
+        row = conn.execute('''
+            SELECT changed_at, node_id FROM replication_versions WHERE table_name = ? AND local_id = ?
+        ''', (table, local_id)).fetchone()
+        if row is not None:
+            versions.append(tuple(row))
+        if versions:
+            return max(versions)
+        # Строка не менялась с начала журнала: версия одна и та же на всех станциях
+        return ('', self.origin_key(conn, node, table, local_id)[0])
+
+    def set_row_version(self, conn, table, local_id, version):
+        conn.execute('''
+            INSERT OR REPLACE INTO replication_versions (table_name, local_id, changed_at, node_id)
+            VALUES (?, ?, ?, ?)
+        ''', (table, local_id, *version))
+
+    def local_id(self, conn, node, table, origin):
+        origin_node, origin_id = origin
+        if origin_node in (node, SHARED_NODE):
+            return origin_id
+        row = conn.execute('''
+            SELECT local_id FROM replication_ids
+            WHERE table_name = ? AND origin_node = ? AND origin_id = ?
+        ''', (table, origin_node, origin_id)).fetchone()
+        return row[0] if row else None
+
+    # --- выгрузка
+
+    def export_changes(self):
+        """Выкладывает новые записи журнала. Возвращает число отправленных изменений"""
+        conn = self.connection()
+        node = self.node_id(conn)
+        last_exported = int(self.get_meta(conn, 'last_exported_seq', 0))
+
+        entries = conn.execute('''
+            SELECT seq, table_name, row_id, op, changed_at FROM change_log
+            WHERE seq > ? ORDER BY seq
+        ''', (last_exported,)).fetchall()
+        if not entries:
+            return 0
+
+        # Несколько изменений одной строки сворачиваются в последнее
+        latest = {}
+        for seq, table, row_id, op, changed_at in entries:
+            latest.pop((table, row_id), None)
+            latest[(table, row_id)] = (op, changed_at)
+
+        changes = []
+        for (table, row_id), (op, changed_at) in latest.items():
+            change = {
+                'table': table,
+                'origin': self.origin_key(conn, node, table, row_id),
+                'op': op,
+                'changed_at': changed_at,
+            }
+
+            if op != 'delete':
+                columns = self.columns(conn, table)
+                row = conn.execute(f'SELECT {", ".join(columns)} FROM {table} WHERE id = ?', (row_id,)).fetchone()
+                if row is None:
+                    # Строку удалили позже - удаление придет отдельной записью
+                    continue
+                data = dict(zip(columns, row))
+                for column, ref_table in REPLICATED_TABLES[table].items():
+                    if data.get(column) is not None:
+                        data[column] = self.origin_key(conn, node, ref_table, data[column])
+                change['row'] = data
+
+            changes.append(change)
+
+        to_seq = entries[-1][0]
+        batch = {
+            'format': BATCH_FORMAT,
+            'node': node,
+            'from_seq': last_exported + 1,
+            'to_seq': to_seq,
+            'changes': changes,
+        }
+        self.storage.write_bytes(f"{CHANGES_DIR}/{node}/{to_seq:012d}.json",
+                                 json.dumps(batch, ensure_ascii=False).encode('utf-8'))
+
+        with conn:
+            for (table, row_id), (op, changed_at) in latest.items():
+                if op == 'delete':
+                    conn.execute('DELETE FROM replication_versions WHERE table_name = ? AND local_id = ?',
+                                 (table, row_id))
+                else:
+                    self.set_row_version(conn, table, row_id, (changed_at, node))
+            self.set_meta(conn, 'last_exported_seq', to_seq)
+            prune_change_log(conn)
+        return len(changes)
+
+    # --- применение
+
+    def import_changes(self):
+        """Применяет чужие пачки изменений. Возвращает (применено, конфликтов)"""
+        conn = self.connection()
+        node = self.node_id(conn)
+        applied = conflicts = 0
+
+        for peer in self.storage.list(CHANGES_DIR):
+            if peer == node:
+                continue
+
+            row = conn.execute('SELECT last_seq FROM replication_peers WHERE node_id = ?', (peer,)).fetchone()
+            last_seq = row[0] if row else 0
+
+            for name in sorted(self.storage.list(f"{CHANGES_DIR}/{peer}")):
+                try:
+                    to_seq = int(name.split('.')[0])
+                except ValueError:
+                    continue
+                if to_seq <= last_seq:
+                    continue
+
+                try:
+                    batch = json.loads(self.storage.read_bytes(f"{CHANGES_DIR}/{peer}/{name}").decode('utf-8'))
+                except (ValueError, UnicodeDecodeError) as e:
+                    raise ReplicationError(f"Повреждена пачка изменений {peer}/{name}: {e}")
+                if batch.get('format') != BATCH_FORMAT:
+                    raise ReplicationError(f"Неизвестный формат пачки {peer}/{name}")
+
+                batch_applied, batch_conflicts = self.apply_batch(conn, node, batch)
+                applied += batch_applied
+                conflicts += batch_conflicts
+                last_seq = batch['to_seq']
+
+        return applied, conflicts
+
+    def apply_batch(self, conn, node, batch):
+        applied = conflicts = 0
+        topics = set()
+
+        if conn.in_transaction:
+            conn.commit()
+
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('INSERT INTO replication_guard (active) VALUES (1)')
+
+            for change in batch['changes']:
+                reason = self.apply_change(conn, node, change, batch['node'])
+                # Конфликт тоже может изменить данные: проигравшая бронь удаляется
+                topics.add(TABLE_TOPICS.get(change['table'], BOOKINGS))
+                if reason is None:
+                    applied += 1
+                else:
+                    conflicts += 1
+                    self.record_conflict(conn, change['table'], change['origin'], change.get('row'), reason)
+
+            conn.execute('''
+                INSERT INTO replication_peers (node_id, last_seq) VALUES (?, ?)
+                ON CONFLICT(node_id) DO UPDATE SET last_seq = excluded.last_seq
+            ''', (batch['node'], batch['to_seq']))
+
+            conn.execute('DELETE FROM replication_guard')
+            if topics:
+                publish(conn, *topics)
+
+        return applied, conflicts
+
+    def record_conflict(self, conn, table, origin, row_data, reason):
+        conn.execute('''
+            INSERT INTO replication_conflicts (table_name, origin_node, origin_id, row_data, reason)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (table, origin[0], origin[1], json.dumps(row_data, ensure_ascii=False), reason))
+
+    def delete_row(self, conn, table, local_id):
+        conn.execute(f'DELETE FROM {table} WHERE id = ?', (local_id,))
+        conn.execute('DELETE FROM replication_ids WHERE table_name = ? AND local_id = ?', (table, local_id))
+        conn.execute('DELETE FROM replication_versions WHERE table_name = ? AND local_id = ?', (table, local_id))
+
+    def delete_losing_booking(self, conn, node, booking_id, reason):
+        """Удаляет проигравшую конфликт локальную бронь и ее гостя, если других броней у него нет"""
+        columns = self.columns(conn, 'bookings')
+        row = conn.execute(f'SELECT {", ".join(columns)} FROM bookings WHERE id = ?', (booking_id,)).fetchone()
+        data = dict(zip(columns, row))
+        self.record_conflict(conn, 'bookings', self.origin_key(conn, node, 'bookings', booking_id), data, reason)
+        self.delete_row(conn, 'bookings', booking_id)
+        self.delete_orphan_guest(conn, data['guest_id'])
+
+    def delete_orphan_guest(self, conn, guest_id):
+        if guest_id is None:
+            return
+        orphan = conn.execute('''
+            SELECT 1 FROM guests g
+            WHERE g.id = ? AND NOT EXISTS (SELECT 1 FROM bookings b WHERE b.guest_id = g.id)
+        ''', (guest_id,)).fetchone()
+        if orphan:
+            self.delete_row(conn, 'guests', guest_id)
+
+    def apply_change(self, conn, node, change, writer):
+        """Применяет одно изменение станции writer. Возвращает None или причину конфликта"""
+        table = change['table']
+        if table not in REPLICATED_TABLES:
+            return f"таблица {table} не реплицируется"
+
+        local_id = self.local_id(conn, node, table, change['origin'])
+        exists = local_id is not None and conn.execute(
+            f'SELECT 1 FROM {table} WHERE id = ?', (local_id,)
+        ).fetchone() is not None
+
+        if change['op'] == 'delete':
+            if local_id is not None:
+                self.delete_row(conn, table, local_id)
+            return None
+
+        # Последняя запись побеждает. Версия - (время, станция): при равном
+        # времени все станции выбирают одно и то же изменение
+        version = (change['changed_at'], writer)
+        if exists and self.row_version(conn, node, table, local_id) > version:
+            return "локальное изменение новее"
+
+        local_columns = set(self.columns(conn, table))
+        data = {column: value for column, value in change['row'].items() if column in local_columns}
+
+        for column, ref_table in REPLICATED_TABLES[table].items():
+            if data.get(column) is not None:
+                ref_id = self.local_id(conn, node, ref_table, data[column])
+                if ref_id is None:
+                    return f"не найдена связанная строка {ref_table} {data[column]}"
+                data[column] = ref_id
+
+        if table == 'bookings':
+            # Пересекающиеся брони: остается бронь с большей версией, проигравшая
+            # удаляется вместе с гостем без других броней. Правило одно для всех
+            # станций, поэтому после обмена данные на них совпадают
+            overlapping = overlapping_bookings(conn, data.get('room_id'), data.get('check_in_date'),
+                                               data.get('check_out_date'),
+                                               exclude_id=local_id if exists else None)
+            if any(self.row_version(conn, node, table, booking_id) > version for booking_id in overlapping):
+                if exists:
+                    self.delete_row(conn, table, local_id)
+                self.delete_orphan_guest(conn, data.get('guest_id'))
+                return "бронь пересекается с более новой"
+
+            for booking_id in overlapping:
+                self.delete_losing_booking(conn, node, booking_id, "бронь пересекается с более новой")
+
+        columns = list(data)
+        if exists:
+            assignments = ', '.join(f'{column} = ?' for column in columns)
+            conn.execute(f'UPDATE {table} SET {assignments} WHERE id = ?', (*data.values(), local_id))
+        else:
+            placeholders = ', '.join('?' * len(columns))
+            cursor = conn.execute(f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({placeholders})',
+                                  tuple(data.values()))
+            local_id = cursor.lastrowid
+            origin_node, origin_id = change['origin']
+            if origin_node not in (node, SHARED_NODE):
+                conn.execute('''
+                    INSERT OR REPLACE INTO replication_ids (table_name, origin_node, origin_id, local_id)
+                    VALUES (?, ?, ?, ?)
+                ''', (table, origin_node, origin_id, local_id))
+        self.set_row_version(conn, table, local_id, version)
+        return None
+
+    def sync(self):
+        """Отправить свои изменения и применить чужие"""
+        sent = self.export_changes()
+        applied, conflicts = self.import_changes()
+        return sent, applied, conflicts
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from sync_storage import LocalStorage
+
+    parser = argparse.ArgumentParser(description="Обмен изменениями строк через общую папку")
+    parser.add_argument('folder', help="папка обмена (например, сетевой диск)")
+    args = parser.parse_args()
+
+    try:
+        sent, applied, conflicts = Replicator(LocalStorage(args.folder)).sync()
+        print(f"Отправлено изменений: {sent}, применено: {applied}, конфликтов: {conflicts}")
+    except (ReplicationError, sqlite3.Error) as e:
+        print(f"Ошибка репликации: {e}")
@@ -0,0 +1,233 @@
+# scheduler.py
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from datetime import date
+
+from change_bus import publish, TASKS, MESSAGES
+from db_pool import get_connection, close_connection
+from delta_sync import take_snapshot
+from replication import prune_change_log
+from task_service import sweep_checkouts, default_task_author
+from utils import get_database_path
+
+# Как часто планировщик проверяет, не пора ли запустить задачи (секунды)
+TICK_INTERVAL = 60
+# Сколько держится захват задачи; если рабочая станция упала,
+# задачу после этого заберет другая (секунды)
+LOCK_TIMEOUT = 15 * 60
+
+# Через сколько часов невзятое задание на уборку передается администраторам
+STALE_TASK_HOURS = 2
+# Сколько дней хранить прочитанные сообщения
+READ_MESSAGES_DAYS = 90
+# Сколько ежедневных резервных копий хранить
+BACKUPS_TO_KEEP = 7
+
+Job = namedtuple('Job', ['name', 'interval', 'run'])
+
+
+class SchedulerError(Exception):
+    pass
+
+
+def checkout_sweep_job(conn):
+    """Задания на уборку по сегодняшним выездам"""
+    author = default_task_author(conn)
+    if author is None:
+        return "нет автора заданий"
+    rooms = sweep_checkouts(author, conn=conn)
+    return f"создано заданий: {len(rooms)}"
+
+
+def stale_task_escalation_job(conn):
+    """Сообщает администраторам о заданиях, которые долго никто не берет"""
+    with conn:
+        stale_tasks = conn.execute('''
+            SELECT t.id, t.room_number, t.created_by
+            FROM maintenance_tasks t
+            WHERE t.status = 'в ожидании уборки'
+            AND (t.assigned_to IS NULL OR t.assigned_to = '')
+            AND t.created_at < datetime('now', ?)
+            AND NOT EXISTS (SELECT 1 FROM task_escalations e WHERE e.task_id = t.id)
+        ''', (f'-{STALE_TASK_HOURS} hours',)).fetchall()
+
+        if not stale_tasks:
+            return "нет просроченных заданий"
+
+        conn.executemany('INSERT OR IGNORE INTO task_escalations (task_id) VALUES (?)',
+                         [(task_id,) for task_id, _, _ in stale_tasks])
+
+        conn.executemany('''
+            INSERT INTO messages (from_user, to_user, text)
+            SELECT ?, id, ? FROM staff WHERE position = 'администратор'
+        ''', [(created_by, f"Задание на уборку комнаты {room_number} не взято в работу "
+                           f"более {STALE_TASK_HOURS} ч")
+              for _, room_number, created_by in stale_tasks])
+
+        publish(conn, TASKS, MESSAGES)
+
+    return f"передано администраторам: {len(stale_tasks)}"
+
+
+def notification_cleanup_job(conn):
+    """Удаляет старые прочитанные сообщения"""
+    with conn:
+        cursor = conn.execute('''
+            DELETE FROM messages
+            WHERE is_read = 1 AND created_at < datetime('now', ?)
+        ''', (f'-{READ_MESSAGES_DAYS} days',))
+        deleted = cursor.rowcount
+        if deleted:
+            publish(conn, MESSAGES)
+    return f"удалено сообщений: {deleted}"
+
+
+def change_log_cleanup_job(conn):
+    """Чистит журнал изменений репликации, даже если обмен изменениями не запускали"""
+    with conn:
+        deleted = prune_change_log(conn)
+    return f"удалено записей журнала: {deleted}"
+
+
+def get_backup_dir():
+    return os.path.join(os.path.dirname(os.path.abspath(get_database_path())), 'backups')
+
+
+def backup_job(conn):
+    """Ежедневная резервная копия базы, хранятся последние BACKUPS_TO_KEEP"""
+    backup_dir = get_backup_dir()
+    os.makedirs(backup_dir, exist_ok=True)
+
+    backup_path = os.path.join(backup_dir, f"Hotel_bd_{date.today().isoformat()}.db")
+    take_snapshot(conn, backup_path)
+
+    backups = sorted(name for name in os.listdir(backup_dir)
+                     if name.startswith('Hotel_bd_') and name.endswith('.db'))
+    for name in backups[:-BACKUPS_TO_KEEP]:
+        os.remove(os.path.join(backup_dir, name))
+
+    return f"копия {backup_path}"
+
+
+JOBS = [
+    Job('checkout_sweep', 60 * 60, checkout_sweep_job),
+    Job('stale_task_escalation', 15 * 60, stale_task_escalation_job),
+    Job('notification_cleanup', 24 * 60 * 60, notification_cleanup_job),
+    Job('change_log_cleanup', 24 * 60 * 60, change_log_cleanup_job),
+    Job('backup', 24 * 60 * 60, backup_job),
+]
+
+
+class Scheduler:
+    """Фоновый планировщик периодических задач.
+
+    Планировщик запускается на каждой рабочей станции, но каждую задачу
+    выполняет только одна из них: перед запуском задача захватывается
+    строкой в scheduler_jobs одним UPDATE, который проходит, только если
+    срок задачи наступил и ее никто не держит.
+    """
+
+    def __init__(self, jobs=None, tick_interval=TICK_INTERVAL):
+        self.jobs = list(jobs or JOBS)
+        self.tick_interval = tick_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def register_jobs(self, conn):
+        with conn:
+            conn.executemany('INSERT OR IGNORE INTO scheduler_jobs (name) VALUES (?)',
+                             [(job.name,) for job in self.jobs])
+
+    def claim(self, conn, job, now):
+        with conn:
+            cursor = conn.execute('''
+                UPDATE scheduler_jobs
+                SET locked_by = ?, locked_until = ?
+                WHERE name = ?
+                AND (locked_until IS NULL OR locked_until < ?)
+                AND (last_run_at IS NULL OR last_run_at <= ?)
+            ''', (self.worker_id, now + LOCK_TIMEOUT, job.name, now, now - job.interval))
+        return cursor.rowcount == 1
+
+    def finish(self, conn, job, result=None, error=None):
+        with conn:
+            if error is None:
+                conn.execute('''
+                    UPDATE scheduler_jobs
+                    SET last_run_at = ?, last_result = ?, last_error = NULL,
+                        locked_by = NULL, locked_until = NULL
+                    WHERE name = ? AND locked_by = ?
+                ''', (time.time(), result, job.name, self.worker_id))
+            else:
+                # Время запуска не меняем - задача повторится на следующем такте
+                conn.execute('''
+                    UPDATE scheduler_jobs
+                    SET last_error = ?, locked_by = NULL, locked_until = NULL
+                    WHERE name = ? AND locked_by = ?
+                ''', (error, job.name, self.worker_id))
+
+    def run_pending(self):
+        """Выполняет задачи, срок которых наступил. Возвращает имена выполненных"""
+        conn = get_connection()
+        executed = []
+
+        for job in self.jobs:
+            if self.stop_event.is_set():
+                break
+
+            if not self.claim(conn, job, time.time()):
+                continue
+
+            try:
+                result = job.run(conn)
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.rollback()
+                print(f"Ошибка задачи планировщика {job.name}: {e}")
+                self.finish(conn, job, error=str(e))
+                continue
+
+            self.finish(conn, job, result=result)
+            executed.append(job.name)
+            print(f"Задача планировщика {job.name}: {result}")
+
+        return executed
+
+    def loop(self):
+        try:
+            self.register_jobs(get_connection())
+            while not self.stop_event.is_set():
+                try:
+                    self.run_pending()
+                except sqlite3.Error as e:
+                    print(f"Ошибка планировщика: {e}")
+                self.stop_event.wait(self.tick_interval)
+        finally:
+            close_connection()
+
+    def start(self):
+        """Запускает планировщик в фоновом потоке"""
+        if self.thread is not None and self.thread.is_alive():
+            raise SchedulerError("Планировщик уже запущен")
+
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.loop, name='hotel-scheduler', daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=5):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+
+if __name__ == "__main__":
+    # Однократный запуск задач без интерфейса, например из планировщика ОС
+    scheduler = Scheduler()
+    scheduler.register_jobs(get_connection())
+    executed = scheduler.run_pending()
+    print(f"Выполнено задач: {len(executed)}")
@@ -2,6 +2,8 @@ from datetime import timedelta, datetime
 import sqlite3
 import hashlib
 
+from migrations import run_migrations
+
 
 def create_database():
     """Создание базы данных Hotel_bd и добавление сотрудников"""
@@ -242,7 +244,7 @@ def create_database():
     # message_count = cursor.fetchone()[0]
     # print(f"📊 Добавлено сообщений: {message_count}")
 
-    conn.close()
+    run_migrations()
     print("🎉 База данных создана с тестовыми бронированиями и сообщениями!")
 
 
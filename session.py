@@ -0,0 +1,89 @@
+# session.py
+from bisect import bisect_left
+from collections import namedtuple
+
+from change_bus import get_bus, STAFF
+from db_pool import get_connection
+
+_directory = None
+
+
+class Session(namedtuple('Session', ['user_id', 'login', 'first_name', 'last_name', 'position'])):
+    """Вошедший пользователь - определяется один раз при входе"""
+
+    @property
+    def full_name(self):
+        return f"{self.first_name} {self.last_name}"
+
+
+def name_key(text):
+    """Ключ поиска по имени: без учета регистра, ё и е не различаются"""
+    return (text or '').casefold().replace('ё', 'е')
+
+
+StaffMember = namedtuple('StaffMember', ['id', 'last_name', 'first_name', 'patronymic', 'position', 'login'])
+
+
+class StaffDirectory:
+    """Справочник сотрудников в памяти.
+
+    Загружается одним запросом при первом обращении и сбрасывается,
+    когда сотрудников добавляют или удаляют (тема STAFF шины изменений).
+    Для поиска по началу имени или фамилии хранится отсортированный
+    список ключей, поиск - двоичный по этому списку.
+    """
+
+    def __init__(self):
+        self.members = None
+        self.prefix_keys = []
+        self.prefix_positions = []
+
+    def invalidate(self):
+        self.members = None
+
+    def load(self):
+        cursor = get_connection().execute('''
+            SELECT id, last_name, first_name, patronymic, position, login
+            FROM staff
+            ORDER BY last_name, first_name
+        ''')
+        self.members = [StaffMember(*row) for row in cursor.fetchall()]
+
+        index = sorted((name_key(name), position)
+                       for position, member in enumerate(self.members)
+                       for name in (member.first_name, member.last_name))
+        self.prefix_keys = [key for key, _ in index]
+        self.prefix_positions = [position for _, position in index]
+
+    def search(self, prefix):
+        """Сотрудники, у которых имя или фамилия начинается с prefix (в порядке справочника)"""
+        if self.members is None:
+            self.load()
+
+        prefix = name_key(prefix.strip())
+        if not prefix:
+            return self.members
+
+        start = bisect_left(self.prefix_keys, prefix)
+        end = bisect_left(self.prefix_keys, prefix + '\U0010ffff', start)
+        positions = sorted(set(self.prefix_positions[start:end]))
+        return [self.members[position] for position in positions]
+
+
+def get_staff_directory():
+    """Общий справочник сотрудников процесса (создается в потоке интерфейса)"""
+    global _directory
+    if _directory is None:
+        _directory = StaffDirectory()
+        get_bus().subscribe(STAFF, _directory.invalidate)
+    return _directory
+
+
+def open_session(login, password_hash, conn=None):
+    """Проверка логина и пароля. Возвращает Session или None"""
+    conn = conn or get_connection()
+    row = conn.execute('''
+        SELECT id, login, first_name, last_name, position FROM staff
+        WHERE login = ? AND password_hash = ?
+    ''', (login, password_hash)).fetchone()
+    return Session(*row) if row else None
@@ -7,7 +7,8 @@ from PyQt6.QtWidgets import QMainWindow, QDialog, QTableWidgetItem, QFileDialog,
 from PyQt6.QtCore import pyqtSignal, Qt
 from PyQt6 import uic
 
-from utils import get_database_path, get_resource_path
+from utils import get_resource_path
+from db_pool import get_connection
 
 
 class EmptyPathError(Exception):
@@ -237,8 +238,7 @@ class UploadCleaningWindow(QMainWindow):
             else:
                 self.start_date = today - timedelta(days=30)  # По умолчанию месяц
 
-            db_path = get_database_path()
-            conn = sqlite3.connect(db_path)
+            conn = get_connection()
             cursor = conn.cursor()
 
             cursor.execute(self.get_cleaning_data_query(), (self.start_date.strftime('%Y-%m-%d'),))
@@ -246,7 +246,6 @@ class UploadCleaningWindow(QMainWindow):
 
             self.update_preview_table(self.data)
 
-            conn.close()
 
         except sqlite3.Error as e:
             QMessageBox.critical(self, "Ошибка базы данных", f"Не удалось загрузить данные об уборке: {str(e)}")
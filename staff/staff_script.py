@@ -6,7 +6,9 @@ from PyQt6 import uic, QtCore
 import sqlite3
 
 from massage_window import MassageWindow
-from utils import get_resource_path, get_database_path
+from utils import get_resource_path
+from db_pool import get_connection
+from change_bus import get_bus, publish, TASKS
 from staff.BD_staff import UploadCleaningWindow
 
 from notifications_manager import SimpleNotificationsManager
@@ -27,16 +29,16 @@ class StaffWindow(QMainWindow):
     closed = pyqtSignal()
     task_completed = pyqtSignal()
 
-    def __init__(self, full_name, username):
+    def __init__(self, session):
         super().__init__()
-        self.full_name = full_name
-        self.username = username
+        self.session = session
+        self.full_name = session.full_name
+        self.username = session.login
 
         uic.loadUi(get_resource_path('UI/Staff/Окно обслуживающего персонала.ui'), self)
         self.setWindowTitle(f"Персонал - {self.full_name}")
         self.upload_button.clicked.connect(self.open_upload)
-        self.current_user_id = None
-        self.get_current_user_id()
+        self.current_user_id = session.user_id
         self.notifications_manager = SimpleNotificationsManager(
             self.current_user_id,
             self.notifications_frame,
@@ -47,7 +49,6 @@ class StaffWindow(QMainWindow):
         self.complete_all_button.clicked.connect(self.task_completion)
         self.refresh_button.clicked.connect(self.load_unassigned_tasks)
 
-        self.last_unassigned_count = 0
         self.setup_tasks_monitoring()
 
         self.showMaximized()
@@ -55,55 +56,21 @@ class StaffWindow(QMainWindow):
         self.load_user_tasks()
 
     def setup_tasks_monitoring(self):
-        """Настройка мониторинга изменений в задачах"""
-        self.unassigned_tasks_timer = QtCore.QTimer()
-        self.unassigned_tasks_timer.timeout.connect(self.check_unassigned_tasks_updates)
-        self.unassigned_tasks_timer.start(15000)
+        """Подписка на изменения заданий через шину изменений"""
+        get_bus().subscribe(TASKS, self.on_tasks_changed)
 
-    def check_unassigned_tasks_updates(self):
-        """Проверяет, изменилось ли количество неназначенных задач"""
-        try:
-            db_path = get_database_path()
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-
-            cursor.execute('''
-                SELECT COUNT(*) FROM maintenance_tasks 
-                WHERE assigned_to IS NULL OR assigned_to = ''
-            ''')
-
-            current_count = cursor.fetchone()[0]
-            conn.close()
-
-            if current_count != self.last_unassigned_count:
-                self.last_unassigned_count = current_count
-                self.load_unassigned_tasks()
-
-        except Exception as e:
-            print(f"Ошибка проверки неназначенных задач: {e}")
+    def on_tasks_changed(self):
+        """Задания создали, назначили или выполнили - в этом или другом окне"""
+        self.load_unassigned_tasks()
+        self.load_user_tasks()
 
     def open_massage(self):
-        self.massage_window = MassageWindow(full_name=self.full_name)
+        self.massage_window = MassageWindow(self.session)
         self.massage_window.show()
 
-    def get_current_user_id(self):
-        try:
-            db_path = get_database_path()
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            cursor.execute('SELECT id FROM staff WHERE login = ?', (self.username,))
-            result = cursor.fetchone()
-            if result:
-                self.current_user_id = result[0]
-                print(f"ID текущего пользователя: {self.current_user_id}")
-            conn.close()
-        except sqlite3.Error as e:
-            print(f"Ошибка получения ID пользователя: {e}")
-
     def load_unassigned_tasks(self):
         try:
-            db_path = get_database_path()
-            conn = sqlite3.connect(db_path)
+            conn = get_connection()
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -152,7 +119,6 @@ class StaffWindow(QMainWindow):
 
                 self.all_tasks_list.addItem(list_item)
 
-            conn.close()
 
             print(f"Загружено неназначенных задач: {len(unassigned_tasks)}")
 
@@ -168,8 +134,7 @@ class StaffWindow(QMainWindow):
             if not self.current_user_id:
                 return
 
-            db_path = get_database_path()
-            conn = sqlite3.connect(db_path)
+            conn = get_connection()
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -219,7 +184,6 @@ class StaffWindow(QMainWindow):
                 list_item.setTextAlignment(Qt.AlignmentFlag.AlignLeft)
                 self.accepted_tasks_list.addItem(list_item)
 
-            conn.close()
             print(f"Загружено задач пользователя: {len(user_tasks)}")
 
         except sqlite3.Error as e:
@@ -245,23 +209,19 @@ class StaffWindow(QMainWindow):
             if not self.complete_tasks:
                 raise NoTaskSelectedError("Не выполнено ни одной задачи")
 
-            db_path = get_database_path()
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            for task_id in self.complete_tasks:
-                cursor.execute('''
-                                    UPDATE maintenance_tasks 
-                                    SET status = 'убрано'
-                                    WHERE id = ?
-                                ''', (task_id,))
-            conn.commit()
-            conn.close()
-
+            conn = get_connection()
+            with conn:
+                for task_id in self.complete_tasks:
+                    conn.execute('''
+                                        UPDATE maintenance_tasks 
+                                        SET status = 'убрано', completed_at = CURRENT_TIMESTAMP
+                                        WHERE id = ?
+                                    ''', (task_id,))
+                publish(conn, TASKS)
+
+            # Списки заданий обновит подписка на шину изменений
             self.task_completed.emit()
 
-            self.load_unassigned_tasks()
-            self.load_user_tasks()
-
             QMessageBox.information(self, "Успех", 'Задача успешно выполнена')
 
         except NoTaskSelectedError as e:
@@ -298,32 +258,23 @@ class StaffWindow(QMainWindow):
             if not selected_tasks:
                 raise NoTaskSelectedError("Не выбрано ни одной задачи")
 
-            db_path = get_database_path()
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-
-
-            for task_id in selected_tasks:
-                cursor.execute('SELECT assigned_to FROM maintenance_tasks WHERE id = ?', (task_id,))
-                result = cursor.fetchone()
-                if result and result[0] is not None and result[0] != '':
-                    raise TaskAlreadyAssignedError(f"Задача ID {task_id} уже назначена другому сотруднику")
-
-
-            for task_id in selected_tasks:
-                cursor.execute('''
-                    UPDATE maintenance_tasks 
-                    SET assigned_to = ?, status = 'в работе'
-                    WHERE id = ?
-                ''', (self.current_user_id, task_id))
-
-            conn.commit()
-            conn.close()
-
+            conn = get_connection()
+            with conn:
+                cursor = conn.cursor()
 
+                for task_id in selected_tasks:
+                    cursor.execute('SELECT assigned_to FROM maintenance_tasks WHERE id = ?', (task_id,))
+                    result = cursor.fetchone()
+                    if result and result[0] is not None and result[0] != '':
+                        raise TaskAlreadyAssignedError(f"Задача ID {task_id} уже назначена другому сотруднику")
 
-            self.load_unassigned_tasks()
-            self.load_user_tasks()
+                for task_id in selected_tasks:
+                    cursor.execute('''
+                        UPDATE maintenance_tasks 
+                        SET assigned_to = ?, status = 'в работе'
+                        WHERE id = ?
+                    ''', (self.current_user_id, task_id))
+                publish(conn, TASKS)
 
         except NoTaskSelectedError as e:
             QMessageBox.warning(self, "Ошибка выбора", str(e))
@@ -345,9 +296,8 @@ class StaffWindow(QMainWindow):
 
 
     def closeEvent(self, event):
-        """Останавливаем таймеры при закрытии окна"""
-        if hasattr(self, 'unassigned_tasks_timer'):
-            self.unassigned_tasks_timer.stop()
+        """Отписываемся от изменений при закрытии окна"""
+        get_bus().unsubscribe(self.on_tasks_changed)
         if hasattr(self, 'notifications_manager'):
             self.notifications_manager.stop_updates()
         self.closed.emit()
@@ -0,0 +1,135 @@
+# sync_storage.py
+import io
+import os
+import tempfile
+
+
+class StorageError(Exception):
+    pass
+
+
+class LocalStorage:
+    """Хранилище синхронизации в папке на диске (сетевая папка или офлайн-проверка)"""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+
+    def full_path(self, path):
+        return os.path.join(self.root, *path.strip('/').split('/'))
+
+    def exists(self, path):
+        return os.path.exists(self.full_path(path))
+
+    def read_bytes(self, path):
+        try:
+            with open(self.full_path(path), 'rb') as file:
+                return file.read()
+        except OSError as e:
+            raise StorageError(f"Не удалось прочитать {path}: {e}")
+
+    def write_bytes(self, path, data):
+        full_path = self.full_path(path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        # Запись через временный файл: читатель не увидит файл наполовину
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(full_path), prefix='.tmp_')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(data)
+            os.replace(tmp_path, full_path)
+        except OSError as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise StorageError(f"Не удалось записать {path}: {e}")
+
+    def revision(self, path):
+        """Метка версии файла (None, если файла нет) - одним обращением"""
+        try:
+            stat = os.stat(self.full_path(path))
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            raise StorageError(f"Не удалось проверить {path}: {e}")
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+    def list(self, path):
+        full_path = self.full_path(path)
+        if not os.path.isdir(full_path):
+            return []
+        return [name for name in os.listdir(full_path) if not name.startswith('.tmp_')]
+
+    def delete(self, path):
+        try:
+            os.remove(self.full_path(path))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            raise StorageError(f"Не удалось удалить {path}: {e}")
+
+
+class YandexDiskStorage:
+    """Хранилище синхронизации на Яндекс Диске"""
+
+    def __init__(self, token, root="/HotelApp/sync"):
+        import yadisk
+
+        self.y = yadisk.YaDisk(token=token)
+        self.root = root.rstrip('/')
+
+    def full_path(self, path):
+        return f"{self.root}/{path.strip('/')}"
+
+    def ensure_dir(self, path):
+        current = ""
+        for part in path.strip('/').split('/'):
+            current += '/' + part
+            if not self.y.exists(current):
+                self.y.mkdir(current)
+
+    def exists(self, path):
+        try:
+            return self.y.exists(self.full_path(path))
+        except Exception as e:
+            raise StorageError(f"Ошибка обращения к Яндекс Диску: {e}")
+
+    def read_bytes(self, path):
+        buffer = io.BytesIO()
+        try:
+            self.y.download(self.full_path(path), buffer)
+        except Exception as e:
+            raise StorageError(f"Не удалось скачать {path}: {e}")
+        return buffer.getvalue()
+
+    def write_bytes(self, path, data):
+        full_path = self.full_path(path)
+        try:
+            self.ensure_dir(full_path.rsplit('/', 1)[0])
+            self.y.upload(io.BytesIO(data), full_path, overwrite=True)
+        except Exception as e:
+            raise StorageError(f"Не удалось загрузить {path}: {e}")
+
+    def revision(self, path):
+        """Контрольная сумма файла из метаданных (None, если файла нет) - одним запросом"""
+        from yadisk.exceptions import PathNotFoundError
+
+        try:
+            meta = self.y.get_meta(self.full_path(path))
+        except PathNotFoundError:
+            return None
+        except Exception as e:
+            raise StorageError(f"Ошибка обращения к Яндекс Диску: {e}")
+        return meta.md5 or str(meta.modified)
+
+    def list(self, path):
+        full_path = self.full_path(path)
+        try:
+            if not self.y.exists(full_path):
+                return []
+            return [item.name for item in self.y.listdir(full_path)]
+        except Exception as e:
+            raise StorageError(f"Ошибка обращения к Яндекс Диску: {e}")
+
+    def delete(self, path):
+        try:
+            self.y.remove(self.full_path(path), permanently=True)
+        except Exception as e:
+            raise StorageError(f"Не удалось удалить {path}: {e}")
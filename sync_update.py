@@ -1,70 +1,139 @@
 # simple_auto_sync.py
-import time
+import sqlite3
 import threading
-import os
-from bd_manager import YandexDiskUploader
 
+from PyQt6.QtCore import QThread, pyqtSignal
 
-class SimpleAutoSync:
-    def __init__(self, token):
-        self.uploader = YandexDiskUploader(token)
-        self.local_file = "Hotel_bd.db"
-        self.is_running = False
+from change_bus import get_bus
+from db_pool import close_connection
+from delta_sync import DeltaSync, DeltaSyncError
+from sync_storage import YandexDiskStorage, StorageError
+from utils import get_database_path
 
-    def need_download(self):
-        """Нужно ли скачивать новую версию?"""
-        # Если локального файла нет - скачиваем
-        if not os.path.exists(self.local_file):
-            return True
+# Интервал проверки сразу после изменений (секунды)
+MIN_INTERVAL = 5
+# Дольше этого интервала проверка не откладывается, даже если изменений давно нет
+MAX_INTERVAL = 120
+# Предел ожидания после ошибок подряд (нет сети, хранилище недоступно)
+MAX_ERROR_INTERVAL = 600
+
+
+class SyncWorker(QThread):
+    """Фоновая проверка и скачивание новых версий базы.
+
+    Интервал проверки удваивается, пока изменений нет или хранилище
+    недоступно, и сбрасывается до MIN_INTERVAL, как только новая версия
+    применена. Запросы check_now(), пришедшие до следующей проверки,
+    сливаются в одну проверку.
+    """
+
+    # Применена новая версия базы (число скачанных кусков)
+    update_applied = pyqtSignal(int)
+    sync_failed = pyqtSignal(str)
+
+    def __init__(self, delta_sync, min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL):
+        super().__init__()
+        self.delta_sync = delta_sync
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.wake_event = threading.Event()
+
+    def check_now(self):
+        self.wake_event.set()
+
+    def stop(self, timeout=5000):
+        self.requestInterruption()
+        self.wake_event.set()
+        self.wait(timeout)
+
+    def run(self):
+        interval = self.min_interval
+        failures = 0
 
         try:
-            # Проверяем есть ли файл на Яндекс Диске
-            if not self.uploader.y.exists(self.uploader.remote_path):
-                return False
+            while not self.isInterruptionRequested():
+                try:
+                    received = None
+                    if self.delta_sync.has_remote_update():
+                        received = self.delta_sync.pull()
+                    failures = 0
+                except (StorageError, DeltaSyncError, sqlite3.Error, OSError) as e:
+                    failures += 1
+                    interval = min(self.min_interval * 2 ** failures, MAX_ERROR_INTERVAL)
+                    self.sync_failed.emit(str(e))
+                else:
+                    if received is not None:
+                        interval = self.min_interval
+                        self.update_applied.emit(received)
+                    else:
+                        interval = min(interval * 2, self.max_interval)
 
-            # Получаем информацию об удаленном файле
-            remote_info = self.uploader.y.get_meta(self.uploader.remote_path)
-            remote_modified = remote_info.modified.timestamp()
-            remote_size = remote_info.size
+                self.wake_event.wait(interval)
+                self.wake_event.clear()
+        finally:
+            close_connection()
 
-            # Локальная информация
-            local_modified = os.path.getmtime(self.local_file)
-            local_size = os.path.getsize(self.local_file)
 
-            # Скачиваем если удаленный файл новее или другого размера
-            return (remote_modified > local_modified or
-                    remote_size != local_size)
+class SimpleAutoSync:
+    def __init__(self, token=None, storage=None, interval=MIN_INTERVAL):
+        # Вместо Яндекс Диска можно передать LocalStorage - например, для проверки без сети
+        self.storage = storage or YandexDiskStorage(token)
+        self.delta_sync = DeltaSync(self.storage, state_path=get_database_path() + '.sync.json')
+        self.interval = interval
+        self.worker = None
 
-        except:
+    @property
+    def is_running(self):
+        return self.worker is not None and self.worker.isRunning()
+
+    def need_download(self):
+        """Нужно ли скачивать новую версию?"""
+        try:
+            # Обычно это одна проверка метки манифеста, а не чтение файла
+            return self.delta_sync.has_remote_update()
+        except (StorageError, DeltaSyncError) as e:
+            print(f"Ошибка проверки обновлений: {e}")
             return False
 
-    def sync_loop(self):
-        """Основной цикл синхронизации - только скачивание"""
-        while self.is_running:
-            try:
-                # Проверяем нужно ли скачать с Яндекс Диска
-                if self.need_download():
-                    print("Обнаружены изменения на Яндекс Диске, скачиваем...")
-                    self.uploader.download_db()  # Просто скачиваем
+    def download(self):
+        """Скачать изменившиеся куски и применить их к базе"""
+        received = self.delta_sync.pull()
+        if received is not None:
+            print(f"Получена новая версия базы, скачано кусков: {received}")
+        return received
+
+    def upload(self):
+        """Отправить изменившиеся куски локальной базы"""
+        sent = self.delta_sync.push()
+        print(f"База отправлена, кусков: {sent}")
+        # Метка манифеста сменилась - пусть воркер сразу ее проверит и запомнит
+        if self.worker is not None:
+            self.worker.check_now()
+        return sent
 
-            except Exception as e:
-                print(f"Ошибка синхронизации: {e}")
+    def on_update_applied(self, received):
+        print(f"Получена новая версия базы, скачано кусков: {received}")
 
-            time.sleep(5)  # Проверяем каждые 5 секунд
+    def on_sync_failed(self, error):
+        print(f"Ошибка синхронизации: {error}")
 
     def start(self):
-        """Запустить автоматическую синхронизацию"""
-        if not self.uploader.check_connection():
-            print("Не удалось подключиться к Яндекс Диску")
-            return False
+        """Запустить автоматическую синхронизацию (из потока интерфейса)"""
+        if self.is_running:
+            return True
 
-        self.is_running = True
-        thread = threading.Thread(target=self.sync_loop, daemon=True)
-        thread.start()
-        print("Автоскачивание запущено (проверка каждые 5 секунд)")
+        self.worker = SyncWorker(self.delta_sync, min_interval=self.interval)
+        self.worker.update_applied.connect(self.on_update_applied)
+        # Открытые окна перечитывают данные после того, как новая версия целиком применена
+        self.worker.update_applied.connect(get_bus().refresh_all)
+        self.worker.sync_failed.connect(self.on_sync_failed)
+        self.worker.start()
+        print(f"Автоскачивание запущено (проверка каждые {self.interval}-{MAX_INTERVAL} секунд)")
         return True
 
     def stop(self):
         """Остановить синхронизацию"""
-        self.is_running = False
-        print("Синхронизация остановлена")
\ No newline at end of file
+        if self.worker is not None:
+            self.worker.stop()
+            self.worker = None
+        print("Синхронизация остановлена")
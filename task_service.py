@@ -0,0 +1,139 @@
+# task_service.py
+from datetime import date
+
+from change_bus import publish, TASKS, MESSAGES
+from message_codec import encode_message
+from db_pool import get_connection
+
+ACTIVE_STATUSES = ('в работе', 'в ожидании уборки')
+HOUSEKEEPING_POSITION = 'обслуживающий персонал'
+
+DESCRIPTION_PREFIX = "Убраться в комнате номер: "
+MESSAGE_PREFIX = "Требуется убраться в комнате номер: "
+
+
+def cleaning_task_description(room_number):
+    return f"{DESCRIPTION_PREFIX}{room_number}"
+
+
+def cleaning_task_message(room_number):
+    return encode_message(f"{MESSAGE_PREFIX}{room_number}")
+
+
+def create_cleaning_tasks(room_numbers, created_by, notes=None, skip_active=True, conn=None):
+    """Создает задания на уборку номеров и уведомления персоналу одной транзакцией.
+
+    Номера, у которых уже есть активное задание, пропускаются (если skip_active).
+    Возвращает список номеров, для которых задание создано.
+    """
+    conn = conn or get_connection()
+    room_numbers = list(dict.fromkeys(str(room_number) for room_number in room_numbers))
+    if not room_numbers:
+        return []
+
+    with conn:
+        if skip_active:
+            placeholders = ', '.join('?' * len(room_numbers))
+            active = {row[0] for row in conn.execute(f'''
+                SELECT DISTINCT room_number FROM maintenance_tasks
+                WHERE status IN (?, ?) AND room_number IN ({placeholders})
+            ''', (*ACTIVE_STATUSES, *room_numbers))}
+            room_numbers = [room_number for room_number in room_numbers if room_number not in active]
+
+        if not room_numbers:
+            return []
+
+        conn.executemany('''
+            INSERT INTO maintenance_tasks (room_number, description, created_by, status, notes)
+            VALUES (?, ?, ?, 'в ожидании уборки', ?)
+        ''', [(room_number, cleaning_task_description(room_number), created_by, notes)
+              for room_number in room_numbers])
+
+        # Уведомления всему обслуживающему персоналу: по одному запросу на номер
+        conn.executemany('''
+            INSERT INTO messages (from_user, to_user, text)
+            SELECT ?, id, ? FROM staff WHERE position = ?
+        ''', [(created_by, cleaning_task_message(room_number), HOUSEKEEPING_POSITION)
+              for room_number in room_numbers])
+
+        publish(conn, TASKS, MESSAGES)
+
+    return room_numbers
+
+
+def sweep_checkouts(created_by, day=None, conn=None):
+    """Задания на уборку всех номеров с выездом в этот день - одним запросом.
+
+    Номера с активным заданием или с заданием, созданным в день выезда или позже
+    (в любом статусе), пропускаются (анти-соединение NOT EXISTS) - поэтому
+    повторный запуск в тот же день не создает задание для уже убранного номера.
+    Возвращает список номеров, для которых создано задание.
+    """
+    conn = conn or get_connection()
+    day = day or date.today().isoformat()
+
+    if conn.in_transaction:
+        conn.commit()
+
+    with conn:
+        # Блокировка записи до чтения MAX(id): новые задания этой транзакции идут подряд
+        conn.execute('BEGIN IMMEDIATE')
+        last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM maintenance_tasks').fetchone()[0]
+
+        conn.execute('''
+            INSERT INTO maintenance_tasks (room_number, description, created_by, status)
+            SELECT DISTINCT r.room_number, ? || r.room_number, ?, 'в ожидании уборки'
+            FROM bookings b
+            JOIN rooms r ON b.room_id = r.id
+            WHERE b.check_out_date = ?
+            AND NOT EXISTS (
+                SELECT 1 FROM maintenance_tasks t
+                WHERE t.room_number = r.room_number
+                AND (t.status IN (?, ?) OR date(t.created_at, 'localtime') >= b.check_out_date)
+            )
+        ''', (DESCRIPTION_PREFIX, created_by, day, *ACTIVE_STATUSES))
+
+        created_rooms = [row[0] for row in conn.execute(
+            'SELECT room_number FROM maintenance_tasks WHERE id > ? ORDER BY id', (last_id,)
+        )]
+
+        if created_rooms:
+            conn.execute('''
+                INSERT INTO messages (from_user, to_user, text)
+                SELECT ?, s.id, ? || t.room_number
+                FROM maintenance_tasks t
+                CROSS JOIN staff s
+                WHERE t.id > ? AND s.position = ?
+            ''', (created_by, MESSAGE_PREFIX, last_id, HOUSEKEEPING_POSITION))
+
+            publish(conn, TASKS, MESSAGES)
+
+    return created_rooms
+
+
+def default_task_author(conn=None):
+    """Автор заданий при запуске без окна регистратора - первый администратор или регистратор"""
+    conn = conn or get_connection()
+    row = conn.execute('''
+        SELECT id FROM staff
+        WHERE position IN ('администратор', 'регистратор')
+        ORDER BY position = 'администратор' DESC, id
+        LIMIT 1
+    ''').fetchone()
+    return row[0] if row else None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Создание заданий на уборку по выездам за день")
+    parser.add_argument('--date', help="день выезда в формате ГГГГ-ММ-ДД (по умолчанию сегодня)")
+    parser.add_argument('--created-by', type=int, help="id сотрудника - автора заданий")
+    args = parser.parse_args()
+
+    author = args.created_by or default_task_author()
+    if author is None:
+        print("Не найден сотрудник - автор заданий")
+    else:
+        rooms = sweep_checkouts(author, args.date)
+        print(f"Создано заданий на уборку: {len(rooms)}" + (f" ({', '.join(rooms)})" if rooms else ""))
@@ -0,0 +1,171 @@
+# test_replication.py
+"""Обмен изменениями между двумя рабочими станциями.
+
+Запуск из корня проекта:
+    python -m pytest tests
+"""
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import run_migrations
+from replication import Replicator
+from sync_storage import LocalStorage
+
+SCHEMA = [
+    '''CREATE TABLE staff (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            first_name VARCHAR(20) NOT NULL,
+            last_name VARCHAR(20) NOT NULL,
+            patronymic VARCHAR(20),
+            login VARCHAR(20) UNIQUE NOT NULL,
+            password_hash VARCHAR(64) NOT NULL,
+            position TEXT NOT NULL
+        )''',
+    '''CREATE TABLE rooms (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            room_number VARCHAR(10) UNIQUE NOT NULL,
+            room_type VARCHAR(50) NOT NULL,
+            price_per_night DECIMAL(10,2) NOT NULL
+        )''',
+    '''CREATE TABLE guests (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            first_name VARCHAR(50) NOT NULL,
+            last_name VARCHAR(50) NOT NULL,
+            patronymic VARCHAR(50),
+            passport_number VARCHAR(20) NOT NULL,
+            phone_number VARCHAR(20) NOT NULL
+        )''',
+    '''CREATE TABLE bookings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guest_id INTEGER NOT NULL,
+            room_id INTEGER NOT NULL,
+            check_in_date DATE NOT NULL,
+            check_out_date DATE NOT NULL
+        )''',
+    '''CREATE TABLE messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            from_user INTEGER NOT NULL,
+            to_user INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            is_read BOOLEAN DEFAULT FALSE
+        )''',
+]
+
+
+def book(conn, last_name, room_id, check_in, check_out):
+    """Заселение как в окне регистрации: гость и его бронь"""
+    with conn:
+        guest_id = conn.execute('''
+            INSERT INTO guests (first_name, last_name, patronymic, passport_number, phone_number)
+            VALUES ('Иван', ?, 'Иванович', '4510000000', '+7(900)000-00-00')
+        ''', (last_name,)).lastrowid
+        conn.execute('''
+            INSERT INTO bookings (guest_id, room_id, check_in_date, check_out_date)
+            VALUES (?, ?, ?, ?)
+        ''', (guest_id, room_id, check_in, check_out))
+
+
+def snapshot(conn):
+    """Брони и гости без локальных id - их и сравниваем между станциями"""
+    bookings = conn.execute('''
+        SELECT g.last_name, b.room_id, b.check_in_date, b.check_out_date
+        FROM bookings b JOIN guests g ON g.id = b.guest_id
+        ORDER BY 1, 2, 3
+    ''').fetchall()
+    guests = conn.execute('SELECT last_name FROM guests ORDER BY 1').fetchall()
+    return bookings, guests
+
+
+class TwoStationsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        base_path = os.path.join(self.tmp_dir, 'base.db')
+        conn = sqlite3.connect(base_path)
+        for statement in SCHEMA:
+            conn.execute(statement)
+        conn.execute("INSERT INTO rooms (room_number, room_type, price_per_night) VALUES ('101', 'Стандарт', 3500)")
+        conn.execute("INSERT INTO rooms (room_number, room_type, price_per_night) VALUES ('102', 'Стандарт', 3500)")
+        conn.commit()
+        run_migrations(conn)
+        conn.close()
+
+        # Обе станции начинают с одной копии базы
+        self.stations = []
+        for name in ('a', 'b'):
+            path = os.path.join(self.tmp_dir, f'{name}.db')
+            shutil.copyfile(base_path, path)
+            conn = sqlite3.connect(path)
+            self.stations.append((conn, Replicator(LocalStorage(os.path.join(self.tmp_dir, 'exchange')), conn)))
+
+    def tearDown(self):
+        for conn, _ in self.stations:
+            conn.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def sync_all(self):
+        # Два круга: каждая станция выкладывает свое и забирает чужое
+        for _ in range(2):
+            for _, replicator in self.stations:
+                replicator.sync()
+
+    def set_changed_at(self, conn, changed_at):
+        with conn:
+            conn.execute('UPDATE change_log SET changed_at = ?', (changed_at,))
+
+    def assert_converged(self):
+        (conn_a, _), (conn_b, _) = self.stations
+        self.assertEqual(snapshot(conn_a), snapshot(conn_b))
+
+    def test_overlapping_bookings_converge(self):
+        (conn_a, _), (conn_b, _) = self.stations
+        book(conn_a, 'Петров', 1, '2030-01-10', '2030-01-15')
+        book(conn_b, 'Сидоров', 1, '2030-01-12', '2030-01-20')
+        self.set_changed_at(conn_a, '2030-01-01 10:00:00.000')
+        self.set_changed_at(conn_b, '2030-01-01 11:00:00.000')
+
+        self.sync_all()
+
+        self.assert_converged()
+        bookings, guests = snapshot(conn_a)
+        # Остается более поздняя бронь, гость проигравшей брони удален
+        self.assertEqual(bookings, [('Сидоров', 1, '2030-01-12', '2030-01-20')])
+        self.assertEqual(guests, [('Сидоров',)])
+        for conn, _ in self.stations:
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM replication_conflicts').fetchone()[0], 1)
+
+    def test_equal_time_resolved_by_node(self):
+        (conn_a, replicator_a), (conn_b, replicator_b) = self.stations
+        book(conn_a, 'Петров', 1, '2030-01-10', '2030-01-15')
+        book(conn_b, 'Сидоров', 1, '2030-01-12', '2030-01-20')
+        self.set_changed_at(conn_a, '2030-01-01 10:00:00.000')
+        self.set_changed_at(conn_b, '2030-01-01 10:00:00.000')
+
+        self.sync_all()
+
+        self.assert_converged()
+        bookings, guests = snapshot(conn_a)
+        winner = 'Петров' if replicator_a.node_id() > replicator_b.node_id() else 'Сидоров'
+        self.assertEqual([booking[0] for booking in bookings], [winner])
+        self.assertEqual(guests, [(winner,)])
+
+    def test_independent_bookings_are_exchanged(self):
+        (conn_a, _), (conn_b, _) = self.stations
+        book(conn_a, 'Петров', 1, '2030-01-10', '2030-01-15')
+        book(conn_b, 'Сидоров', 2, '2030-01-12', '2030-01-20')
+
+        self.sync_all()
+
+        self.assert_converged()
+        self.assertEqual(len(snapshot(conn_a)[0]), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
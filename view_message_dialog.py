@@ -1,12 +1,14 @@
 # view_message_dialog.py
-import pickle
 import sqlite3
 from PyQt6.QtWidgets import QDialog, QMessageBox
 from PyQt6.QtCore import pyqtSignal
 from PyQt6 import uic
 
 from bd_manager import YandexDiskUploader
-from utils import get_resource_path, get_database_path
+from utils import get_resource_path
+from db_pool import get_connection
+from message_codec import encode_message
+from change_bus import publish, MESSAGES
 
 
 class ViewMessageDialog(QDialog):
@@ -16,6 +18,7 @@ class ViewMessageDialog(QDialog):
         super().__init__(parent)
         self.message_data = message_data
         self.full_name = parent.full_name
+        self.session = parent.session
         self.is_marked_as_read = False
 
         uic.loadUi(get_resource_path('UI/Reg/Окно ответа.ui'), self)
@@ -45,18 +48,14 @@ class ViewMessageDialog(QDialog):
             if self.is_marked_as_read:
                 return
 
-            db_path = get_database_path()
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-
-            cursor.execute('''
-                UPDATE messages 
-                SET is_read = 1 
-                WHERE id = ?
-            ''', (self.message_data['id'],))
-
-            conn.commit()
-            conn.close()
+            conn = get_connection()
+            with conn:
+                conn.execute('''
+                    UPDATE messages 
+                    SET is_read = 1 
+                    WHERE id = ?
+                ''', (self.message_data['id'],))
+                publish(conn, MESSAGES)
 
             self.is_marked_as_read = True
 
@@ -74,71 +73,19 @@ class ViewMessageDialog(QDialog):
                 QMessageBox.warning(self, "Ошибка", "Введите текст сообщения")
                 return
 
-            binary_message = pickle.dumps(reply_text)
-
-            db_path = get_database_path()
-            con = sqlite3.connect(db_path)
-            cur = con.cursor()
-
-            recipient_name = self.message_data['sender_name']
-
-
-            recipient_parts = recipient_name.split()
-            if len(recipient_parts) < 2:
-                raise ValueError("Некорректное имя получателя")
-
-            recipient_found = False
-            id_recipient = None
-
-            cur.execute('''SELECT id FROM staff WHERE last_name = ? AND first_name = ?''',
-                        (recipient_parts[0], recipient_parts[1]))
-            result = cur.fetchone()
-            if result:
-                recipient_found = True
-                id_recipient = result[0]
-
-            if not recipient_found and len(recipient_parts) >= 2:
-                cur.execute('''SELECT id FROM staff WHERE last_name = ? AND first_name = ?''',
-                            (recipient_parts[1], recipient_parts[0]))
-                result = cur.fetchone()
-                if result:
-                    recipient_found = True
-                    id_recipient = result[0]
-
-            if not recipient_found:
-                raise ValueError(f"Получатель '{recipient_name}' не найден в базе данных")
-
-            sender_parts = self.full_name.split()
-            if len(sender_parts) < 2:
-                raise ValueError("Некорректное имя отправителя")
-
-            sender_found = False
-            id_sender = None
-
-            cur.execute('''SELECT id FROM staff WHERE last_name = ? AND first_name = ?''',
-                        (sender_parts[0], sender_parts[1]))
-            result = cur.fetchone()
-            if result:
-                sender_found = True
-                id_sender = result[0]
-
-            if not sender_found and len(sender_parts) >= 2:
-                cur.execute('''SELECT id FROM staff WHERE last_name = ? AND first_name = ?''',
-                            (sender_parts[1], sender_parts[0]))
-                result = cur.fetchone()
-                if result:
-                    sender_found = True
-                    id_sender = result[0]
+            message_text = encode_message(reply_text)
 
-            if not sender_found:
-                raise ValueError("Отправитель не найден в базе данных")
+            con = get_connection()
 
-            cur.execute('''INSERT INTO messages (from_user, to_user, text)
-                            VALUES (?, ?, ?)''',
-                        (id_sender, id_recipient, binary_message))
+            # Отвечаем отправителю сообщения; свой id берем из сессии окна
+            id_recipient = self.message_data['from_user']
+            id_sender = self.session.user_id
 
-            con.commit()
-            con.close()
+            with con:
+                con.execute('''INSERT INTO messages (from_user, to_user, text)
+                                VALUES (?, ?, ?)''',
+                            (id_sender, id_recipient, message_text))
+                publish(con, MESSAGES)
 
             QMessageBox.information(self, "Успех", "Ответ отправлен")
 
@@ -148,9 +95,6 @@ class ViewMessageDialog(QDialog):
 
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Не удалось отправить ответ")
-        finally:
-            if 'con' in locals():
-                con.close()
 
     def close_dialog(self):
         try: